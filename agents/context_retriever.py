@@ -3,9 +3,32 @@ Hidayah AI — Context Retriever
 Builds grounded Tafseer/Hadith context for a given ayah.
 """
 
+import threading
 from utils.tafsir_api import fetch_multisource_tafseer_for_ayah
 from utils.hadith_api import fetch_related_hadith
-from utils.config import TAFSEER_SOURCE_TARGET_COUNT
+from utils.hadith_relatedness import related_hadith_for_ayah
+from utils.qurancom_api import prefetch_tafseer_for_page
+from utils.concurrency import run_parallel
+from utils.config import (
+    TAFSEER_SOURCE_TARGET_COUNT,
+    HADITH_MAX_RESULTS,
+    RELATED_HADITH_ENABLED,
+    CONTEXT_BUNDLE_MAX_WORKERS,
+    CONTEXT_PROVIDER_CONCURRENCY,
+)
+
+# Per-provider caps shared across all concurrent bundle builds in this process,
+# so parallel sessions cannot multiply the load on any single upstream API.
+_PROVIDER_SLOTS = {
+    provider: threading.BoundedSemaphore(limit)
+    for provider, limit in CONTEXT_PROVIDER_CONCURRENCY.items()
+}
+
+
+def _limited(provider: str, fn, **kwargs):
+    """Call fn(**kwargs) while holding one of the provider's concurrency slots."""
+    with _PROVIDER_SLOTS[provider]:
+        return fn(**kwargs)
 
 
 def get_context_bundle_for_ayah(ayah: dict) -> dict:
@@ -54,23 +77,83 @@ def get_context_bundle_for_window(
     citations = []
     seen_citation_ids = set()
 
+    # Tafseer already in the shared cache needs no upstream call at all
+    precomputed = {}
+    missing = []
     for ayah in ayah_window:
         surah_number = ayah.get("surah_number", 0)
         ayah_number = ayah.get("number_in_surah", 0)
-        ayah_ref = f"{surah_number}:{ayah_number}"
-
-        tafsir_sources = fetch_multisource_tafseer_for_ayah(
+        cached = fetch_multisource_tafseer_for_ayah.cached(
             surah_number=surah_number,
             ayah_number=ayah_number,
             language=tafseer_language,
             max_sources=max_tafseer_sources,
         )
-        hadith_sources = fetch_related_hadith(
+        if cached is None:
+            missing.append(ayah)
+        else:
+            precomputed[f"tafsir:{surah_number}:{ayah_number}"] = cached
+
+    # Quran.com is the primary EN/UR tafseer provider: pull each mushaf page
+    # with cache misses in one range call per tafsir so their per-ayah lookups
+    # hit the local cache.
+    if tafseer_language in {"en", "ur"} and len(missing) > 1:
+        pages = sorted({ayah.get("page", 0) for ayah in missing if ayah.get("page")})
+        run_parallel(
+            {
+                f"page:{page}": lambda page=page: _limited(
+                    "tafsir",
+                    prefetch_tafseer_for_page,
+                    page=page,
+                    language=tafseer_language,
+                    max_sources=max_tafseer_sources,
+                )
+                for page in pages
+            },
+            max_workers=CONTEXT_BUNDLE_MAX_WORKERS,
+            label="context:prefetch",
+        )
+
+    # Fan out every tafseer/hadith lookup at once; results are re-assembled
+    # below in window order so the bundle is deterministic.
+    tasks = {}
+    for ayah in ayah_window:
+        surah_number = ayah.get("surah_number", 0)
+        ayah_number = ayah.get("number_in_surah", 0)
+        ayah_ref = f"{surah_number}:{ayah_number}"
+
+        if f"tafsir:{ayah_ref}" not in precomputed:
+            tasks[f"tafsir:{ayah_ref}"] = lambda s=surah_number, a=ayah_number: _limited(
+                "tafsir",
+                fetch_multisource_tafseer_for_ayah,
+                surah_number=s,
+                ayah_number=a,
+                language=tafseer_language,
+                max_sources=max_tafseer_sources,
+            )
+        related = related_hadith_for_ayah(ayah.get("number", 0), HADITH_MAX_RESULTS) if RELATED_HADITH_ENABLED else None
+        if related:
+            precomputed[f"hadith:{ayah_ref}"] = related
+            continue
+        tasks[f"hadith:{ayah_ref}"] = lambda ayah=ayah, a=ayah_number: _limited(
+            "hadith",
+            fetch_related_hadith,
             ayah_text_english=ayah.get("english", ""),
             surah_name=ayah.get("surah_name", ""),
-            ayah_number=ayah_number,
+            ayah_number=a,
         )
 
+    results = run_parallel(tasks, max_workers=CONTEXT_BUNDLE_MAX_WORKERS, label="context:window")
+    results.update(precomputed)
+
+    for ayah in ayah_window:
+        surah_number = ayah.get("surah_number", 0)
+        ayah_number = ayah.get("number_in_surah", 0)
+        ayah_ref = f"{surah_number}:{ayah_number}"
+
+        tafsir_sources = results.get(f"tafsir:{ayah_ref}") or []
+        hadith_sources = results.get(f"hadith:{ayah_ref}") or []
+
         tafsir_by_ayah[ayah_ref] = tafsir_sources
         hadith_by_ayah[ayah_ref] = hadith_sources
 
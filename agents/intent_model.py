@@ -0,0 +1,295 @@
+"""
+Hidayah AI — Local Intent Model
+Hashed n-gram features and a multinomial logistic regression, trained offline
+and loaded from a small versioned artifact. classify_intent uses it between
+the rule fast path and the router LLM: a prediction at or above
+INTENT_MODEL_THRESHOLD confidence is returned directly, anything less falls
+through to the model call.
+
+Artifacts (under INTENT_MODEL_DIR):
+  intent_v{N}.npz  — non-zero weight columns (feature ids + class weights) and biases
+  intent_v{N}.json — labels, feature settings, training set size, held-out accuracy
+
+Train:     python -m agents.intent_model train data/intent_model/seed_queries.jsonl [more.jsonl ...]
+Benchmark: python -m benchmarks.intent_router data/intent_model/eval_queries.jsonl [--llm]
+
+Training files are JSON lines: {"query": ..., "intent": ..., "pdf_active": bool}.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+import numpy as np
+from utils.config import INTENT_MODEL_DIR, INTENT_MODEL_VERSION
+from utils.logger import get_logger
+
+log = get_logger("intent_model")
+
+INTENTS = ("VERSE_LOOKUP", "SCHOLARLY_RESEARCH", "PDF_ANALYSIS")
+FEATURE_BITS = 18
+_FEATURE_VERSION = 1  # Bump when featurize() changes; old artifacts are then refused
+_WORD = re.compile(r"\d+\s*:\s*\d+|\w+", re.UNICODE)
+
+_model = None
+_model_lock = threading.Lock()
+_model_failed = False
+
+
+def _word_tokens(query: str) -> list[str]:
+    """Lower-cased words with numbers collapsed (verse numbers carry no intent by value)."""
+    tokens = []
+    for token in _WORD.findall(query.lower()):
+        if ":" in token:
+            tokens.append("<ref>")
+        elif token.isdigit():
+            tokens.append("<num>")
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def featurize(query: str, pdf_active: bool, bits: int = FEATURE_BITS) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sparse feature vector for a query.
+
+    Word unigrams and bigrams plus character 3–4-grams inside words (for
+    transliteration variants like Baqarah / Baqara), and a flag for an active
+    PDF, hashed with CRC32 into 2**bits buckets with a sign bit.
+
+    Returns:
+        (bucket ids, values) — values are sublinear counts, L2-normalized
+    """
+    words = _word_tokens(query)
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        if word.startswith("<"):
+            continue
+        padded = f"<{word}>"
+        for n in (3, 4):
+            grams += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+    grams.append(f"pdf:{int(bool(pdf_active))}")
+    if pdf_active:
+        # Let every word interact with the PDF flag: "what is X" flips with an upload
+        grams += [f"pw:{w}" for w in words]
+
+    mask = (1 << bits) - 1
+    counts: dict[int, float] = {}
+    for gram in grams:
+        h = zlib.crc32(gram.encode("utf-8"))
+        bucket = h & mask
+        counts[bucket] = counts.get(bucket, 0.0) + (1.0 if h >> 31 else -1.0)
+
+    ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    values = np.sign(values) * (1.0 + np.log(np.maximum(np.abs(values), 1.0)))
+    keep = values != 0
+    ids, values = ids[keep], values[keep].astype(np.float32)
+    norm = float(np.linalg.norm(values))
+    return ids, values / norm if norm else values
+
+
+class IntentModel:
+    """Linear classifier over hashed features; weights kept only for seen buckets."""
+
+    def __init__(self, labels, feature_ids: np.ndarray, weights: np.ndarray, bias: np.ndarray, meta: dict):
+        self.labels = tuple(labels)
+        self.bits = int(meta.get("feature_bits", FEATURE_BITS))
+        self.meta = meta
+        order = np.argsort(feature_ids)
+        self._feature_ids = feature_ids[order].astype(np.int64)
+        self._weights = weights[order].astype(np.float32)  # (features, classes)
+        self._bias = bias.astype(np.float32)
+
+    def _rows(self, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        positions = np.searchsorted(self._feature_ids, ids)
+        positions = np.minimum(positions, len(self._feature_ids) - 1)
+        found = self._feature_ids[positions] == ids
+        return positions[found], found
+
+    def predict_proba(self, query: str, pdf_active: bool) -> np.ndarray:
+        ids, values = featurize(query, pdf_active, self.bits)
+        rows, found = self._rows(ids)
+        logits = self._bias + values[found] @ self._weights[rows]
+        logits = np.exp(logits - logits.max())
+        return logits / logits.sum()
+
+    def predict(self, query: str, pdf_active: bool) -> tuple[str, float]:
+        """Return (intent, confidence) for a query."""
+        probabilities = self.predict_proba(query, pdf_active)
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, directory, version: int) -> str:
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(str(directory), f"intent_v{version}")
+        np.savez_compressed(f"{base}.npz", feature_ids=self._feature_ids, weights=self._weights, bias=self._bias)
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump({**self.meta, "version": version, "labels": list(self.labels)}, f, indent=2)
+        return base
+
+    @classmethod
+    def load(cls, directory, version: int) -> "IntentModel":
+        base = os.path.join(str(directory), f"intent_v{version}")
+        with open(f"{base}.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("feature_version") != _FEATURE_VERSION:
+            raise ValueError(f"artifact feature version {meta.get('feature_version')} != {_FEATURE_VERSION}")
+        data = np.load(f"{base}.npz")
+        return cls(meta["labels"], data["feature_ids"], data["weights"], data["bias"], meta)
+
+
+def get_intent_model() -> IntentModel | None:
+    """Load the configured artifact once per process; None if it is missing or incompatible."""
+    global _model, _model_failed
+    if _model is not None or _model_failed:
+        return _model
+    with _model_lock:
+        if _model is None and not _model_failed:
+            try:
+                _model = IntentModel.load(INTENT_MODEL_DIR, INTENT_MODEL_VERSION)
+                log.info(
+                    f"Loaded intent model v{INTENT_MODEL_VERSION} "
+                    f"({len(_model._feature_ids)} features, held-out accuracy {_model.meta.get('holdout_accuracy', 0):.1%})"
+                )
+            except Exception as e:
+                _model_failed = True
+                log.warning(f"Local intent model unavailable, using router LLM only: {e}")
+    return _model
+
+
+def load_examples(paths) -> list[dict]:
+    """Read labeled JSON-lines files, skipping malformed rows and unknown intents."""
+    examples = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if row.get("query") and row.get("intent") in INTENTS:
+                    examples.append({"query": row["query"], "intent": row["intent"], "pdf_active": bool(row.get("pdf_active"))})
+    return examples
+
+
+def train(
+    examples: list[dict],
+    bits: int = FEATURE_BITS,
+    epochs: int = 200,
+    learning_rate: float = 0.5,
+    l2: float = 1e-4,
+) -> IntentModel:
+    """
+    Fit a softmax regression with full-batch Adagrad.
+
+    Only buckets that occur in the training data get weights, so the
+    artifact stays small regardless of the hash space.
+    """
+    featurized = [featurize(e["query"], e["pdf_active"], bits) for e in examples]
+    vocabulary = np.unique(np.concatenate([ids for ids, _ in featurized]))
+    rows = np.concatenate([np.full(len(ids), i) for i, (ids, _) in enumerate(featurized)])
+    columns = np.searchsorted(vocabulary, np.concatenate([ids for ids, _ in featurized]))
+    values = np.concatenate([vals for _, vals in featurized]).astype(np.float64)
+    targets = np.array([INTENTS.index(e["intent"]) for e in examples])
+    n, classes = len(examples), len(INTENTS)
+
+    weights = np.zeros((len(vocabulary), classes))
+    bias = np.zeros(classes)
+    weight_history = np.full_like(weights, 1e-8)
+    bias_history = np.full_like(bias, 1e-8)
+    onehot = np.eye(classes)[targets]
+
+    for _ in range(epochs):
+        logits = np.zeros((n, classes)) + bias
+        np.add.at(logits, rows, values[:, None] * weights[columns])
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        error = (probabilities - onehot) / n
+
+        weight_grad = l2 * weights
+        np.add.at(weight_grad, columns, values[:, None] * error[rows])
+        bias_grad = error.sum(axis=0)
+
+        weight_history += weight_grad ** 2
+        bias_history += bias_grad ** 2
+        weights -= learning_rate * weight_grad / np.sqrt(weight_history)
+        bias -= learning_rate * bias_grad / np.sqrt(bias_history)
+
+    meta = {
+        "feature_version": _FEATURE_VERSION,
+        "feature_bits": bits,
+        "examples": n,
+        "class_counts": {label: int((targets == i).sum()) for i, label in enumerate(INTENTS)},
+        "trained_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    return IntentModel(INTENTS, vocabulary, weights, bias, meta)
+
+
+def evaluate(model, examples: list[dict], threshold: float = 0.0) -> dict:
+    """Accuracy overall and on the examples the model would answer at this threshold."""
+    correct = confident = confident_correct = 0
+    latencies = []
+    for example in examples:
+        started = time.perf_counter()
+        intent, confidence = model.predict(example["query"], example["pdf_active"])
+        latencies.append(time.perf_counter() - started)
+        correct += intent == example["intent"]
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += intent == example["intent"]
+    return {
+        "accuracy": correct / max(1, len(examples)),
+        "coverage": confident / max(1, len(examples)),
+        "confident_accuracy": confident_correct / max(1, confident),
+        "latencies": latencies,
+    }
+
+
+def _next_version(directory) -> int:
+    versions = [
+        int(match.group(1))
+        for name in (os.listdir(directory) if os.path.isdir(directory) else [])
+        if (match := re.fullmatch(r"intent_v(\d+)\.json", name))
+    ]
+    return max(versions, default=0) + 1
+
+
+def _train_command(paths: list[str]) -> None:
+    examples = load_examples(paths)
+    if len(examples) < 20:
+        raise SystemExit(f"Need at least 20 labeled examples, got {len(examples)}")
+
+    # Held-out estimate first (every 5th example), then fit on everything
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(examples))
+    held_out = [examples[i] for i in order[::5]]
+    fitted = [examples[i] for j, i in enumerate(order) if j % 5]
+    holdout = evaluate(train(fitted), held_out)
+
+    model = train(examples)
+    model.meta["holdout_accuracy"] = holdout["accuracy"]
+    model.meta["sources"] = [os.path.basename(path) for path in paths]
+    version = _next_version(INTENT_MODEL_DIR)
+    base = model.save(INTENT_MODEL_DIR, version)
+    print(
+        f"Trained intent model v{version} on {len(examples)} examples "
+        f"({len(model._feature_ids)} features), held-out accuracy {holdout['accuracy']:.1%} → {base}.npz"
+    )
+    if version != INTENT_MODEL_VERSION:
+        print(f"Set INTENT_MODEL_VERSION = {version} in utils/config.py to serve it")
+
+
+if __name__ == "__main__":
+    import sys
+
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("", [])
+    if command == "train" and args:
+        _train_command(args)
+    else:
+        raise SystemExit(__doc__)
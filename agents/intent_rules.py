@@ -0,0 +1,103 @@
+"""
+Hidayah AI — Rule-Based Intent Pre-Classifier
+Deterministic fast path in front of the router LLM. Only high-confidence
+cases are decided here (verse references, known surah names with a lookup
+cue, questions while a PDF is active); everything else returns None and is
+left to classify_intent's model call.
+"""
+
+import re
+
+_VERSE_REF = re.compile(r"(?<![\d.:])(\d{1,3})\s*[:：]\s*(\d{1,3})(?![\d:])(?!\s*(?:am|pm)\b)", re.IGNORECASE)
+_VERSE_NUMBER = re.compile(r"\b(?:verse|ayah|ayat|aya|ayaat)\s*(?:no\.?|number|#)?\s*\d{1,3}\b", re.IGNORECASE)
+_SURAH_KEYWORD = re.compile(r"\b(?:surah|surat|sura|chapter)\b", re.IGNORECASE)
+_JUZ = re.compile(r"\b(?:juz|juzz|para|parah)\s*\d{1,2}\b", re.IGNORECASE)
+_LOOKUP_CUES = re.compile(r"\b(?:verse|ayah|ayat|aya|surah|surat|sura|read|recite|show|play|open|go to|listen)\b", re.IGNORECASE)
+_RESEARCH_CUES = re.compile(
+    r"\b(?:explain|explanation|tafsir|tafseer|meaning|means|context|scholars?|ruling|rulings|fiqh|why|"
+    r"history|historical|opinion|opinions|interpret\w*|lessons?|compare|hadith|reason|significance)\b",
+    re.IGNORECASE,
+)
+_PDF_CUES = re.compile(
+    r"\b(?:pdf|document|doc|file|paper|author|uploaded|summari[sz]e|summary|this book|the book|page \d+)\b",
+    re.IGNORECASE,
+)
+_WEB_CUES = re.compile(r"\b(?:web|online|internet|search|latest|news|google|website)\b", re.IGNORECASE)
+_ARTICLE = re.compile(r"^(?:al|an|ar|as|ash|at|ad|adh|az|aal)[-\s']+")
+
+
+def surah_key(name: str) -> str:
+    """Spelling-tolerant key for a transliterated surah name (Al-Faatiha ≈ Fatihah)."""
+    key = _ARTICLE.sub("", name.lower().strip())
+    key = re.sub(r"[^a-z]", "", key)
+    key = re.sub(r"(.)\1+", r"\1", key)
+    return key.rstrip("h")
+
+
+def build_surah_lexicon(ayahs: list[dict] | None) -> set[str]:
+    """Surah-name keys for the currently loaded ayahs."""
+    return {surah_key(a.get("surah_name", "")) for a in (ayahs or []) if a.get("surah_name")} - {""}
+
+
+def _mentions_surah(query: str, lexicon: set[str]) -> bool:
+    words = re.findall(r"[A-Za-z'\-]+", query)
+    for size in (1, 2, 3):
+        for i in range(len(words) - size + 1):
+            key = surah_key(" ".join(words[i:i + size]))
+            if len(key) >= 4 and key in lexicon:
+                return True
+    return False
+
+
+def _valid_reference(query: str) -> bool:
+    for match in _VERSE_REF.finditer(query):
+        surah, ayah = int(match.group(1)), int(match.group(2))
+        if 1 <= surah <= 114 and 1 <= ayah <= 286:
+            return True
+    return False
+
+
+def pre_classify(
+    query: str,
+    active_pdf_name: str | None = None,
+    surah_lexicon: set[str] | None = None,
+) -> tuple[str, str] | None:
+    """
+    Decide obvious intents without a model call.
+
+    Args:
+        query: User message
+        active_pdf_name: Name of the uploaded PDF, if any
+        surah_lexicon: Keys from build_surah_lexicon() for the loaded ayahs
+
+    Returns:
+        (intent, rule name) for a confident match, or None to defer to the LLM
+    """
+    text = query.strip()
+    if not text:
+        return None
+
+    research = bool(_RESEARCH_CUES.search(text))
+    verse_reference = _valid_reference(text) or bool(_JUZ.search(text))
+    named_verse = bool(_VERSE_NUMBER.search(text)) or (
+        bool(surah_lexicon) and _mentions_surah(text, surah_lexicon) and bool(_LOOKUP_CUES.search(text))
+    ) or (bool(_SURAH_KEYWORD.search(text)) and bool(re.search(r"\d", text)))
+
+    if active_pdf_name:
+        pdf_cue = bool(_PDF_CUES.search(text))
+        if pdf_cue and not verse_reference:
+            return "PDF_ANALYSIS", "pdf_cue"
+        if not (verse_reference or named_verse or _WEB_CUES.search(text)):
+            # The router prompt biases general questions to the uploaded PDF
+            return "PDF_ANALYSIS", "pdf_active"
+        if (verse_reference or named_verse) and _LOOKUP_CUES.search(text) and not (research or pdf_cue):
+            return "VERSE_LOOKUP", "verse_ref" if verse_reference else "verse_mention"
+        return None
+
+    if research:
+        return None  # "Explain 2:255" may want tafsir or web research: let the model decide
+    if verse_reference:
+        return "VERSE_LOOKUP", "verse_ref"
+    if named_verse:
+        return "VERSE_LOOKUP", "verse_mention"
+    return None
@@ -1,15 +1,34 @@
 """
 Hidayah AI — Intent Router Agent
 Uses Gemini 2.5 Flash-Lite for fast intent classification of user queries.
+Obvious cases are decided first by the rule fast path (agents/intent_rules.py),
+then by the local intent model (agents/intent_model.py) when it is confident.
 Categories: VERSE_LOOKUP, SCHOLARLY_RESEARCH, PDF_ANALYSIS
 """
 
+import json
+import threading
+import time
 from google import genai
-from utils.config import MODEL_ROUTER, GEMINI_API_KEY, get_gemini_client
+from utils.config import (
+    MODEL_ROUTER,
+    GEMINI_API_KEY,
+    ROUTER_FAST_PATH_ENABLED,
+    INTENT_MODEL_ENABLED,
+    INTENT_MODEL_THRESHOLD,
+    INTENT_QUERY_LOG_ENABLED,
+    INTENT_QUERY_LOG_PATH,
+    get_gemini_client,
+)
 from utils.logger import get_logger
+from agents.intent_rules import build_surah_lexicon, pre_classify
+from agents.intent_model import get_intent_model
 
 log = get_logger("router")
 
+_stats = {"messages": 0, "fast_path": 0, "local_model": 0, "llm_calls": 0, "llm_seconds": 0.0}
+_stats_lock = threading.Lock()
+
 ROUTER_SYSTEM_PROMPT = """You are an intent classifier for an Islamic Quranic research application called Hidayah AI.
 
 Classify the user's query into EXACTLY ONE of these categories. Return ONLY the category name, nothing else.
@@ -22,15 +41,75 @@ Categories:
 If unsure, default to SCHOLARLY_RESEARCH."""
 
 
-def classify_intent(query: str, active_pdf_name: str | None = None) -> str:
+def get_router_stats() -> dict:
+    """Hit rate of the rules and local model, and estimated latency saved (hits × mean LLM routing time)."""
+    with _stats_lock:
+        stats = dict(_stats)
+    skipped = stats["fast_path"] + stats["local_model"]
+    mean_llm = stats["llm_seconds"] / stats["llm_calls"] if stats["llm_calls"] else 0.0
+    stats["hit_rate"] = skipped / stats["messages"] if stats["messages"] else 0.0
+    stats["mean_llm_seconds"] = mean_llm
+    stats["estimated_seconds_saved"] = skipped * mean_llm
+    return stats
+
+
+def _log_labeled_query(query: str, active_pdf_name: str | None, intent: str) -> None:
+    """Append an LLM-routed query to the training log (INTENT_QUERY_LOG_ENABLED)."""
+    try:
+        with open(INTENT_QUERY_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"query": query, "intent": intent, "pdf_active": bool(active_pdf_name)}, ensure_ascii=False) + "\n")
+    except OSError as e:
+        log.warning(f"Could not append to intent query log: {e}")
+
+
+def classify_intent(query: str, active_pdf_name: str | None = None, ayahs: list[dict] | None = None) -> str:
     """
     Classify user intent using Gemini 2.5 Flash-Lite (fastest model).
+    High-confidence cases are answered by the rule fast path, then by the local
+    intent model, without a model call; ayahs (the loaded juz) supply the
+    rules' surah-name lexicon.
     Returns one of: VERSE_LOOKUP, SCHOLARLY_RESEARCH, PDF_ANALYSIS
     """
+    with _stats_lock:
+        _stats["messages"] += 1
+
+    if ROUTER_FAST_PATH_ENABLED:
+        decided = pre_classify(query, active_pdf_name, build_surah_lexicon(ayahs))
+        if decided:
+            intent, rule = decided
+            with _stats_lock:
+                _stats["fast_path"] += 1
+            stats = get_router_stats()
+            log.info(
+                f"Fast-path intent: {intent} (rule: {rule}) — hit rate {stats['hit_rate']:.0%} "
+                f"({stats['fast_path']}/{stats['messages']}), ~{stats['estimated_seconds_saved']:.1f}s saved"
+            )
+            return intent
+
+    if INTENT_MODEL_ENABLED:
+        model = get_intent_model()
+        if model is not None:
+            intent, confidence = model.predict(query, bool(active_pdf_name))
+            if confidence >= INTENT_MODEL_THRESHOLD:
+                with _stats_lock:
+                    _stats["local_model"] += 1
+                log.info(f"Local model intent: {intent} (confidence {confidence:.2f})")
+                return intent
+            log.info(f"Local model unsure ({intent}, {confidence:.2f}); asking router LLM")
+
+    intent = _classify_with_llm(query, active_pdf_name)
+    if INTENT_QUERY_LOG_ENABLED:
+        _log_labeled_query(query, active_pdf_name, intent)
+    return intent
+
+
+def _classify_with_llm(query: str, active_pdf_name: str | None = None) -> str:
+    """Route with the Gemini model; SCHOLARLY_RESEARCH on any failure."""
     client = get_gemini_client()
     if not client:
         return "SCHOLARLY_RESEARCH"
 
+    started = time.perf_counter()
     try:
         system_prompt = ROUTER_SYSTEM_PROMPT
         if active_pdf_name:
@@ -45,6 +124,9 @@ def classify_intent(query: str, active_pdf_name: str | None = None) -> str:
                 max_output_tokens=50,
             ),
         )
+        with _stats_lock:
+            _stats["llm_calls"] += 1
+            _stats["llm_seconds"] += time.perf_counter() - started
 
         if not response.text:
             log.warning("Empty response from model. Defaulting to: SCHOLARLY_RESEARCH")
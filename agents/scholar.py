@@ -4,15 +4,20 @@ Uses Gemini 2.5 Flash for grounded scholarly responses with strict citation rule
 Routes to appropriate data source based on classified intent.
 """
 
+import time
+from typing import Iterator
 from google import genai
 from utils.config import MODEL_SCHOLAR, GEMINI_API_KEY, get_gemini_client
 from agents.web_search import search_web
 from agents.context_retriever import get_context_bundle_for_window
 from utils.trust import is_trusted_scholarly
+from utils.answer_cache import context_fingerprint, get_cached_answer, store_answer
 from utils.logger import get_logger
 
 log = get_logger("scholar")
 
+_STREAM_INTERRUPTED = "\n\n*(Response interrupted. Please try again.)*"
+
 SCHOLAR_SYSTEM_PROMPT = """You are Hidayah AI, an Islamic scholarly research assistant. You are knowledgeable, respectful, and precise.
 
 STRICT GROUNDING RULES (CRITICAL — violations cause spiritual harm):
@@ -36,138 +41,202 @@ Guidelines:
 You serve as a bridge between classical Islamic scholarship and modern seekers of knowledge."""
 
 
-def get_scholar_response(
+def _answer_fingerprint(
+    intent: str,
+    ayah_window: list[dict] | None,
+    ayahs_context: list[dict] | None,
+    tafseer_language: str,
+    pdf_context: str | None,
+    web_results: list[dict] | None = None,
+) -> str:
+    """Fingerprint of the context an answer depends on, for the answer cache."""
+    if intent == "VERSE_LOOKUP":
+        window = (ayah_window or ayahs_context or [])[:10]
+        refs = [f"{a.get('surah_number', 0)}:{a.get('number_in_surah', 0)}" for a in window]
+        return context_fingerprint(intent, tafseer_language, *refs)
+    if intent == "PDF_ANALYSIS":
+        return context_fingerprint(intent, pdf_context or "")
+    # Scoped to the sources the prompt is grounded on, so a different question
+    # only shares an answer when it retrieved the same material
+    return context_fingerprint(
+        intent, *(f"{r.get('url', '')}\x1f{r.get('content', '')}" for r in _trusted_results(web_results)[:3])
+    )
+
+
+def _trusted_results(web_results: list[dict] | None) -> list[dict]:
+    """Web results from trusted scholarly domains (results without a URL are kept)."""
+    return [r for r in (web_results or []) if not r.get("url") or is_trusted_scholarly(r["url"])]
+
+
+def fetch_verse_bundle(window: list[dict], tafseer_language: str) -> dict:
+    """Tafseer/Hadith bundle for a VERSE_LOOKUP answer over the visible window."""
+    return get_context_bundle_for_window(ayah_window=window[:10], tafseer_language=tafseer_language)
+
+
+def fetch_research_results(query: str) -> list[dict]:
+    """Web results for a SCHOLARLY_RESEARCH answer (not yet domain-filtered)."""
+    return search_web(f"Islamic scholarly {query}")
+
+
+def _build_scholar_prompt(
+    query: str,
+    intent: str,
+    ayahs_context: list[dict] | None,
+    ayah_window: list[dict] | None,
+    tafseer_language: str,
+    pdf_context: str | None,
+    context_bundle: dict | None = None,
+    web_results: list[dict] | None = None,
+) -> tuple[str, list[str]]:
+    """Assemble the grounded prompt for an intent. Returns (full prompt, Sources lines).
+
+    context_bundle / web_results, when given, were already retrieved (e.g.
+    speculatively during routing) and are used instead of fetching again.
+    """
+    log.info(f"Assembling context. Intent: {intent}")
+    # Build context based on intent
+    context_parts = []
+    grounded_sources = []
+
+    if intent == "VERSE_LOOKUP" and (ayah_window or ayahs_context):
+        window = ayah_window or ayahs_context or []
+
+        # Provide current verse context
+        verses_text = "\n".join(
+            f"[{a['surah_name']} {a['number_in_surah']}] Arabic: {a['arabic']}\n"
+            f"English: {a['english']}\nUrdu: {a['urdu']}"
+            for a in window[:10]  # Limit context size
+        )
+        context_parts.append(f"Currently viewing these Quranic verses:\n{verses_text}")
+
+        # Retrieve grounded Tafseer + Hadith across visible ayah window
+        bundle = context_bundle if context_bundle is not None else fetch_verse_bundle(window, tafseer_language)
+
+        tafsir_context_lines = []
+        hadith_context_lines = []
+        tafsir_counter = 1
+        hadith_counter = 1
+
+        if bundle:
+            tafsir_by_ayah = bundle.get("tafsir_by_ayah", {})
+            hadith_by_ayah = bundle.get("hadith_by_ayah", {})
+            citations = bundle.get("citations", [])
+
+            for ayah_ref, tafsir_items in tafsir_by_ayah.items():
+                for item in tafsir_items[:2]:
+                    tafsir_context_lines.append(
+                        f"[T{tafsir_counter}] {item['source_name']} ({ayah_ref}, {item.get('language', '').upper()})\n"
+                        f"{item['excerpt']}"
+                    )
+                    tafsir_source = (
+                        f"[T{tafsir_counter}] {item['source_name']} | {ayah_ref} | "
+                        f"lang:{item.get('language', '').upper()} | canonical:{item.get('canonical_status', 'unverified')}"
+                    )
+                    if item.get("canonical_url"):
+                        tafsir_source += f" — {item['canonical_url']}"
+                    grounded_sources.append(tafsir_source)
+                    tafsir_counter += 1
+
+            for ayah_ref, hadith_items in hadith_by_ayah.items():
+                for item in hadith_items[:1]:
+                    hadith_context_lines.append(
+                        f"[H{hadith_counter}] {item['source_name']} ({ayah_ref})\n{item['excerpt']}"
+                    )
+                    hadith_counter += 1
+
+            for idx, citation in enumerate(citations, start=1):
+                citation_type = citation.get("type", "source")
+                source_name = citation.get("source_name", "Unknown Source")
+                reference = citation.get("reference", "")
+                language = (citation.get("language", "") or "").upper() or "N/A"
+                canonical_status = citation.get("canonical_status", "unverified")
+                canonical_url = citation.get("canonical_url", "")
+                ayah_ref = citation.get("metadata", {}).get("ayah_ref", "")
+                source_rank = citation.get("source_rank", 0)
+
+                line = (
+                    f"type:{citation_type} | id:C{idx} | source:{source_name} | ref:{reference} | "
+                    f"ayah:{ayah_ref} | lang:{language} | rank:{source_rank} | canonical:{canonical_status}"
+                )
+                if canonical_url:
+                    line += f" | url:{canonical_url}"
+                grounded_sources.append(line)
+
+        if tafsir_context_lines:
+            context_parts.append("Authenticated Tafseer Context:\n" + "\n\n".join(tafsir_context_lines[:8]))
+        if hadith_context_lines:
+            context_parts.append("Related Hadith references:\n" + "\n\n".join(hadith_context_lines[:5]))
+
+    elif intent == "SCHOLARLY_RESEARCH":
+        # Fetch web results — domain-filtered to trusted Islamic sources only
+        if web_results is None:
+            web_results = fetch_research_results(query)
+        trusted_results = _trusted_results(web_results)
+        if trusted_results:
+            web_text = "\n\n".join(
+                f"Source: {r['title']}\nURL: {r['url']}\n{r['content']}"
+                for r in trusted_results[:3]
+            )
+            context_parts.append(f"Web research results (domain-verified sources only):\n{web_text}")
+            context_parts.append(
+                "⚠️ NOTE: The above web sources are from trusted Islamic domains but "
+                "have not been individually verified. Present information with appropriate caveats."
+            )
+
+    elif intent == "PDF_ANALYSIS" and pdf_context:
+        context_parts.append(f"Relevant excerpts from the uploaded PDF:\n{pdf_context}")
+
+    # Assemble the full prompt
+    full_prompt = query
+    if context_parts:
+        context_str = "\n\n---\n\n".join(context_parts)
+        full_prompt = f"Context:\n{context_str}\n\n---\n\nUser Question: {query}"
+
+    log.info(f"Sending final prompt to {MODEL_SCHOLAR} (Context parts: {len(context_parts)})")
+    return full_prompt, grounded_sources
+
+
+def stream_scholar_response(
     query: str,
     intent: str,
     ayahs_context: list[dict] | None = None,
     ayah_window: list[dict] | None = None,
     tafseer_language: str = "en",
     pdf_context: str | None = None,
-) -> str:
+    context_bundle: dict | None = None,
+    web_results: list[dict] | None = None,
+) -> Iterator[str]:
     """
-    Generate a scholarly response using Gemini 2.5 Pro.
+    Stream a scholarly response as text deltas while Gemini generates it.
 
-    Args:
-        query: User's question
-        intent: Classified intent (VERSE_LOOKUP, SCHOLARLY_RESEARCH, PDF_ANALYSIS)
-        ayahs_context: Current ayahs being viewed (for verse context)
-        pdf_context: Retrieved PDF chunks (for RAG answers)
-
-    Returns:
-        Formatted response string
+    Same arguments as get_scholar_response. The "Sources:" block, when there
+    is one, arrives as the final piece; joined, the pieces equal the
+    non-streaming response. Errors before any text are yielded as the usual
+    "⚠️" message. Time to first token is logged.
     """
+    started = time.perf_counter()
     client = get_gemini_client()
     if not client:
-        return "⚠️ **Gemini API key not configured.** Please add `GEMINI_API_KEY` to your settings (Secrets on Streamlit Cloud or .env locally)."
+        yield "⚠️ **Gemini API key not configured.** Please add `GEMINI_API_KEY` to your settings (Secrets on Streamlit Cloud or .env locally)."
+        return
 
-    try:
-        log.info(f"Assembling context. Intent: {intent}")
-        # Build context based on intent
-        context_parts = []
-        grounded_sources = []
-
-        if intent == "VERSE_LOOKUP" and (ayah_window or ayahs_context):
-            window = ayah_window or ayahs_context or []
-
-            # Provide current verse context
-            verses_text = "\n".join(
-                f"[{a['surah_name']} {a['number_in_surah']}] Arabic: {a['arabic']}\n"
-                f"English: {a['english']}\nUrdu: {a['urdu']}"
-                for a in window[:10]  # Limit context size
-            )
-            context_parts.append(f"Currently viewing these Quranic verses:\n{verses_text}")
-
-            # Retrieve grounded Tafseer + Hadith across visible ayah window
-            bundle = get_context_bundle_for_window(
-                ayah_window=window[:10],
-                tafseer_language=tafseer_language,
-            )
+    if intent == "SCHOLARLY_RESEARCH" and web_results is None:
+        web_results = fetch_research_results(query)  # Needed for the cache key; reused by the prompt on a miss
+    fingerprint = _answer_fingerprint(intent, ayah_window, ayahs_context, tafseer_language, pdf_context, web_results)
+    cached = get_cached_answer(intent, query, fingerprint, MODEL_SCHOLAR)
+    if cached is not None:
+        log.info(f"Answer cache hit. Intent: {intent}")
+        yield cached
+        return
 
-            tafsir_context_lines = []
-            hadith_context_lines = []
-            tafsir_counter = 1
-            hadith_counter = 1
-
-            if bundle:
-                tafsir_by_ayah = bundle.get("tafsir_by_ayah", {})
-                hadith_by_ayah = bundle.get("hadith_by_ayah", {})
-                citations = bundle.get("citations", [])
-
-                for ayah_ref, tafsir_items in tafsir_by_ayah.items():
-                    for item in tafsir_items[:2]:
-                        tafsir_context_lines.append(
-                            f"[T{tafsir_counter}] {item['source_name']} ({ayah_ref}, {item.get('language', '').upper()})\n"
-                            f"{item['excerpt']}"
-                        )
-                        tafsir_source = (
-                            f"[T{tafsir_counter}] {item['source_name']} | {ayah_ref} | "
-                            f"lang:{item.get('language', '').upper()} | canonical:{item.get('canonical_status', 'unverified')}"
-                        )
-                        if item.get("canonical_url"):
-                            tafsir_source += f" — {item['canonical_url']}"
-                        grounded_sources.append(tafsir_source)
-                        tafsir_counter += 1
-
-                for ayah_ref, hadith_items in hadith_by_ayah.items():
-                    for item in hadith_items[:1]:
-                        hadith_context_lines.append(
-                            f"[H{hadith_counter}] {item['source_name']} ({ayah_ref})\n{item['excerpt']}"
-                        )
-                        hadith_counter += 1
-
-                for idx, citation in enumerate(citations, start=1):
-                    citation_type = citation.get("type", "source")
-                    source_name = citation.get("source_name", "Unknown Source")
-                    reference = citation.get("reference", "")
-                    language = (citation.get("language", "") or "").upper() or "N/A"
-                    canonical_status = citation.get("canonical_status", "unverified")
-                    canonical_url = citation.get("canonical_url", "")
-                    ayah_ref = citation.get("metadata", {}).get("ayah_ref", "")
-                    source_rank = citation.get("source_rank", 0)
-
-                    line = (
-                        f"type:{citation_type} | id:C{idx} | source:{source_name} | ref:{reference} | "
-                        f"ayah:{ayah_ref} | lang:{language} | rank:{source_rank} | canonical:{canonical_status}"
-                    )
-                    if canonical_url:
-                        line += f" | url:{canonical_url}"
-                    grounded_sources.append(line)
-
-            if tafsir_context_lines:
-                context_parts.append("Authenticated Tafseer Context:\n" + "\n\n".join(tafsir_context_lines[:8]))
-            if hadith_context_lines:
-                context_parts.append("Related Hadith references:\n" + "\n\n".join(hadith_context_lines[:5]))
-
-        elif intent == "SCHOLARLY_RESEARCH":
-            # Fetch web results — domain-filtered to trusted Islamic sources only
-            web_results = search_web(f"Islamic scholarly {query}")
-            trusted_results = []
-            for r in (web_results or []):
-                url = r.get("url", "")
-                if not url or is_trusted_scholarly(url):
-                    trusted_results.append(r)
-            if trusted_results:
-                web_text = "\n\n".join(
-                    f"Source: {r['title']}\nURL: {r['url']}\n{r['content']}"
-                    for r in trusted_results[:3]
-                )
-                context_parts.append(f"Web research results (domain-verified sources only):\n{web_text}")
-                context_parts.append(
-                    "⚠️ NOTE: The above web sources are from trusted Islamic domains but "
-                    "have not been individually verified. Present information with appropriate caveats."
-                )
-
-        elif intent == "PDF_ANALYSIS" and pdf_context:
-            context_parts.append(f"Relevant excerpts from the uploaded PDF:\n{pdf_context}")
-
-        # Assemble the full prompt
-        full_prompt = query
-        if context_parts:
-            context_str = "\n\n---\n\n".join(context_parts)
-            full_prompt = f"Context:\n{context_str}\n\n---\n\nUser Question: {query}"
+    parts: list[str] = []
+    try:
+        full_prompt, grounded_sources = _build_scholar_prompt(
+            query, intent, ayahs_context, ayah_window, tafseer_language, pdf_context, context_bundle, web_results
+        )
+        prompt_ready = time.perf_counter() - started
 
-        log.info(f"Sending final prompt to {MODEL_SCHOLAR} (Context parts: {len(context_parts)})")
-        response = client.models.generate_content(
+        stream = client.models.generate_content_stream(
             model=MODEL_SCHOLAR,
             contents=full_prompt,
             config=genai.types.GenerateContentConfig(
@@ -176,19 +245,77 @@ def get_scholar_response(
                 max_output_tokens=2048,
             ),
         )
+        for chunk in stream:
+            text = chunk.text
+            if not text:
+                continue
+            if not parts:
+                log.info(
+                    f"Scholar TTFT {time.perf_counter() - started:.2f}s "
+                    f"(context {prompt_ready:.2f}s, model {time.perf_counter() - started - prompt_ready:.2f}s)"
+                )
+            parts.append(text)
+            yield text
 
-        if not response.text:
-            return "⚠️ **Scholar Agent error:** The model returned an empty response. This might be due to safety filters or a temporary connection issue."
+        if not parts:
+            yield "⚠️ **Scholar Agent error:** The model returned an empty response. This might be due to safety filters or a temporary connection issue."
+            return
 
-        log.info("Response generated successfully.")
-        answer = response.text
+        log.info(f"Response generated successfully in {time.perf_counter() - started:.2f}s.")
+        answer = "".join(parts)
         if grounded_sources:
-            answer += "\n\nSources:\n" + "\n".join(f"- {src}" for src in grounded_sources)
-        return answer
+            sources_block = "\n\nSources:\n" + "\n".join(f"- {src}" for src in grounded_sources)
+            answer += sources_block
+            yield sources_block
+        store_answer(intent, query, fingerprint, MODEL_SCHOLAR, answer)
 
     except genai.errors.APIError as e:
-        if e.code == 429:
-            return "⚠️ **Scholar Agent is currently resting.** Hidayah AI is receiving a high volume of requests. Please wait a moment and try again."
-        return f"⚠️ **API Error:** {str(e.message) if hasattr(e, 'message') else str(e)}"
+        if parts:
+            log.warning(f"Scholar stream interrupted after {len(parts)} chunks: {e}")
+            yield _STREAM_INTERRUPTED
+        elif e.code == 429:
+            yield "⚠️ **Scholar Agent is currently resting.** Hidayah AI is receiving a high volume of requests. Please wait a moment and try again."
+        else:
+            yield f"⚠️ **API Error:** {str(e.message) if hasattr(e, 'message') else str(e)}"
     except Exception as e:
-        return f"⚠️ **Scholar Agent error:** An unexpected error occurred. Please try again."
+        if parts:
+            log.warning(f"Scholar stream interrupted after {len(parts)} chunks: {e}")
+            yield _STREAM_INTERRUPTED
+        else:
+            yield f"⚠️ **Scholar Agent error:** An unexpected error occurred. Please try again."
+
+
+def get_scholar_response(
+    query: str,
+    intent: str,
+    ayahs_context: list[dict] | None = None,
+    ayah_window: list[dict] | None = None,
+    tafseer_language: str = "en",
+    pdf_context: str | None = None,
+    context_bundle: dict | None = None,
+    web_results: list[dict] | None = None,
+) -> str:
+    """
+    Generate a scholarly response using Gemini 2.5 Pro.
+
+    Args:
+        query: User's question
+        intent: Classified intent (VERSE_LOOKUP, SCHOLARLY_RESEARCH, PDF_ANALYSIS)
+        ayahs_context: Current ayahs being viewed (for verse context)
+        pdf_context: Retrieved PDF chunks (for RAG answers)
+        context_bundle: Prefetched fetch_verse_bundle() result (VERSE_LOOKUP)
+        web_results: Prefetched fetch_research_results() result (SCHOLARLY_RESEARCH)
+
+    Returns:
+        Formatted response string
+    """
+    return "".join(stream_scholar_response(
+        query=query,
+        intent=intent,
+        ayahs_context=ayahs_context,
+        ayah_window=ayah_window,
+        tafseer_language=tafseer_language,
+        pdf_context=pdf_context,
+        context_bundle=context_bundle,
+        web_results=web_results,
+    ))
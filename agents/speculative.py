@@ -0,0 +1,167 @@
+"""
+Hidayah AI — Speculative Routing
+Overlaps intent classification with retrieval. classify_intent runs on a
+worker thread; if it has not answered within SPECULATIVE_GRACE_SECONDS
+(the rules and local model answer well inside that, so only router LLM
+calls are overlapped), retrieval is queued for the most likely intents. Only one speculative
+retrieval runs at a time, in rank order, so when routing answers the
+winner's result is handed to the answer generator and every loser still
+queued is cancelled before it spends anything. A loser that had already
+started runs to completion in the background and its full API cost is
+spent; its result is discarded.
+
+Each speculative retrieval draws from a sliding one-minute budget
+(SPECULATIVE_BUDGET_PER_MINUTE) when it actually starts, so a burst of
+ambiguous queries cannot multiply Tavily or embedding quota use; without
+budget, retrieval simply runs after classification as before.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable
+from utils.config import (
+    SPECULATIVE_ENABLED,
+    SPECULATIVE_GRACE_SECONDS,
+    SPECULATIVE_MAX_INTENTS,
+    SPECULATIVE_MIN_PROBABILITY,
+    SPECULATIVE_BUDGET_PER_MINUTE,
+)
+from utils.concurrency import _context_initializer
+from utils.logger import get_logger
+from agents.intent_model import INTENTS, get_intent_model
+
+log = get_logger("speculative")
+
+_launches: deque = deque()  # Monotonic times of speculative launches in the last minute
+_budget_lock = threading.Lock()
+_stats = {"queries": 0, "speculated": 0, "launched": 0, "wins": 0, "discarded": 0, "budget_skipped": 0}
+_stats_lock = threading.Lock()
+_SKIPPED = object()  # Returned by a speculative launch that did not run (routing done or no budget)
+
+
+def _count(key: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def get_speculation_stats() -> dict:
+    """Launch/win counters; wins / speculated is the share of LLM-routed queries that saved retrieval time."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _take_budget() -> bool:
+    now = time.monotonic()
+    with _budget_lock:
+        while _launches and now - _launches[0] > 60:
+            _launches.popleft()
+        if len(_launches) >= SPECULATIVE_BUDGET_PER_MINUTE:
+            return False
+        _launches.append(now)
+        return True
+
+
+def rank_candidate_intents(query: str, active_pdf_name: str | None, available) -> list[str]:
+    """Intents worth speculating on, most likely first (local model probabilities, else a PDF-first prior)."""
+    model = get_intent_model()
+    if model is not None:
+        probabilities = dict(zip(model.labels, model.predict_proba(query, bool(active_pdf_name))))
+        ranked = sorted(available, key=lambda intent: -probabilities.get(intent, 0.0))
+        ranked = [intent for intent in ranked if probabilities.get(intent, 0.0) >= SPECULATIVE_MIN_PROBABILITY]
+    else:
+        prior = ("PDF_ANALYSIS",) + INTENTS if active_pdf_name else INTENTS[::-1]
+        ranked = [intent for intent in dict.fromkeys(prior) if intent in available]
+    return ranked[:SPECULATIVE_MAX_INTENTS]
+
+
+def route_with_speculation(
+    classify: Callable[[], str],
+    retrievers: dict[str, Callable[[], Any]],
+    query: str,
+    active_pdf_name: str | None = None,
+) -> tuple[str, dict[str, Any]]:
+    """
+    Classify a query while retrieving for its likely intents.
+
+    Args:
+        classify: Zero-argument call returning the intent (e.g. a classify_intent partial)
+        retrievers: Intent → zero-argument retrieval call for that intent's answer path
+        query: User message, used to rank candidate intents
+        active_pdf_name: Name of the uploaded PDF, if any
+
+    Returns:
+        (intent, prefetched) — prefetched maps the winning intent to its
+        retrieval result when speculation covered it and succeeded, else {}
+    """
+    _count("queries")
+    if not SPECULATIVE_ENABLED or not retrievers:
+        return classify(), {}
+
+    router = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="hidayah-routing", initializer=_context_initializer()
+    )
+    # A single speculation worker keeps every queued candidate cancellable
+    pool = ThreadPoolExecutor(
+        max_workers=1,
+        thread_name_prefix="hidayah-speculative",
+        initializer=_context_initializer(),
+    )
+    try:
+        routing = router.submit(classify)
+        try:
+            return routing.result(timeout=SPECULATIVE_GRACE_SECONDS), {}
+        except FutureTimeout:
+            pass
+
+        def launch(intent: str):
+            if routing.done() or not _take_budget():
+                if not routing.done():
+                    _count("budget_skipped")
+                    log.info(f"Speculation budget exhausted; {intent} retrieval waits for routing")
+                return _SKIPPED
+            running.add(intent)
+            _count("launched")
+            return retrievers[intent]()
+
+        running = set()
+        started = time.perf_counter()
+        speculative = {
+            intent: pool.submit(launch, intent)
+            for intent in rank_candidate_intents(query, active_pdf_name, retrievers)
+        }
+        if speculative:
+            _count("speculated")
+
+        intent = routing.result()
+        routed_at = time.perf_counter() - started
+
+        for loser, future in speculative.items():
+            if loser != intent and not future.cancel() and loser in running:
+                _count("discarded")
+                log.info(f"Speculative {loser} retrieval already running; result will be discarded")
+
+        winner = speculative.get(intent)
+        if winner is None:
+            if speculative:
+                log.info(f"Speculation missed: routed to {intent} after {routed_at:.2f}s")
+            return intent, {}
+
+        try:
+            result = winner.result()
+        except Exception as e:
+            log.warning(f"Speculative {intent} retrieval failed, retrying after routing: {e}")
+            return intent, {}
+        if result is _SKIPPED:
+            return intent, {}
+        _count("wins")
+        log.info(
+            f"Speculation hit: {intent} retrieval overlapped {routed_at:.2f}s of routing "
+            f"(ready {time.perf_counter() - started:.2f}s after launch)"
+        )
+        return intent, {intent: result}
+    finally:
+        # Do not wait for a discarded loser; its thread finishes in the background
+        pool.shutdown(wait=False, cancel_futures=True)
+        router.shutdown(wait=False)
@@ -0,0 +1,6 @@
+"""
+Hidayah AI — Benchmarks
+Standalone harnesses for the performance work, run from the repository root
+with python -m benchmarks.<name>. Each stubs the upstream it measures, so no
+API key, network or real shared cache is needed unless a flag asks for it.
+"""
@@ -0,0 +1,97 @@
+"""
+Wall time for a 10-ayah context window against stubbed providers.
+
+    python -m benchmarks.context_window [request_latency_ms]
+
+Each stub sleeps like its real provider's sequential HTTP calls (three
+Quran.com requests per tafseer lookup, six sunnah.com requests per hadith
+search), so the per-ayah loop is compared with the window builder. Also
+checks that both return the same evidence and that the order is stable.
+"""
+
+import sys
+import threading
+import time
+from unittest import mock
+from agents import context_retriever
+from agents.context_retriever import get_context_bundle_for_ayah, get_context_bundle_for_window
+from utils.config import CONTEXT_PROVIDER_CONCURRENCY
+
+
+class StubProviders:
+    """Sleeping stand-ins for the tafseer and hadith providers, tracking peak concurrency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = {"tafsir": 0, "hadith": 0}
+        self.peak = dict(self.in_flight)
+        self._lock = threading.Lock()
+
+    def _call(self, provider: str, requests: int, result):
+        with self._lock:
+            self.in_flight[provider] += 1
+            self.peak[provider] = max(self.peak[provider], self.in_flight[provider])
+        time.sleep(self.latency * requests)
+        with self._lock:
+            self.in_flight[provider] -= 1
+        return result
+
+    def tafseer(self, surah_number, ayah_number, **_):
+        return self._call("tafsir", 3, [
+            {"citation_id": f"tafsir:{source}:{surah_number}:{ayah_number}", "source": source}
+            for source in ("ibn-kathir", "maarif", "jalalayn")
+        ])
+
+    def hadith(self, ayah_number, **_):
+        return self._call("hadith", 6, [{"citation_id": f"hadith:bukhari:{ayah_number * 10 + i}"} for i in range(3)])
+
+    def patch(self):
+        # Page prefetch is a no-op here (the per-ayah stubs carry the latency); no
+        # precomputed relatedness, so every hadith lookup takes the search path
+        def tafseer(**kwargs):
+            return self.tafseer(**kwargs)
+
+        tafseer.cached = lambda **_: None  # Cold shared cache: every ayah reaches the provider
+        return mock.patch.multiple(
+            context_retriever,
+            fetch_multisource_tafseer_for_ayah=tafseer,
+            fetch_related_hadith=self.hadith,
+            prefetch_tafseer_for_page=lambda **_: None,
+            related_hadith_for_ayah=lambda *_: None,
+        )
+
+
+def main(argv: list[str]) -> int:
+    latency = (float(argv[0]) if argv else 50.0) / 1000
+    stubs = StubProviders(latency)
+    window = [
+        {"number": 8 + i, "surah_number": 2, "number_in_surah": 1 + i, "page": 2, "english": f"ayah {i}", "surah_name": "Al-Baqarah"}
+        for i in range(10)
+    ]
+
+    with stubs.patch():
+        started = time.perf_counter()
+        per_ayah = {f"{a['surah_number']}:{a['number_in_surah']}": get_context_bundle_for_ayah(a) for a in window}
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        bundle = get_context_bundle_for_window(window)
+        concurrent = time.perf_counter() - started
+        repeat = get_context_bundle_for_window(window)
+
+    same = all(
+        bundle["tafsir_by_ayah"][ref] == per_ayah[ref]["tafsir_sources"]
+        and bundle["hadith_by_ayah"][ref] == per_ayah[ref]["hadith"]
+        for ref in per_ayah
+    )
+    peak, limits = stubs.peak, CONTEXT_PROVIDER_CONCURRENCY
+    print(f"10-ayah window, {latency * 1000:.0f}ms per upstream request")
+    print(f"per-ayah loop   {sequential:.2f}s")
+    print(f"window builder  {concurrent:.2f}s  ({sequential / concurrent:.1f}× faster)")
+    print(f"peak in flight  tafsir {peak['tafsir']}/{limits['tafsir']}, hadith {peak['hadith']}/{limits['hadith']}")
+    print(f"same evidence as the loop: {same}; deterministic order: {bundle == repeat}; citations {len(bundle['citations'])}")
+    return 0 if same and bundle == repeat else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
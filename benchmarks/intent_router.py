@@ -0,0 +1,58 @@
+"""
+Accuracy and latency of the local intent model, optionally against the router LLM.
+
+    python -m benchmarks.intent_router data/intent_model/eval_queries.jsonl [--llm]
+
+Uses the served model (INTENT_MODEL_VERSION). --llm also classifies every
+example with the router LLM, which needs GEMINI_API_KEY and spends quota.
+"""
+
+import sys
+import time
+import numpy as np
+from agents.intent_model import evaluate, get_intent_model, load_examples
+from utils.config import INTENT_MODEL_DIR, INTENT_MODEL_THRESHOLD, INTENT_MODEL_VERSION
+
+
+def _percentile_ms(latencies: list[float], q: float) -> float:
+    return float(np.percentile(latencies, q)) * 1000 if latencies else 0.0
+
+
+def main(argv: list[str]) -> int:
+    paths = [a for a in argv if not a.startswith("--")]
+    if not paths:
+        raise SystemExit(__doc__)
+    examples = load_examples(paths[:1])
+    model = get_intent_model()
+    if model is None:
+        raise SystemExit(f"No intent model v{INTENT_MODEL_VERSION} in {INTENT_MODEL_DIR}")
+
+    result = evaluate(model, examples, INTENT_MODEL_THRESHOLD)
+    print(f"{'router':<18} {'accuracy':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    print(
+        f"{'local model':<18} {result['accuracy']:>9.1%} "
+        f"{_percentile_ms(result['latencies'], 50):>9.3f} {_percentile_ms(result['latencies'], 95):>9.3f}"
+    )
+    print(
+        f"  at threshold {INTENT_MODEL_THRESHOLD}: answers {result['coverage']:.0%} of queries "
+        f"with {result['confident_accuracy']:.1%} accuracy; the rest go to the LLM"
+    )
+
+    if "--llm" in argv:
+        from agents.router import _classify_with_llm
+
+        correct, latencies = 0, []
+        for example in examples:
+            started = time.perf_counter()
+            intent = _classify_with_llm(example["query"], "document.pdf" if example["pdf_active"] else None)
+            latencies.append(time.perf_counter() - started)
+            correct += intent == example["intent"]
+        print(
+            f"{'router LLM':<18} {correct / max(1, len(examples)):>9.1%} "
+            f"{_percentile_ms(latencies, 50):>9.1f} {_percentile_ms(latencies, 95):>9.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
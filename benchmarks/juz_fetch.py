@@ -0,0 +1,99 @@
+"""
+Juz load latency against a local AlQuran.cloud stub.
+
+    python -m benchmarks.juz_fetch [latency_ms] [juz_per_mode] [failing_edition]
+
+Compares the old sequential five-edition fetch with fetch_juz_remote's
+concurrent one, on distinct Juz numbers so no cache layer is hit. A failing
+edition answers 503 to show the merge degrading to empty fields.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(latency: float, failing: str | None):
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")  # juz/<n>/<edition>
+            time.sleep(latency)
+            if len(parts) != 3 or parts[0] != "juz" or parts[2] == failing:
+                self.send_error(503)
+                return
+            juz, edition = int(parts[1]), parts[2]
+            ayahs = [
+                {
+                    "number": juz * 1000 + i,
+                    "numberInSurah": i,
+                    "text": f"{edition} text {i}",
+                    "audio": f"https://cdn.example/{edition}/{i}.mp3",
+                    "surah": {"number": juz, "englishName": f"Surah {juz}", "englishNameTranslation": "", "name": ""},
+                    "page": juz,
+                    "juz": juz,
+                }
+                for i in range(1, 151)
+            ]
+            body = json.dumps({"code": 200, "data": {"ayahs": ayahs}}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return StubHandler
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def _summary(samples: list[float]) -> str:
+    samples = sorted(samples)
+    return f"median {samples[len(samples) // 2] * 1000:.0f}ms  max {samples[-1] * 1000:.0f}ms"
+
+
+def main(argv: list[str]) -> int:
+    latency = (float(argv[0]) if argv else 150.0) / 1000
+    rounds = min(int(argv[1]) if len(argv) > 1 else 5, 15)
+    failing = argv[2] if len(argv) > 2 else None
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency, failing))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Read by utils.config at import: point the client at the stub and keep
+    # the real shared cache out of it
+    os.environ["QURAN_API_BASE"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SHARED_CACHE_BACKEND"] = "memory"
+    from utils.config import ARABIC_EDITION, ENGLISH_EDITION, URDU_EDITION, ENGLISH_AUDIO_EDITION, URDU_AUDIO_EDITION
+    from utils.quran_api import _fetch_juz_edition, fetch_juz_remote
+
+    editions = [ARABIC_EDITION, ENGLISH_EDITION, URDU_EDITION, ENGLISH_AUDIO_EDITION, URDU_AUDIO_EDITION]
+    sequential = [
+        _timed(lambda juz=juz: [_fetch_juz_edition(juz, edition) for edition in editions])
+        for juz in range(1, rounds + 1)
+    ]
+    concurrent = [_timed(lambda juz=juz: fetch_juz_remote(juz)) for juz in range(rounds + 1, 2 * rounds + 1)]
+    merged = fetch_juz_remote(2 * rounds + 1)
+    server.shutdown()
+
+    print(f"stub latency {latency * 1000:.0f}ms per request, {rounds} cold Juz loads per mode")
+    print(f"sequential  {_summary(sequential)}")
+    print(f"concurrent  {_summary(concurrent)}")
+    print(
+        f"merged {len(merged)} ayahs; english {'ok' if merged and merged[0]['english'] else 'missing'}, "
+        f"urdu {'ok' if merged and merged[0]['urdu'] else 'missing'}"
+        + (f" (edition {failing} failing)" if failing else "")
+    )
+    return 0 if merged else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
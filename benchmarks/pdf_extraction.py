@@ -0,0 +1,89 @@
+"""
+PDF text extraction: serial vs the process pool, on synthetic documents.
+
+    python -m benchmarks.pdf_extraction [pages ...]
+
+The pool uses up to PDF_PARALLEL_MAX_WORKERS processes, capped by the CPU
+count, so it only pays off on multi-core hosts. Both paths must return the
+same pages in the same order.
+"""
+
+import io
+import os
+import sys
+import time
+from PyPDF2 import PdfReader
+from utils.config import PDF_PARALLEL_MAX_WORKERS, PDF_PARALLEL_SHARD_PAGES
+from rag.pdf_loader import _iter_pages_parallel
+
+
+def synthetic_pdf(pages: int, lines_per_page: int = 45) -> bytes:
+    """Build an uncompressed multi-page text PDF (Helvetica, no dependencies)."""
+    words = "mercy prayer fasting charity patience knowledge faith justice scholar chapter verse".split()
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        lines = [
+            " ".join(words[(page * 7 + line * 3 + i) % len(words)] for i in range(12)) + f" {page + 1}.{line}"
+            for line in range(lines_per_page)
+        ]
+        text = "".join(f"({line}) Tj 0 -15 Td " for line in lines)
+        stream = f"BT /F1 10 Tf 40 780 Td {text}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def extract_serial(pdf_bytes: bytes) -> list[tuple[int, str]]:
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    pages = ((number, page.extract_text().strip()) for number, page in enumerate(reader.pages, start=1))
+    return [(number, text) for number, text in pages if text]
+
+
+def extract_parallel(pdf_bytes: bytes) -> list[tuple[int, str]]:
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    return list(_iter_pages_parallel(io.BytesIO(pdf_bytes), reader, len(reader.pages)))
+
+
+def main(argv: list[str]) -> int:
+    sizes = [int(arg) for arg in argv] or [300, 600]
+    print(f"{os.cpu_count()} CPUs, up to {PDF_PARALLEL_MAX_WORKERS} workers, {PDF_PARALLEL_SHARD_PAGES}-page shards")
+    identical = True
+    for size in sizes:
+        pdf_bytes = synthetic_pdf(size)
+
+        started = time.perf_counter()
+        serial = extract_serial(pdf_bytes)
+        serial_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        parallel = extract_parallel(pdf_bytes)
+        parallel_seconds = time.perf_counter() - started
+
+        identical &= parallel == serial
+        print(
+            f"{size:>5} pages ({len(pdf_bytes) / 1e6:.1f} MB): serial {serial_seconds:.2f}s, "
+            f"process pool {parallel_seconds:.2f}s ({serial_seconds / parallel_seconds:.1f}×), "
+            f"identical output: {parallel == serial}"
+        )
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
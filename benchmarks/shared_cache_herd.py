@@ -0,0 +1,60 @@
+"""
+Shared cache stampede test: N processes miss the same key at once.
+
+    python -m benchmarks.shared_cache_herd [backend] [processes]
+
+Every process starts (spawn) with SHARED_CACHE_BACKEND set to the backend
+under test and calls the same cached function at the same instant; exactly
+one upstream fetch is expected, and every process must get the value.
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _use_backend(name: str) -> None:
+    os.environ["SHARED_CACHE_BACKEND"] = name  # Read by utils.config on first import in this process
+
+
+def herd_member(run_id: str, start_at: float) -> tuple[bool, bool]:
+    """Call the cached fake fetch at start_at; return (fetched upstream, value correct)."""
+    from utils.shared_cache import shared_cache
+
+    fetched = []
+
+    @shared_cache("juz")
+    def fake_fetch(run: str, juz_number: int) -> dict:
+        fetched.append(juz_number)
+        time.sleep(0.3)  # Upstream latency
+        return {"juz": juz_number, "ayahs": ["x" * 200] * 50}
+
+    time.sleep(max(0.0, start_at - time.time()))
+    value = fake_fetch(run_id, 1)
+    return bool(fetched), value["juz"] == 1
+
+
+def main(argv: list[str]) -> int:
+    backend_name = argv[0] if argv else os.getenv("SHARED_CACHE_BACKEND", "disk")
+    processes = int(argv[1]) if len(argv) > 1 else 8
+    run_id = uuid.uuid4().hex[:8]
+
+    start_at = time.time() + 2.0  # Past every worker's spawn and imports
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_use_backend,
+        initargs=(backend_name,),
+    ) as pool:
+        results = list(pool.map(herd_member, [run_id] * processes, [start_at] * processes))
+    upstream = sum(fetched for fetched, _ in results)
+    correct = all(ok for _, ok in results)
+    print(f"{backend_name}: {processes} processes → {upstream} upstream fetch(es), all correct: {correct}")
+    return 0 if upstream == 1 and correct else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,160 @@
+"""
+sunnah.com stub server and the corpus ingest replay against it.
+
+Serves GET /hadiths?collection=&limit=&page= from fixture data
+(data/fixtures/sunnah_hadiths.json) in the sunnah.com response shape, so the
+hadith corpus ingest can be exercised without an API key or network.
+
+Each collection starts with only its first `visible` items published;
+publish() reveals more, as when upstream appends hadith. Every request is
+counted per (collection, page).
+
+Serve:   python -m benchmarks.sunnah_ingest --serve [port]
+         (then: python -m utils.hadith_corpus --base-url http://127.0.0.1:<port>)
+Check:   python -m benchmarks.sunnah_ingest
+         ingest → no-op refresh → delta refresh into a temporary corpus,
+         printing what was written and which pages were fetched
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from utils.config import _APP_DIR
+
+FIXTURE_PATH = _APP_DIR / "data" / "fixtures" / "sunnah_hadiths.json"
+
+
+class SunnahStub:
+    """Threaded HTTP server publishing a prefix of each fixture collection."""
+
+    def __init__(self, fixture_path=FIXTURE_PATH, visible: dict[str, int] | None = None, port: int = 0):
+        with open(fixture_path, encoding="utf-8") as f:
+            self.collections: dict[str, list[dict]] = json.load(f)["collections"]
+        self.visible = {name: len(items) for name, items in self.collections.items()}
+        self.visible.update(visible or {})
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, name="sunnah-stub", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def publish(self, collection: str, count: int) -> None:
+        """Make the first `count` fixture items of a collection visible upstream."""
+        with self._lock:
+            self.visible[collection] = min(count, len(self.collections[collection]))
+
+    def page(self, collection: str, limit: int, page: int) -> dict:
+        with self._lock:
+            self.requests[(collection, page)] += 1
+            items = self.collections.get(collection, [])[:self.visible.get(collection, 0)]
+        return {
+            "data": items[(page - 1) * limit:page * limit],
+            "total": len(items),
+            "limit": limit,
+            "previous": page - 1 if page > 1 else None,
+            "next": page + 1 if page * limit < len(items) else None,
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.rstrip("/").split("/")[-1] != "hadiths":
+                    self.send_error(404)
+                    return
+                query = parse_qs(url.query)
+                try:
+                    collection = query["collection"][0]
+                    limit = int(query.get("limit", ["50"])[0])
+                    page = int(query.get("page", ["1"])[0])
+                except (KeyError, ValueError):
+                    self.send_error(400)
+                    return
+                body = json.dumps(stub.page(collection, limit, page), ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self) -> "SunnahStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _pages(requests: Counter) -> dict[str, list[int]]:
+    pages: dict[str, list[int]] = {}
+    for collection, page in sorted(requests):
+        pages.setdefault(collection, []).append(page)
+    return pages
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+
+    if "--serve" in sys.argv:
+        position = sys.argv.index("--serve")
+        port = int(sys.argv[position + 1]) if len(sys.argv) > position + 1 else 8765
+        stub = SunnahStub(port=port).start()
+        print(f"Serving {FIXTURE_PATH.name} at {stub.base_url}/hadiths (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            stub.stop()
+        raise SystemExit(0)
+
+    from utils import hadith_corpus
+
+    page_size = 5
+    stub = SunnahStub(visible={"bukhari": 16, "abudawud": 17}).start()
+    names = list(stub.collections)
+    path = os.path.join(tempfile.mkdtemp(prefix="hidayah-stub-"), "hadith.sqlite3")
+    failures = []
+
+    def run(step: str, expect_pages: dict[str, list[int]]) -> dict[str, int]:
+        stub.requests.clear()
+        written = hadith_corpus.ingest(names, base_url=stub.base_url, api_key=None, path=path, page_size=page_size)
+        pages = _pages(stub.requests)
+        print(f"{step:<14} written {written}  pages fetched {pages}")
+        if pages != expect_pages:
+            failures.append(f"{step}: expected pages {expect_pages}")
+        return written
+
+    try:
+        # Fixture items 7, 14, 21 have no body, so stored rows never equal the upstream total
+        run("initial", {"bukhari": [1, 2, 3, 4], "abudawud": [1, 2, 3, 4]})
+        run("no-op", {"bukhari": [1], "abudawud": [1]})
+        stub.publish("bukhari", 23)
+        run("delta", {"bukhari": [1, 4, 5], "abudawud": [1]})  # Page 4 re-reads item 16, then 17–23
+        conn = hadith_corpus._connect(path)
+        stored = dict(conn.execute("SELECT collection, count(*) FROM hadith GROUP BY collection").fetchall())
+        conn.close()
+        print(f"{'stored rows':<14} {stored}")
+        if stored != {"bukhari": 20, "abudawud": 15}:
+            failures.append("stored rows: expected every fixture item with a body (bukhari 20, abudawud 15)")
+    finally:
+        stub.stop()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    raise SystemExit(1 if failures else 0)
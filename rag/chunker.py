@@ -0,0 +1,236 @@
+"""
+Hidayah AI — Structure-Aware Chunker
+Splits extracted PDF pages into token-budgeted chunks that break at headings
+and sentence boundaries, and records where each chunk came from.
+
+Chunk metadata is kept in a ChunkTable of parallel arrays (page span, char
+offsets into the page-joined document text, heading path, token count)
+aligned with the chunk list and the FAISS index ids.
+"""
+
+import math
+import re
+from array import array
+from typing import Iterable, Iterator
+import numpy as np
+from utils.config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHARS_PER_TOKEN
+
+_PAGE_SEPARATOR = "\n\n"  # Pages are joined with a blank line when computing char offsets
+_SENTENCE = re.compile(r"\S[^.!?؟۔]*(?:[.!?؟۔]+|$)")
+_NUMBERED_HEADING = re.compile(r"^(\d+(?:\.\d+)*)\.?\s+\S")
+_NAMED_HEADING = re.compile(r"^(chapter|part|book|section|kitab|bab)\b", re.IGNORECASE)
+_HEADING_MAX_CHARS = 80
+_HEADING_MAX_WORDS = 10
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate model token count (no tokenizer round-trip)."""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN)) if text else 0
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split text into sentences (Latin, Arabic and Urdu terminators)."""
+    return [match.group().strip() for match in _SENTENCE.finditer(text)]
+
+
+def _heading_level(line: str) -> int:
+    """Return a heading level (1 = top) for a likely heading line, or 0 for body text."""
+    if len(line) > _HEADING_MAX_CHARS or len(line.split()) > _HEADING_MAX_WORDS:
+        return 0
+    if line.endswith((".", ",", ";", ":", "?", "!")):
+        return 0
+    if _NAMED_HEADING.match(line):
+        return 1
+    numbered = _NUMBERED_HEADING.match(line)
+    if numbered and not line[numbered.end() - 1].isdigit():
+        return min(numbered.group(1).count(".") + 1, 3)
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and all(c.isupper() for c in letters):
+        return 1
+    return 0
+
+
+class ChunkTable:
+    """Per-chunk metadata as parallel arrays; heading paths are interned."""
+
+    def __init__(self):
+        self.page_start = array("i")
+        self.page_end = array("i")
+        self.char_start = array("q")
+        self.char_end = array("q")
+        self.tokens = array("i")
+        self.heading_id = array("i")
+        self.heading_paths: list[str] = []
+        self._heading_lookup: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def append(self, page_start: int, page_end: int, char_start: int, char_end: int, heading: str, tokens: int) -> None:
+        heading_id = self._heading_lookup.get(heading)
+        if heading_id is None:
+            heading_id = self._heading_lookup[heading] = len(self.heading_paths)
+            self.heading_paths.append(heading)
+        self.page_start.append(page_start)
+        self.page_end.append(page_end)
+        self.char_start.append(char_start)
+        self.char_end.append(char_end)
+        self.tokens.append(tokens)
+        self.heading_id.append(heading_id)
+
+    def extend(self, records: list[tuple]) -> None:
+        for record in records:
+            self.append(*record)
+
+    def heading(self, i: int) -> str:
+        return self.heading_paths[self.heading_id[i]]
+
+    def label(self, i: int) -> str:
+        """Citation label such as "pp. 3–4 · Chapter 2 › Fasting"."""
+        start, end = self.page_start[i], self.page_end[i]
+        pages = f"p. {start}" if start == end else f"pp. {start}–{end}"
+        heading = self.heading(i)
+        return f"{pages} · {heading}" if heading else pages
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            page_start=np.frombuffer(self.page_start, dtype=np.int32),
+            page_end=np.frombuffer(self.page_end, dtype=np.int32),
+            char_start=np.frombuffer(self.char_start, dtype=np.int64),
+            char_end=np.frombuffer(self.char_end, dtype=np.int64),
+            tokens=np.frombuffer(self.tokens, dtype=np.int32),
+            heading_id=np.frombuffer(self.heading_id, dtype=np.int32),
+            heading_paths=np.array(self.heading_paths, dtype=object),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ChunkTable":
+        data = np.load(path, allow_pickle=True)
+        table = cls()
+        table.page_start.extend(data["page_start"].tolist())
+        table.page_end.extend(data["page_end"].tolist())
+        table.char_start.extend(data["char_start"].tolist())
+        table.char_end.extend(data["char_end"].tolist())
+        table.tokens.extend(data["tokens"].tolist())
+        table.heading_id.extend(data["heading_id"].tolist())
+        table.heading_paths = [str(path) for path in data["heading_paths"]]
+        table._heading_lookup = {path: i for i, path in enumerate(table.heading_paths)}
+        return table
+
+
+def _iter_units(pages: Iterable[tuple[int, str]]) -> Iterator[tuple[int, str, int, int, int]]:
+    """Yield (heading level, text, page, char start, char end); level 0 is a body sentence."""
+    offset = 0
+    for page_number, page_text in pages:
+        line_start = 0
+        for line in page_text.split("\n"):
+            stripped = line.strip()
+            if stripped:
+                base = offset + line_start + (len(line) - len(line.lstrip()))
+                level = _heading_level(stripped)
+                if level:
+                    yield level, stripped, page_number, base, base + len(stripped)
+                else:
+                    for match in _SENTENCE.finditer(stripped):
+                        text = match.group().strip()
+                        yield 0, text, page_number, base + match.start(), base + match.start() + len(text)
+            line_start += len(line) + 1
+        offset += len(page_text) + len(_PAGE_SEPARATOR)
+
+
+def _split_oversized(unit: tuple, max_tokens: int) -> Iterator[tuple]:
+    """Split a single over-budget sentence into word runs that fit the budget."""
+    level, text, page, start, _ = unit
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    piece: list[str] = []
+    piece_chars = 0
+    piece_start = cursor = start
+    for word in text.split():
+        word_start = text.find(word, cursor - start) + start
+        if piece and piece_chars + 1 + len(word) > max_chars:
+            yield level, " ".join(piece), page, piece_start, cursor
+            piece, piece_chars, piece_start = [], 0, word_start
+        piece_chars += (1 if piece else 0) + len(word)
+        piece.append(word)
+        cursor = word_start + len(word)
+    if piece:
+        yield level, " ".join(piece), page, piece_start, cursor
+
+
+def iter_structured_chunks(
+    pages: Iterable[tuple[int, str]],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> Iterator[tuple[str, tuple]]:
+    """
+    Stream chunks with their metadata records.
+
+    Chunks are packed from whole sentences up to max_tokens, always start
+    a new chunk at a heading (no overlap across sections), and otherwise
+    repeat the trailing sentences (up to overlap_tokens) of the previous
+    chunk for continuity.
+
+    Args:
+        pages: (page_number, text) pairs in document order, e.g. iter_pdf_pages()
+        max_tokens: Token budget per chunk
+        overlap_tokens: Token budget carried over between neighbouring chunks
+
+    Yields:
+        (chunk text, (page_start, page_end, char_start, char_end, heading_path, tokens))
+    """
+    headings: list[tuple[int, str]] = []  # (level, text) stack
+    current: list[tuple] = []
+    current_chars = 0  # len(" ".join(texts in current))
+    fresh = 0  # Units in current not carried over from the previous chunk
+
+    def joined_tokens(chars: int) -> int:
+        return math.ceil(chars / CHARS_PER_TOKEN)
+
+    def emit():
+        text = " ".join(unit[1] for unit in current)
+        heading_path = " › ".join(title for _, title in headings)
+        record = (current[0][2], current[-1][2], current[0][3], current[-1][4], heading_path, estimate_tokens(text))
+        return text, record
+
+    for unit in _iter_units(pages):
+        level = unit[0]
+        if level:
+            if fresh and any(not u[0] for u in current):
+                yield emit()
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, unit[1]))
+            current, current_chars, fresh = [unit], len(unit[1]), 1
+            continue
+
+        units = [unit] if estimate_tokens(unit[1]) <= max_tokens else list(_split_oversized(unit, max_tokens))
+        for piece in units:
+            if current and fresh and joined_tokens(current_chars + 1 + len(piece[1])) > max_tokens:
+                yield emit()
+                carried: list[tuple] = []
+                carried_chars = -1
+                for prior in reversed(current):
+                    if prior[0] or joined_tokens(carried_chars + 1 + len(prior[1])) > overlap_tokens:
+                        break
+                    carried.insert(0, prior)
+                    carried_chars += 1 + len(prior[1])
+                if carried and joined_tokens(carried_chars + 1 + len(piece[1])) > max_tokens:
+                    carried, carried_chars = [], -1
+                current, current_chars, fresh = carried, max(carried_chars, 0), 0
+            current_chars += (1 if current else 0) + len(piece[1])
+            current.append(piece)
+            fresh += 1
+
+    if fresh and current:
+        yield emit()
+
+
+def chunk_pages(pages: Iterable[tuple[int, str]], **kwargs) -> tuple[list[str], ChunkTable]:
+    """Chunk a whole document into (chunk texts, aligned ChunkTable)."""
+    texts: list[str] = []
+    table = ChunkTable()
+    for text, record in iter_structured_chunks(pages, **kwargs):
+        texts.append(text)
+        table.append(*record)
+    return texts, table
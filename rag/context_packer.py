@@ -0,0 +1,212 @@
+"""
+Hidayah AI — RAG Context Packer
+Turns retrieved chunks into the smallest prompt context that still answers
+the question: overlapping windows are deduplicated, the remainder is
+re-ordered for diversity with MMR, and each chunk is trimmed to the
+sentences around query matches until RAG_CONTEXT_TOKEN_BUDGET is used.
+"""
+
+import numpy as np
+from utils.config import (
+    CHARS_PER_TOKEN,
+    RAG_CONTEXT_TOKEN_BUDGET,
+    RAG_MMR_LAMBDA,
+    RAG_DUPLICATE_OVERLAP,
+    RAG_SENTENCE_WINDOW,
+)
+from utils.logger import get_logger
+from rag.chunker import estimate_tokens, split_sentences
+from rag.lexical_index import tokenize
+
+log = get_logger("context_packer")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does did for from how i in is it its me my of on or "
+    "say says said tell than that the their them then there these this those to was were "
+    "what when where which who whom why will with would you your about explain describe "
+    "document pdf author according".split()
+)
+
+
+def _query_terms(query: str) -> set[str]:
+    return {term for term in tokenize(query) if term not in _STOPWORDS}
+
+
+def _overlap(span: tuple[int, int], other: tuple[int, int]) -> float:
+    """Fraction of span covered by other."""
+    covered = min(span[1], other[1]) - max(span[0], other[0])
+    return max(0, covered) / max(1, span[1] - span[0])
+
+
+def _shingles(text: str, size: int = 5) -> set[tuple[str, ...]]:
+    words = tokenize(text)
+    return {tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _dedupe(chunk_ids: list[int], chunks: list[str], chunk_meta) -> list[int]:
+    """Drop chunks largely covered by a better-ranked one (char spans, or word shingles without metadata)."""
+    kept: list[int] = []
+    spans: list[tuple[int, int]] = []
+    shingle_sets: list[set] = []
+    for chunk_id in chunk_ids:
+        if chunk_meta is not None and chunk_id < len(chunk_meta):
+            span = (chunk_meta.char_start[chunk_id], chunk_meta.char_end[chunk_id])
+            if any(_overlap(span, other) >= RAG_DUPLICATE_OVERLAP for other in spans):
+                continue
+            spans.append(span)
+        else:
+            shingles = _shingles(chunks[chunk_id])
+            if any(len(shingles & other) / max(1, len(shingles)) >= RAG_DUPLICATE_OVERLAP for other in shingle_sets):
+                continue
+            shingle_sets.append(shingles)
+        kept.append(chunk_id)
+    return kept
+
+
+def _chunk_vectors(index, chunk_ids: list[int], chunks: list[str]) -> np.ndarray:
+    """Normalized vectors for MMR: stored FAISS vectors when reconstructable, else term counts."""
+    try:
+        vectors = np.vstack([index.reconstruct(int(chunk_id)) for chunk_id in chunk_ids])
+    except Exception:
+        vocabulary: dict[str, int] = {}
+        rows = [tokenize(chunks[chunk_id]) for chunk_id in chunk_ids]
+        for row in rows:
+            for term in row:
+                vocabulary.setdefault(term, len(vocabulary))
+        vectors = np.zeros((len(rows), max(1, len(vocabulary))), dtype=np.float32)
+        for i, row in enumerate(rows):
+            for term in row:
+                vectors[i, vocabulary[term]] += 1
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _mmr_order(chunk_ids: list[int], vectors: np.ndarray) -> list[int]:
+    """Maximal marginal relevance over a relevance-ranked list (rank gives relevance)."""
+    relevance = 1.0 / (1.0 + np.arange(len(chunk_ids)))
+    similarity = vectors @ vectors.T
+    remaining = list(range(len(chunk_ids)))
+    order: list[int] = []
+    while remaining:
+        if order:
+            redundancy = similarity[np.ix_(remaining, order)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = RAG_MMR_LAMBDA * relevance[remaining] - (1 - RAG_MMR_LAMBDA) * redundancy
+        best = remaining[int(np.argmax(scores))]
+        order.append(best)
+        remaining.remove(best)
+    return [chunk_ids[i] for i in order]
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut text to max_tokens at a word boundary, marking the cut with an ellipsis."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(0, max_tokens * CHARS_PER_TOKEN - 2)
+    cut = text[:max_chars]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return f"{cut.rstrip()} …" if cut.strip() else ""
+
+
+def _trim(text: str, terms: set[str], max_tokens: int) -> str:
+    """Keep the sentences matching query terms (± RAG_SENTENCE_WINDOW), in order, within max_tokens."""
+    sentences = split_sentences(text)
+    if estimate_tokens(text) <= max_tokens and not terms:
+        return text
+
+    matches = [i for i, sentence in enumerate(sentences) if terms & set(tokenize(sentence))]
+    if matches:
+        keep = sorted({
+            j
+            for i in matches
+            for j in range(max(0, i - RAG_SENTENCE_WINDOW), min(len(sentences), i + RAG_SENTENCE_WINDOW + 1))
+        })
+    else:
+        # Semantic-only match: keep the lead sentences, at half the allowance
+        keep = list(range(len(sentences)))
+        max_tokens //= 2
+
+    parts: list[str] = []
+    used = 0
+    previous = None
+    for i in keep:
+        piece = sentences[i] if previous is None or i == previous + 1 else f"… {sentences[i]}"
+        cost = estimate_tokens(piece) + 1
+        if used + cost > max_tokens:
+            # Unpunctuated or very long sentence: keep what fits rather than nothing
+            piece = _truncate(piece, max_tokens - used - 1)
+            if piece:
+                parts.append(piece)
+            break
+        parts.append(piece)
+        used += cost
+        previous = i
+    return " ".join(parts)
+
+
+def pack_context(
+    query: str,
+    chunk_ids: list[int],
+    chunks: list[str],
+    index=None,
+    chunk_meta=None,
+    max_chunks: int = 5,
+    token_budget: int = RAG_CONTEXT_TOKEN_BUDGET,
+) -> list[tuple[int, str]]:
+    """
+    Select and trim retrieved chunks to fit a token budget.
+
+    Args:
+        query: User question
+        chunk_ids: Retrieved chunk ids, best first
+        chunks: All chunk texts
+        index: FAISS index the ids came from (vectors reused for MMR when available)
+        chunk_meta: ChunkTable aligned with chunks, for span-based deduplication
+        max_chunks: Maximum chunks in the packed context
+        token_budget: Maximum estimated tokens across packed chunk texts
+
+    Returns:
+        (chunk id, packed text) pairs in MMR order
+    """
+    if not chunk_ids:
+        return []
+
+    baseline = sum(estimate_tokens(chunks[chunk_id]) for chunk_id in chunk_ids[:max_chunks])
+    candidates = _dedupe(chunk_ids, chunks, chunk_meta)
+    if len(candidates) > 1:
+        candidates = _mmr_order(candidates, _chunk_vectors(index, candidates, chunks))
+    candidates = candidates[:max_chunks]
+
+    terms = _query_terms(query)
+    share = max(1, token_budget // len(candidates))
+    packed: list[tuple[int, str]] = []
+    used = 0
+    for position, chunk_id in enumerate(candidates):
+        remaining = token_budget - used
+        if remaining <= 0:
+            break
+        # Early chunks may borrow budget that later chunks would not need, but leave
+        # each later chunk at least half a share so none is squeezed out entirely
+        reserved = (len(candidates) - position - 1) * (share // 2)
+        allowance = remaining if position == len(candidates) - 1 else min(share * 2, max(1, remaining - reserved))
+        text = _trim(chunks[chunk_id], terms, allowance)
+        if not text:
+            continue
+        packed.append((chunk_id, text))
+        used += estimate_tokens(text)
+
+    if not packed:
+        # Never hand the model an empty context when chunks were retrieved
+        text = _truncate(chunks[candidates[0]], token_budget)
+        if text:
+            packed.append((candidates[0], text))
+            used = estimate_tokens(text)
+
+    log.info(
+        f"Packed {len(packed)}/{len(chunk_ids)} chunks: {used} tokens "
+        f"(vs {baseline} untrimmed top-{max_chunks}, saved {max(0, baseline - used)})"
+    )
+    return packed
@@ -0,0 +1,201 @@
+"""
+Hidayah AI — Persistent Document Store
+Saves each indexed PDF (FAISS index + chunks + embeddings) on disk under
+the SHA-256 of the PDF bytes, so reruns, new sessions and server restarts
+can reattach an existing index instead of re-extracting and re-embedding.
+
+Layout (under DOC_STORE_DIR/<hash>/):
+  index.faiss     — faiss.write_index output, memory-mapped on load
+  chunks.json     — chunk texts aligned with index ids
+  chunk_meta.npz  — ChunkTable parallel arrays (pages, offsets, headings, tokens)
+  lexical.npz     — BM25 postings and document lengths (LexicalIndex)
+  embeddings.npy  — raw float32 embeddings (loaded with mmap_mode="r")
+  meta.json       — name, chunk count, size, created / last_used
+
+Documents beyond DOC_STORE_MAX_BYTES are evicted least-recently-used first.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from utils.config import DOC_STORE_DIR, DOC_STORE_MAX_BYTES
+from utils.logger import get_logger
+from rag.chunker import ChunkTable
+from rag.lexical_index import LexicalIndex
+
+log = get_logger("doc_store")
+
+_INDEX_FILE = "index.faiss"
+_CHUNKS_FILE = "chunks.json"
+_CHUNK_META_FILE = "chunk_meta.npz"
+_LEXICAL_FILE = "lexical.npz"
+_EMBEDDINGS_FILE = "embeddings.npy"
+_META_FILE = "meta.json"
+
+_store_lock = threading.Lock()
+
+
+def pdf_content_hash(pdf_file) -> str:
+    """SHA-256 of an uploaded PDF's bytes (file position is restored)."""
+    if hasattr(pdf_file, "getvalue"):
+        data = pdf_file.getvalue()
+    else:
+        position = pdf_file.tell()
+        pdf_file.seek(0)
+        data = pdf_file.read()
+        pdf_file.seek(position)
+    return hashlib.sha256(data).hexdigest()
+
+
+def _doc_dir(doc_hash: str) -> str:
+    return os.path.join(DOC_STORE_DIR, doc_hash)
+
+
+def _dir_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for name in os.listdir(path)
+        if os.path.isfile(os.path.join(path, name))
+    )
+
+
+def _read_meta(path: str) -> dict:
+    try:
+        with open(os.path.join(path, _META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(path: str, meta: dict) -> None:
+    tmp_path = os.path.join(path, f"{_META_FILE}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(path, _META_FILE))
+
+
+def has_document(doc_hash: str) -> bool:
+    return bool(doc_hash) and os.path.exists(os.path.join(_doc_dir(doc_hash), _META_FILE))
+
+
+def save_document(
+    doc_hash: str,
+    name: str,
+    index,
+    chunks: list[str],
+    embeddings: np.ndarray | None,
+    chunk_meta: ChunkTable | None = None,
+    lexical_index: LexicalIndex | None = None,
+) -> bool:
+    """Persist an index, its chunk table and BM25 index. Returns False (and logs) on failure."""
+    try:
+        import faiss
+
+        os.makedirs(DOC_STORE_DIR, exist_ok=True)
+        final_dir = _doc_dir(doc_hash)
+        tmp_dir = f"{final_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        faiss.write_index(index, os.path.join(tmp_dir, _INDEX_FILE))
+        with open(os.path.join(tmp_dir, _CHUNKS_FILE), "w", encoding="utf-8") as f:
+            json.dump(chunks, f, ensure_ascii=False)
+        if embeddings is not None:
+            np.save(os.path.join(tmp_dir, _EMBEDDINGS_FILE), np.asarray(embeddings, dtype=np.float32))
+        if chunk_meta is not None:
+            chunk_meta.save(os.path.join(tmp_dir, _CHUNK_META_FILE))
+        if lexical_index is not None:
+            lexical_index.save(os.path.join(tmp_dir, _LEXICAL_FILE))
+
+        now = time.time()
+        _write_meta(tmp_dir, {
+            "name": name,
+            "chunks": len(chunks),
+            "bytes": _dir_size(tmp_dir),
+            "created": now,
+            "last_used": now,
+        })
+
+        with _store_lock:
+            shutil.rmtree(final_dir, ignore_errors=True)
+            os.replace(tmp_dir, final_dir)
+            _evict_locked(keep=doc_hash)
+        log.info(f"Saved document {name} ({doc_hash[:12]}, {len(chunks)} chunks)")
+        return True
+    except Exception as e:
+        log.warning(f"Failed to persist document {name}: {e}")
+        return False
+
+
+def load_document(doc_hash: str):
+    """
+    Reattach a stored document.
+
+    Returns:
+        (index, chunks, embeddings, chunk_meta, lexical_index, name) or None if
+        absent/unreadable. The index is memory-mapped read-only where the FAISS
+        build supports it; embeddings are an mmap'd array or None; chunk_meta
+        (ChunkTable) and lexical_index (LexicalIndex) are None for documents
+        stored without them.
+    """
+    if not has_document(doc_hash):
+        return None
+
+    path = _doc_dir(doc_hash)
+    try:
+        import faiss
+
+        index_path = os.path.join(path, _INDEX_FILE)
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        try:
+            index = faiss.read_index(index_path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            index = faiss.read_index(index_path)
+
+        with open(os.path.join(path, _CHUNKS_FILE), encoding="utf-8") as f:
+            chunks = json.load(f)
+
+        embeddings_path = os.path.join(path, _EMBEDDINGS_FILE)
+        embeddings = np.load(embeddings_path, mmap_mode="r") if os.path.exists(embeddings_path) else None
+        meta_path = os.path.join(path, _CHUNK_META_FILE)
+        chunk_meta = ChunkTable.load(meta_path) if os.path.exists(meta_path) else None
+        lexical_path = os.path.join(path, _LEXICAL_FILE)
+        lexical_index = LexicalIndex.load(lexical_path) if os.path.exists(lexical_path) else None
+
+        meta = _read_meta(path)
+        meta["last_used"] = time.time()
+        _write_meta(path, meta)
+
+        log.info(f"Reattached document {meta.get('name', '')} ({doc_hash[:12]}, {len(chunks)} chunks)")
+        return index, chunks, embeddings, chunk_meta, lexical_index, meta.get("name", "")
+    except Exception as e:
+        log.warning(f"Failed to load stored document {doc_hash[:12]}: {e}")
+        return None
+
+
+def _evict_locked(keep: str = "") -> None:
+    """Delete least-recently-used documents until the store fits DOC_STORE_MAX_BYTES."""
+    if not os.path.isdir(DOC_STORE_DIR):
+        return
+
+    docs = []
+    for doc_hash in os.listdir(DOC_STORE_DIR):
+        path = _doc_dir(doc_hash)
+        if not os.path.isdir(path) or ".tmp" in doc_hash:
+            continue
+        meta = _read_meta(path)
+        docs.append((meta.get("last_used", 0), meta.get("bytes") or _dir_size(path), doc_hash))
+
+    total = sum(size for _, size, _ in docs)
+    for _, size, doc_hash in sorted(docs):
+        if total <= DOC_STORE_MAX_BYTES:
+            break
+        if doc_hash == keep:
+            continue
+        shutil.rmtree(_doc_dir(doc_hash), ignore_errors=True)
+        total -= size
+        log.info(f"Evicted stored document {doc_hash[:12]} ({size / 1e6:.1f} MB)")
@@ -0,0 +1,241 @@
+"""
+Hidayah AI — Persistent Embedding Cache
+Content-addressed on-disk cache for chunk embeddings, so re-uploading a PDF
+(or uploading one that overlaps an earlier document) only pays for new chunks.
+
+Layout (under EMBED_CACHE_DIR):
+  vectors.bin, vectors.<n>.bin — append-only float32 vectors, one file per generation
+  index.db                     — SQLite: key → (generation, offset, dim, last_used)
+
+Keys are sha256(model, task type, chunk text). When the current vectors file
+grows past EMBED_CACHE_MAX_BYTES the least-recently-used entries are copied
+into a new generation file and the index rows are repointed in the same
+transaction. A file is never rewritten in place, so a reader (in any
+process) always reads the offsets its index rows describe.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from utils.config import EMBED_CACHE_DIR, EMBED_CACHE_ENABLED, EMBED_CACHE_MAX_BYTES
+from utils.logger import get_logger
+
+log = get_logger("embedding_cache")
+
+_VECTORS_FILE = "vectors.bin"     # Generation 0; later generations are vectors.<n>.bin
+_INDEX_FILE = "index.db"
+_COMPACT_TARGET = 0.8  # Fraction of the size cap kept after eviction
+
+
+def make_key(model: str, task_type: str, text: str) -> str:
+    """Content address for one embedding."""
+    digest = hashlib.sha256()
+    for part in (model, task_type, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """Append-only float32 vector file with a SQLite index and LRU compaction."""
+
+    def __init__(self, directory, max_bytes: int = EMBED_CACHE_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(directory, _INDEX_FILE),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, offset INTEGER NOT NULL,"
+            " dim INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(embeddings)")}
+        if "generation" not in columns:
+            self._db.execute("ALTER TABLE embeddings ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings(last_used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._db.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+
+    def _vectors_path(self, generation: int) -> str:
+        if generation == 0:
+            return os.path.join(self.directory, _VECTORS_FILE)
+        return os.path.join(self.directory, f"vectors.{generation}.bin")
+
+    def _generation(self) -> int:
+        return self._db.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """Return cached vectors for the keys that are present."""
+        if not keys:
+            return {}
+
+        found = {}
+        with self._lock:
+            rows = []
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows.extend(self._db.execute(
+                    f"SELECT key, generation, offset, dim FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall())
+
+            by_generation: dict[int, list] = {}
+            for key, generation, offset, dim in rows:
+                by_generation.setdefault(generation, []).append((key, offset, dim))
+            for generation, entries in by_generation.items():
+                try:
+                    f = open(self._vectors_path(generation), "rb")
+                except FileNotFoundError:
+                    continue  # Compacted away after the rows were read: treat as misses
+                with f:
+                    for key, offset, dim in sorted(entries, key=lambda r: r[1]):
+                        f.seek(offset)
+                        data = f.read(dim * 4)
+                        if len(data) == dim * 4:
+                            found[key] = np.frombuffer(data, dtype=np.float32)
+            if not found:
+                return {}
+
+            now = time.time()
+            self._db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+        return found
+
+    def put_many(self, items: dict[str, np.ndarray]) -> None:
+        """Append new vectors and index them. Existing keys are left untouched."""
+        if not items:
+            return
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")  # Serialises appends across processes
+            try:
+                # Checked inside the write lock, so keys stored earlier or by a
+                # concurrent writer are never appended again as orphaned bytes
+                keys = list(items)
+                existing = set()
+                for start in range(0, len(keys), 500):
+                    part = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(part))
+                    existing.update(
+                        key for (key,) in self._db.execute(f"SELECT key FROM embeddings WHERE key IN ({placeholders})", part)
+                    )
+                new_items = [(key, vector) for key, vector in items.items() if key not in existing]
+
+                now = time.time()
+                generation = self._generation()
+                vectors_path = self._vectors_path(generation)
+                rows = []
+                with open(vectors_path, "ab") as f:
+                    for key, vector in new_items:
+                        vec = np.asarray(vector, dtype=np.float32).ravel()
+                        rows.append((key, generation, f.tell(), int(vec.shape[0]), now))
+                        f.write(vec.tobytes())
+                self._db.executemany(
+                    "INSERT INTO embeddings (key, generation, offset, dim, last_used) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+            if os.path.getsize(vectors_path) > self.max_bytes:
+                self._compact()
+
+    def _compact(self) -> None:
+        """Copy the LRU-kept entries into a new generation file and repoint the index at it."""
+        budget = int(self.max_bytes * _COMPACT_TARGET)
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            old_generation = self._generation()
+            if os.path.getsize(self._vectors_path(old_generation)) <= self.max_bytes:
+                self._db.execute("COMMIT")  # Another process compacted first
+                return
+            new_generation = old_generation + 1
+            keep = []
+            used = 0
+            for key, generation, offset, dim in self._db.execute(
+                "SELECT key, generation, offset, dim FROM embeddings ORDER BY last_used DESC"
+            ):
+                if used + dim * 4 > budget:
+                    break
+                keep.append((key, generation, offset, dim))
+                used += dim * 4
+
+            new_path = self._vectors_path(new_generation)
+            new_offsets = []
+            sources = {}
+            try:
+                with open(new_path, "wb") as dst:
+                    for key, generation, offset, dim in sorted(keep, key=lambda r: (r[1], r[2])):
+                        if generation not in sources:
+                            sources[generation] = open(self._vectors_path(generation), "rb")
+                        src = sources[generation]
+                        src.seek(offset)
+                        new_offsets.append((new_generation, dst.tell(), key))
+                        dst.write(src.read(dim * 4))
+            finally:
+                for src in sources.values():
+                    src.close()
+
+            kept_keys = [(key,) for key, _, _, _ in keep]
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS kept (key TEXT PRIMARY KEY)")
+            self._db.execute("DELETE FROM kept")
+            self._db.executemany("INSERT INTO kept (key) VALUES (?)", kept_keys)
+            removed = self._db.execute(
+                "DELETE FROM embeddings WHERE key NOT IN (SELECT key FROM kept)"
+            ).rowcount
+            self._db.executemany("UPDATE embeddings SET generation = ?, offset = ? WHERE key = ?", new_offsets)
+            self._db.execute("UPDATE meta SET value = ? WHERE name = 'generation'", (new_generation,))
+            self._db.execute("COMMIT")
+            log.info(f"Embedding cache compacted: kept {len(keep)}, evicted {removed} ({used / 1e6:.1f} MB)")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            if os.path.exists(self._vectors_path(old_generation + 1)):
+                os.remove(self._vectors_path(old_generation + 1))
+            raise
+
+        # Older generations are no longer referenced; a reader still holding one open
+        # keeps its data (or, where open files cannot be removed, it is retried next time)
+        for generation in range(new_generation):
+            try:
+                os.remove(self._vectors_path(generation))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log.info(f"Embedding cache generation {generation} still in use, left for later: {e}")
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+_cache_failed = False
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Return the process-wide cache, or None if disabled or the directory is unusable."""
+    global _cache, _cache_failed
+    if not EMBED_CACHE_ENABLED or _cache_failed:
+        return None
+    if _cache is not None:
+        return _cache
+
+    with _cache_lock:
+        if _cache is None and not _cache_failed:
+            try:
+                _cache = EmbeddingCache(EMBED_CACHE_DIR)
+            except (OSError, sqlite3.Error) as e:
+                log.warning(f"Embedding cache unavailable, continuing without it: {e}")
+                _cache_failed = True
+    return _cache
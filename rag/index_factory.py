@@ -0,0 +1,190 @@
+"""
+Hidayah AI — FAISS Index Factory
+Chooses an exact or approximate FAISS index for the corpus size, trains it
+when needed, and applies the recall-vs-latency search knobs from config.
+
+Modes:
+  flat  — exact IndexFlatIP (small corpora)
+  hnsw  — IndexHNSWFlat graph, no training (medium corpora)
+  ivf   — IVF inverted lists with flat storage, trained (large corpora)
+  ivfpq — IVF + product quantization, trained (very large corpora, compressed)
+
+Evaluate settings with: python -m benchmarks.index_recall [embeddings.npy]
+"""
+
+import math
+import time
+import numpy as np
+from utils.config import (
+    FAISS_INDEX_MODE,
+    FAISS_HNSW_MIN_VECTORS,
+    FAISS_IVF_MIN_VECTORS,
+    FAISS_IVFPQ_MIN_VECTORS,
+    FAISS_HNSW_M,
+    FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_HNSW_EF_SEARCH,
+    FAISS_IVF_NPROBE,
+    FAISS_PQ_SUBQUANTIZERS,
+)
+from utils.logger import get_logger
+
+log = get_logger("index_factory")
+
+_IVF_MIN_POINTS_PER_LIST = 39  # FAISS warns below this many training points per centroid
+
+
+def choose_index_mode(num_vectors: int) -> str:
+    """Pick an index mode for a corpus size (honours a fixed FAISS_INDEX_MODE)."""
+    if FAISS_INDEX_MODE != "auto":
+        return FAISS_INDEX_MODE
+    if num_vectors >= FAISS_IVFPQ_MIN_VECTORS:
+        return "ivfpq"
+    if num_vectors >= FAISS_IVF_MIN_VECTORS:
+        return "ivf"
+    if num_vectors >= FAISS_HNSW_MIN_VECTORS:
+        return "hnsw"
+    return "flat"
+
+
+def _nlist_for(num_vectors: int) -> int:
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // _IVF_MIN_POINTS_PER_LIST))
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    for m in (FAISS_PQ_SUBQUANTIZERS, 64, 48, 32, 16, 8, 4, 2, 1):
+        if m <= dimension and dimension % m == 0:
+            return m
+    return 1
+
+
+def index_mode(index) -> str:
+    """Mode of a built index, which may differ from the one requested (create_index falls back to flat)."""
+    import faiss
+
+    if hasattr(index, "hnsw"):
+        return "hnsw"
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return "flat"
+    return "ivfpq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf"
+
+
+def apply_search_params(index, nprobe: int | None = None, ef_search: int | None = None):
+    """Set IVF nprobe / HNSW efSearch on an index (no-op for flat)."""
+    import faiss
+
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search or FAISS_HNSW_EF_SEARCH
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = min(nprobe or FAISS_IVF_NPROBE, ivf.nlist)
+    except RuntimeError:
+        pass  # Not an IVF index
+    return index
+
+
+def create_index(normalized: np.ndarray, mode: str | None = None):
+    """
+    Build, train (if required) and fill an inner-product index.
+
+    Args:
+        normalized: L2-normalized float32 vectors, shape (n, dim)
+        mode: Force a mode; defaults to choose_index_mode(n)
+
+    Returns:
+        FAISS index containing every vector
+    """
+    import faiss
+
+    num_vectors, dimension = normalized.shape
+    mode = mode or choose_index_mode(num_vectors)
+    nlist = _nlist_for(num_vectors)
+
+    # Too few vectors to train IVF centroids: exact search is also the fast option
+    if mode in {"ivf", "ivfpq"} and num_vectors < nlist * _IVF_MIN_POINTS_PER_LIST:
+        mode = "flat"
+
+    if mode == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+    elif mode == "ivf":
+        index = faiss.index_factory(dimension, f"IVF{nlist},Flat", faiss.METRIC_INNER_PRODUCT)
+    elif mode == "ivfpq":
+        m = _pq_subquantizers(dimension)
+        index = faiss.index_factory(dimension, f"IVF{nlist},PQ{m}", faiss.METRIC_INNER_PRODUCT)
+    else:
+        mode = "flat"
+        index = faiss.IndexFlatIP(dimension)  # Inner product on normalized = cosine similarity
+
+    started = time.perf_counter()
+    if not index.is_trained:
+        index.train(normalized)
+    index.add(normalized)
+    apply_search_params(index)
+
+    if mode != "flat":
+        log.info(f"Built {mode} index over {num_vectors} vectors in {time.perf_counter() - started:.2f}s")
+    return index
+
+
+def evaluate_recall(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    k: int = 5,
+    modes: tuple[str, ...] = ("flat", "hnsw", "ivf", "ivfpq"),
+    nprobe_values: tuple[int, ...] = (4, 16, 64),
+    ef_values: tuple[int, ...] = (32, 64, 128),
+) -> list[dict]:
+    """
+    Measure recall@k and per-query latency of each mode against the flat baseline.
+
+    Args:
+        corpus: L2-normalized float32 corpus vectors
+        queries: L2-normalized float32 query vectors
+        k: Neighbours per query
+        modes: Index modes to evaluate
+        nprobe_values / ef_values: Search knobs swept for IVF / HNSW modes
+
+    Returns:
+        One row per (mode, knob): mode (as built), knob, recall, ms_per_query, build_s
+    """
+    baseline = create_index(corpus, mode="flat")
+    _, truth = baseline.search(queries, k)
+    truth_sets = [set(row) for row in truth]
+
+    rows = []
+    evaluated = set()
+    for mode in modes:
+        started = time.perf_counter()
+        index = create_index(corpus, mode=mode)
+        build_s = time.perf_counter() - started
+        built = index_mode(index)
+        if built != mode:
+            log.info(f"{mode} fell back to {built} for {len(corpus)} vectors")
+            mode = built
+        if mode in evaluated:
+            continue
+        evaluated.add(mode)
+
+        if mode == "hnsw":
+            knobs = [("efSearch", ef, {"ef_search": ef}) for ef in ef_values]
+        elif mode in {"ivf", "ivfpq"}:
+            knobs = [("nprobe", n, {"nprobe": n}) for n in nprobe_values]
+        else:
+            knobs = [("-", 0, {})]
+
+        for knob_name, knob_value, params in knobs:
+            apply_search_params(index, **params)
+            started = time.perf_counter()
+            _, found = index.search(queries, k)
+            ms_per_query = (time.perf_counter() - started) * 1000 / len(queries)
+            hits = sum(len(truth_sets[i] & set(row)) for i, row in enumerate(found))
+            rows.append({
+                "mode": mode,
+                "knob": f"{knob_name}={knob_value}" if knob_value else knob_name,
+                "recall": hits / (len(queries) * k),
+                "ms_per_query": ms_per_query,
+                "build_s": build_s,
+            })
+    return rows
@@ -0,0 +1,137 @@
+"""
+Hidayah AI — Incremental PDF Indexing
+Runs the streaming pipeline (page extraction → structure-aware chunker → batched embedding →
+index.add) on a background thread, so the chat panel can answer from the
+first pages while the rest of the document is still being indexed.
+"""
+
+import threading
+import time
+import numpy as np
+from utils.config import EMBED_BATCH_SIZE, EMBED_MAX_CONCURRENCY, PDF_READY_PAGES
+from utils.logger import get_logger
+from rag.pdf_loader import iter_pdf_pages
+from rag.chunker import ChunkTable, iter_structured_chunks
+from rag.vector_store import embed_texts, extend_index, finalize_index
+from rag.doc_store import save_document
+from rag.lexical_index import LexicalIndex
+
+log = get_logger("indexing")
+
+
+class PdfIndexingJob:
+    """Background index build for one uploaded PDF.
+
+    The first batch is flushed as soon as PDF_READY_PAGES pages have been
+    chunked; later flushes carry EMBED_BATCH_SIZE * EMBED_MAX_CONCURRENCY
+    chunks, so embed_texts can keep that many batches in flight. Each flush
+    publishes a new index and chunk list rather than growing the ones readers
+    hold, so snapshot() hands out references without copying. A complete
+    index is persisted to the document store under doc_hash when one is given.
+    """
+
+    def __init__(self, name: str, pdf_file, doc_hash: str | None = None):
+        self.name = name
+        self.doc_hash = doc_hash
+        self.pages_read = 0
+        self.index = None
+        self.chunks: list[str] = []
+        self.chunk_meta = ChunkTable()  # Page span / offsets / heading per chunk, aligned with chunks
+        self.lexical = LexicalIndex()  # BM25 over chunks, grown alongside the FAISS index
+        self.error: str | None = None  # "429" | "embedding" | "extraction"
+        self.done = False
+        self.ready = threading.Event()  # Set once the first batch is searchable (or the job ends)
+        self._pdf_file = pdf_file
+        self._embeddings: list[np.ndarray] = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"hidayah-index-{name}", daemon=True)
+
+    def start(self) -> "PdfIndexingJob":
+        self._thread.start()
+        return self
+
+    def _pages(self):
+        for page_number, text in iter_pdf_pages(self._pdf_file):
+            self.pages_read = page_number
+            yield page_number, text
+
+    def _flush(self, pending: list[str], records: list[tuple]) -> bool:
+        embeddings = embed_texts(pending, task_type="retrieval_document")
+        if isinstance(embeddings, str) and "⚠️ 429" in embeddings:
+            self.error = "429"
+            return False
+        if embeddings is None:
+            self.error = "embedding"
+            return False
+
+        # Copy-on-write: readers may be searching the published index, so the
+        # new vectors go into a clone (one per flush, not one per query)
+        if self.index is not None:
+            import faiss
+            index = extend_index(faiss.clone_index(self.index), embeddings)
+        else:
+            index = extend_index(None, embeddings)
+        with self._lock:
+            self.index = index
+            self.chunks = self.chunks + pending
+            self.chunk_meta.extend(records)
+            self.lexical.add(pending)
+            self._embeddings.append(embeddings)
+        self.ready.set()
+        return True
+
+    def _run(self):
+        started = time.perf_counter()
+        pending: list[str] = []
+        records: list[tuple] = []
+        flush_size = EMBED_BATCH_SIZE * EMBED_MAX_CONCURRENCY
+        try:
+            for chunk, record in iter_structured_chunks(self._pages()):
+                pending.append(chunk)
+                records.append(record)
+                first_batch = self.index is None and self.pages_read >= PDF_READY_PAGES
+                if len(pending) >= flush_size or first_batch:
+                    if not self._flush(pending, records):
+                        return
+                    pending, records = [], []
+            if pending and not self._flush(pending, records):
+                return
+            if not self.chunks:
+                self.error = "extraction"
+                return
+            final_index = finalize_index(self.index, self.embeddings())
+            with self._lock:
+                self.index = final_index
+            if self.doc_hash and not self.error:
+                save_document(
+                    self.doc_hash, self.name, final_index, self.chunks, self.embeddings(), self.chunk_meta, self.lexical
+                )
+        except Exception as e:
+            log.error(f"Indexing failed for {self.name}: {e}")
+            self.error = self.error or "embedding"
+        finally:
+            self.done = True
+            self.ready.set()
+            log.info(
+                f"Indexed {self.name}: {self.pages_read} pages, {len(self.chunks)} chunks "
+                f"in {time.perf_counter() - started:.1f}s (error={self.error})"
+            )
+
+    def snapshot(self):
+        """Return (index, chunks) safe to search while indexing continues.
+
+        Both are published whole by each flush and never mutated afterwards.
+        """
+        with self._lock:
+            if self.index is None:
+                return None, []
+            return self.index, self.chunks
+
+    def embeddings(self) -> np.ndarray | None:
+        with self._lock:
+            return np.vstack(self._embeddings) if self._embeddings else None
+
+
+def start_pdf_indexing(name: str, pdf_file, doc_hash: str | None = None) -> PdfIndexingJob:
+    """Start a background indexing job for an uploaded PDF."""
+    return PdfIndexingJob(name, pdf_file, doc_hash=doc_hash).start()
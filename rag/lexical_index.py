@@ -0,0 +1,125 @@
+"""
+Hidayah AI — Lexical (BM25) Index
+In-process inverted index over PDF chunks. Complements dense retrieval with
+exact-term matching (Arabic transliterations, hadith numbers, proper names)
+and can answer on its own without any network call.
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+import numpy as np
+
+_DIACRITICS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")  # Harakat, Quranic marks, tatweel
+_APOSTROPHES = re.compile(r"['`\u2018\u2019\u02BE\u02BF]")  # Qur'an → quran, Ka'bah → kabah
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens with Arabic diacritics and transliteration apostrophes removed."""
+    text = _APOSTROPHES.sub("", _DIACRITICS.sub("", text.lower()))
+    return _TOKEN.findall(text)
+
+
+class LexicalIndex:
+    """Okapi BM25 over an append-only list of chunks.
+
+    Chunk ids match positions in the chunk list (and the FAISS index), so
+    chunks can be added batch by batch while searches run on other threads.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, tuple[list[int], list[int]]] = {}  # term → (chunk ids, term frequencies)
+        self._doc_lengths: list[int] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, chunks: list[str]) -> None:
+        """Index chunks, assigning ids after the existing ones."""
+        with self._lock:
+            for text in chunks:
+                doc_id = len(self._doc_lengths)
+                terms = Counter(tokenize(text))
+                for term, tf in terms.items():
+                    ids, tfs = self._postings.setdefault(term, ([], []))
+                    ids.append(doc_id)
+                    tfs.append(tf)
+                self._doc_lengths.append(sum(terms.values()))
+
+    def search(self, query: str, top_k: int = 5, limit: int | None = None) -> list[tuple[int, float]]:
+        """
+        Rank chunks for a query.
+
+        Args:
+            query: Free-text query
+            top_k: Number of results to return
+            limit: Only consider chunk ids below this (e.g. a snapshot's chunk count)
+
+        Returns:
+            (chunk id, BM25 score) pairs, best first, positive scores only
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            num_docs = min(limit, len(self._doc_lengths)) if limit is not None else len(self._doc_lengths)
+            if not terms or num_docs == 0:
+                return []
+            doc_lengths = np.asarray(self._doc_lengths[:num_docs], dtype=np.float32)
+            postings = {
+                term: (np.asarray(self._postings[term][0]), np.asarray(self._postings[term][1], dtype=np.float32))
+                for term in terms
+                if term in self._postings
+            }
+
+        avg_length = float(doc_lengths.mean()) or 1.0
+        norms = self.k1 * (1 - self.b + self.b * doc_lengths / avg_length)
+        scores = np.zeros(num_docs, dtype=np.float32)
+        for ids, tfs in postings.values():
+            in_range = ids < num_docs
+            ids, tfs = ids[in_range], tfs[in_range]
+            if not len(ids):
+                continue
+            idf = math.log(1 + (num_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norms[ids])
+
+        top_k = min(top_k, num_docs)
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [(int(i), float(scores[i])) for i in ranked if scores[i] > 0]
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            terms = sorted(self._postings)
+            lengths = [len(self._postings[term][0]) for term in terms]
+            np.savez(
+                path,
+                params=np.array([self.k1, self.b], dtype=np.float64),
+                terms=np.array(terms, dtype=str),
+                offsets=np.cumsum([0] + lengths, dtype=np.int64),
+                ids=np.array([i for term in terms for i in self._postings[term][0]], dtype=np.int32),
+                tfs=np.array([tf for term in terms for tf in self._postings[term][1]], dtype=np.int32),
+                doc_lengths=np.array(self._doc_lengths, dtype=np.int32),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        data = np.load(path)
+        k1, b = data["params"].tolist()
+        index = cls(k1=k1, b=b)
+        offsets, ids, tfs = data["offsets"], data["ids"].tolist(), data["tfs"].tolist()
+        for i, term in enumerate(data["terms"].tolist()):
+            start, end = offsets[i], offsets[i + 1]
+            index._postings[term] = (ids[start:end], tfs[start:end])
+        index._doc_lengths = data["doc_lengths"].tolist()
+        return index
+
+
+def build_lexical_index(chunks: list[str]) -> LexicalIndex:
+    """Build a BM25 index over a complete chunk list."""
+    index = LexicalIndex()
+    index.add(chunks)
+    return index
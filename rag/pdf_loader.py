@@ -1,74 +1,97 @@
 """
-Hidayah AI — PDF Loader & Chunker
-Extracts text from uploaded PDFs and splits into chunks for RAG.
+Hidayah AI — PDF Loader
+Extracts page text from uploaded PDFs for RAG (chunking lives in rag/chunker.py).
 """
 
 import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 from PyPDF2 import PdfReader
+from utils.config import PDF_PARALLEL_MIN_PAGES, PDF_PARALLEL_SHARD_PAGES, PDF_PARALLEL_MAX_WORKERS
+from utils.logger import get_logger
+from rag.pdf_worker import init_extract_worker, extract_page_range
 
+log = get_logger("pdf_loader")
 
-def extract_text_from_pdf(pdf_file) -> str:
-    """
-    Extract all text from an uploaded PDF file.
-
-    Args:
-        pdf_file: Streamlit UploadedFile or file-like object
-
-    Returns:
-        Extracted text as a single string
-    """
-    try:
-        reader = PdfReader(pdf_file)
-        text_parts = []
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text_parts.append(page_text.strip())
-        return "\n\n".join(text_parts)
-    except Exception as e:
-        return f"[PDF extraction error: {str(e)}]"
 
+def _read_pdf_bytes(pdf_file) -> bytes:
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
 
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]:
-    """
-    Split text into overlapping chunks for embedding.
 
-    Args:
-        text: Full extracted text
-        chunk_size: Approximate number of words per chunk
-        overlap: Number of overlapping words between chunks
+def _iter_pages_parallel(pdf_file, reader: PdfReader, total_pages: int) -> Iterator[tuple[int, str]]:
+    """Shard page ranges across a process pool and yield pages back in order.
 
-    Returns:
-        List of text chunks
+    PdfReader objects do not pickle, so each worker parses the PDF bytes once
+    in its initializer. If the pool breaks, the remaining pages are extracted
+    serially.
     """
-    if not text or text.startswith("[PDF extraction error"):
-        return []
+    pdf_bytes = _read_pdf_bytes(pdf_file)
+    shards = [
+        (start, min(start + PDF_PARALLEL_SHARD_PAGES, total_pages))
+        for start in range(0, total_pages, PDF_PARALLEL_SHARD_PAGES)
+    ]
+    workers = min(PDF_PARALLEL_MAX_WORKERS, os.cpu_count() or 1, len(shards))
+    started = time.perf_counter()
+    next_page = 0
 
-    words = text.split()
-    chunks = []
-    start = 0
-
-    while start < len(words):
-        end = start + chunk_size
-        chunk = " ".join(words[start:end])
-        if chunk.strip():
-            chunks.append(chunk.strip())
-        start = end - overlap  # Overlap for context continuity
-
-    return chunks
+    try:
+        # spawn: forking a multi-threaded Streamlit server is unsafe
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_extract_worker,
+            initargs=(pdf_bytes,),
+        ) as pool:
+            results = pool.map(
+                extract_page_range,
+                [start for start, _ in shards],
+                [end for _, end in shards],
+            )
+            for (_, end), pages in zip(shards, results):
+                yield from pages
+                next_page = end
+        log.info(
+            f"Extracted {total_pages} pages on {workers} processes "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+    except Exception as e:
+        log.warning(f"Parallel PDF extraction failed at page {next_page + 1} ({e}); continuing serially")
+        for idx in range(next_page, total_pages):
+            page_text = reader.pages[idx].extract_text()
+            if page_text and page_text.strip():
+                yield idx + 1, page_text.strip()
 
 
-def extract_and_chunk(pdf_file, chunk_size: int = 500, overlap: int = 50) -> list[str]:
+def iter_pdf_pages(pdf_file) -> Iterator[tuple[int, str]]:
     """
-    Full pipeline: Extract PDF text and split into chunks.
+    Yield (page_number, text) for each page with extractable text, in page order.
+
+    Documents with at least PDF_PARALLEL_MIN_PAGES pages are extracted on a
+    process pool in page-range shards; smaller ones are read serially.
 
     Args:
-        pdf_file: Streamlit UploadedFile
-        chunk_size: Words per chunk
-        overlap: Word overlap between chunks
+        pdf_file: Streamlit UploadedFile or file-like object
 
-    Returns:
-        List of text chunks ready for embedding
+    Yields:
+        1-based page number and stripped page text
     """
-    text = extract_text_from_pdf(pdf_file)
-    return chunk_text(text, chunk_size, overlap)
+    try:
+        reader = PdfReader(pdf_file)
+        total_pages = len(reader.pages)
+        workers = min(PDF_PARALLEL_MAX_WORKERS, os.cpu_count() or 1)
+        if total_pages >= PDF_PARALLEL_MIN_PAGES and workers > 1:
+            yield from _iter_pages_parallel(pdf_file, reader, total_pages)
+            return
+
+        for page_number, page in enumerate(reader.pages, start=1):
+            page_text = page.extract_text()
+            if page_text and page_text.strip():
+                yield page_number, page_text.strip()
+    except Exception as e:
+        log.error(f"PDF extraction error: {e}")
@@ -0,0 +1,26 @@
+"""
+Hidayah AI — PDF Extraction Worker
+Process-pool entry points for parallel page extraction. Kept free of app
+imports (config, Gemini SDK) so spawned workers start quickly.
+"""
+
+import io
+from PyPDF2 import PdfReader
+
+_reader: PdfReader | None = None
+
+
+def init_extract_worker(pdf_bytes: bytes) -> None:
+    """Process-pool initializer: parse the PDF once per worker process."""
+    global _reader
+    _reader = PdfReader(io.BytesIO(pdf_bytes))
+
+
+def extract_page_range(start: int, end: int) -> list[tuple[int, str]]:
+    """Extract pages [start, end) (0-based) as (1-based page number, text) pairs."""
+    pages = []
+    for idx in range(start, end):
+        page_text = _reader.pages[idx].extract_text()
+        if page_text and page_text.strip():
+            pages.append((idx + 1, page_text.strip()))
+    return pages
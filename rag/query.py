@@ -1,11 +1,20 @@
 """
 Hidayah AI — RAG Query Engine
-Retrieves relevant PDF chunks and generates answers using Gemini 2.5 Pro.
+Retrieves relevant PDF chunks (hybrid BM25 + vector) and generates answers using Gemini 2.5 Pro.
 """
 
+import time
+from typing import Iterator
 from google import genai
-from utils.config import MODEL_SCHOLAR, GEMINI_API_KEY, get_gemini_client
-from rag.vector_store import search_index
+from utils.config import MODEL_SCHOLAR, GEMINI_API_KEY, RAG_CANDIDATE_MULTIPLIER, get_gemini_client
+from rag.retrieval import hybrid_search_ids
+from rag.context_packer import pack_context
+from utils.answer_cache import context_fingerprint, get_cached_answer, store_answer
+from utils.logger import get_logger
+
+log = get_logger("rag_query")
+
+_STREAM_INTERRUPTED = "\n\n*(Response interrupted. Please try again.)*"
 
 
 RAG_SYSTEM_PROMPT = """You are Hidayah AI, analyzing a USER-UPLOADED PDF document.
@@ -26,46 +35,75 @@ Guidelines:
 7. Always remind: "This answer is based on the uploaded document. For verified Islamic rulings, consult primary sources and qualified scholars." """
 
 
-def query_pdf(
+def retrieve_chunk_ids(question: str, index, chunks: list[str], top_k: int = 5, lexical_index=None):
+    """Candidate chunk ids for a question, as stream_query_pdf retrieves them (or "⚠️ 429")."""
+    return hybrid_search_ids(question, index, chunks, lexical_index, top_k * RAG_CANDIDATE_MULTIPLIER)
+
+
+def stream_query_pdf(
     question: str,
     index,
     chunks: list[str],
     top_k: int = 5,
-) -> str:
+    doc_hash: str | None = None,
+    lexical_index=None,
+    chunk_meta=None,
+    relevant_ids=None,
+) -> Iterator[str]:
     """
-    Answer a question using RAG: retrieve relevant chunks then generate an answer.
-
-    Args:
-        question: User's question about the PDF
-        index: FAISS index
-        chunks: Original text chunks
-        top_k: Number of chunks to retrieve
+    Stream a RAG answer as text deltas while Gemini generates it.
 
-    Returns:
-        Generated answer string
+    Same arguments as query_pdf, plus relevant_ids: a retrieve_chunk_ids()
+    result computed beforehand (e.g. speculatively during routing) for this
+    index and chunk list. Joined, the pieces equal query_pdf's return value.
+    Errors before any text are yielded as the usual "⚠️" message. Time to
+    first token is logged.
     """
+    started = time.perf_counter()
     client = get_gemini_client()
     if not client:
-        return "⚠️ Gemini API key not configured. Please add GEMINI_API_KEY to your .env file."
-
-    if index is None or not chunks:
-        return "⚠️ No PDF has been uploaded yet. Please upload a PDF using the attachment button."
-
-    # Retrieve relevant chunks
-    relevant_chunks = search_index(question, index, chunks, top_k)
-
-    if isinstance(relevant_chunks, str) and "⚠️ 429" in relevant_chunks:
-        return "⚠️ **Scholar Agent is currently resting.** Hidayah AI is receiving a high volume of requests. Please wait a moment and try again."
+        yield "⚠️ Gemini API key not configured. Please add GEMINI_API_KEY to your .env file."
+        return
 
-    if not relevant_chunks:
-        return "I couldn't find relevant information in the uploaded PDF for your question. Please try rephrasing."
+    # Only complete, persisted documents are cached (a still-indexing PDF has no doc_hash)
+    fingerprint = context_fingerprint(doc_hash, top_k) if doc_hash else None
+    if fingerprint:
+        cached = get_cached_answer("PDF_ANALYSIS", question, fingerprint, MODEL_SCHOLAR)
+        if cached is not None:
+            yield cached
+            return
 
-    # Build context from retrieved chunks
+    if index is None or not chunks:
+        yield "⚠️ No PDF has been uploaded yet. Please upload a PDF using the attachment button."
+        return
+
+    # Retrieve relevant chunks (lexical-only while the embedding API is rate-limited)
+    if relevant_ids is None:
+        relevant_ids = retrieve_chunk_ids(question, index, chunks, top_k, lexical_index)
+
+    if isinstance(relevant_ids, str) and "⚠️ 429" in relevant_ids:
+        yield "⚠️ **Scholar Agent is currently resting.** Hidayah AI is receiving a high volume of requests. Please wait a moment and try again."
+        return
+
+    if not relevant_ids:
+        yield "I couldn't find relevant information in the uploaded PDF for your question. Please try rephrasing."
+        return
+
+    # Build context from the deduplicated, diversified and trimmed chunks
+    packed = pack_context(question, relevant_ids, chunks, index=index, chunk_meta=chunk_meta, max_chunks=top_k)
+    if not packed:
+        yield "I couldn't find relevant information in the uploaded PDF for your question. Please try rephrasing."
+        return
     context = "\n\n---\n\n".join(
-        f"[Chunk {i+1}]\n{chunk}" for i, chunk in enumerate(relevant_chunks)
+        f"[Chunk {i+1} — {chunk_meta.label(chunk_id)}]\n{text}"
+        if chunk_meta is not None and chunk_id < len(chunk_meta)
+        else f"[Chunk {i+1}]\n{text}"
+        for i, (chunk_id, text) in enumerate(packed)
     )
+    context_ready = time.perf_counter() - started
 
     # Generate answer with Gemini Pro
+    parts: list[str] = []
     try:
         prompt = f"""Based on the following excerpts from the uploaded PDF document, answer the user's question.
 
@@ -78,7 +116,7 @@ User Question: {question}
 
 Provide a thorough, well-structured answer based strictly on the PDF content above."""
 
-        response = client.models.generate_content(
+        stream = client.models.generate_content_stream(
             model=MODEL_SCHOLAR,
             contents=prompt,
             config=genai.types.GenerateContentConfig(
@@ -87,12 +125,60 @@ Provide a thorough, well-structured answer based strictly on the PDF content abo
                 max_output_tokens=2048,
             ),
         )
-
-        return response.text
+        for chunk in stream:
+            text = chunk.text
+            if not text:
+                continue
+            if not parts:
+                log.info(
+                    f"RAG TTFT {time.perf_counter() - started:.2f}s "
+                    f"(retrieval {context_ready:.2f}s, model {time.perf_counter() - started - context_ready:.2f}s)"
+                )
+            parts.append(text)
+            yield text
+
+        log.info(f"RAG answer generated in {time.perf_counter() - started:.2f}s")
+        if fingerprint and parts:
+            store_answer("PDF_ANALYSIS", question, fingerprint, MODEL_SCHOLAR, "".join(parts))
 
     except genai.errors.APIError as e:
-        if e.code == 429:
-            return "⚠️ **Scholar Agent is currently resting.** Hidayah AI is receiving a high volume of requests. Please wait a moment and try again."
-        return f"⚠️ **RAG API Error:** {str(e.message) if hasattr(e, 'message') else str(e)}"
+        if parts:
+            log.warning(f"RAG stream interrupted after {len(parts)} chunks: {e}")
+            yield _STREAM_INTERRUPTED
+        elif e.code == 429:
+            yield "⚠️ **Scholar Agent is currently resting.** Hidayah AI is receiving a high volume of requests. Please wait a moment and try again."
+        else:
+            yield f"⚠️ **RAG API Error:** {str(e.message) if hasattr(e, 'message') else str(e)}"
     except Exception as e:
-        return f"⚠️ **RAG query error:** An unexpected error occurred. Please try again."
+        if parts:
+            log.warning(f"RAG stream interrupted after {len(parts)} chunks: {e}")
+            yield _STREAM_INTERRUPTED
+        else:
+            yield f"⚠️ **RAG query error:** An unexpected error occurred. Please try again."
+
+
+def query_pdf(
+    question: str,
+    index,
+    chunks: list[str],
+    top_k: int = 5,
+    doc_hash: str | None = None,
+    lexical_index=None,
+    chunk_meta=None,
+) -> str:
+    """
+    Answer a question using RAG: retrieve relevant chunks then generate an answer.
+
+    Args:
+        question: User's question about the PDF
+        index: FAISS index
+        chunks: Original text chunks
+        top_k: Maximum chunks packed into the prompt (top_k × RAG_CANDIDATE_MULTIPLIER are retrieved)
+        doc_hash: Content hash of a complete persisted document; enables the answer cache
+        lexical_index: BM25 index over chunks (built on the fly if missing)
+        chunk_meta: ChunkTable aligned with chunks, used for page/heading citations
+
+    Returns:
+        Generated answer string
+    """
+    return "".join(stream_query_pdf(question, index, chunks, top_k, doc_hash, lexical_index, chunk_meta))
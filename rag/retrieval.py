@@ -0,0 +1,93 @@
+"""
+Hidayah AI — Hybrid PDF Retrieval
+Fuses BM25 (exact terms) and FAISS (semantic) rankings with reciprocal rank
+fusion. While the embedding API is rate-limited, retrieval falls back to the
+lexical ranking alone and makes no network call.
+"""
+
+from utils.config import HYBRID_CANDIDATES, HYBRID_RRF_K
+from utils.logger import get_logger
+from rag.lexical_index import LexicalIndex, build_lexical_index
+from rag.vector_store import dense_search_ids, embed_query, embedding_rate_limited
+
+log = get_logger("retrieval")
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = HYBRID_RRF_K) -> list[int]:
+    """
+    Merge ranked id lists: score(id) = Σ 1 / (k + rank), rank starting at 1.
+
+    Args:
+        rankings: Ranked chunk-id lists, best first
+        k: Damping constant; larger values flatten the rank weighting
+
+    Returns:
+        Chunk ids ordered by fused score
+    """
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda chunk_id: -scores[chunk_id])
+
+
+def hybrid_search_ids(
+    query: str,
+    index,
+    chunks: list[str],
+    lexical_index: LexicalIndex | None = None,
+    top_k: int = 5,
+) -> list[int] | str:
+    """
+    Rank chunk ids for a query using BM25 and dense search.
+
+    Args:
+        query: User question
+        index: FAISS index aligned with chunks (may be None for lexical-only)
+        chunks: Text chunks
+        lexical_index: BM25 index over chunks; built on the fly if missing
+        top_k: Number of chunks to return
+
+    Returns:
+        Chunk ids best first, or "⚠️ 429" if rate-limited and nothing matched lexically
+    """
+    if not chunks:
+        return []
+
+    if lexical_index is None:
+        lexical_index = build_lexical_index(chunks)
+    candidates = max(top_k, HYBRID_CANDIDATES)
+    lexical_ids = [chunk_id for chunk_id, _ in lexical_index.search(query, candidates, limit=len(chunks))]
+
+    if index is None:
+        dense_ids = []
+    elif embedding_rate_limited():
+        # Lexical fast path: only a cached query vector may be used, no API call
+        query_vector = embed_query(query, cache_only=True)
+        dense_ids = dense_search_ids(query, index, candidates, limit=len(chunks)) if query_vector is not None else []
+        log.info(f"Embedding rate-limited; retrieval {'used cached query vector' if dense_ids else 'is lexical-only'}")
+    else:
+        dense_ids = dense_search_ids(query, index, candidates, limit=len(chunks))
+        if isinstance(dense_ids, str):
+            log.info("Query embedding rate-limited; falling back to lexical retrieval")
+            dense_ids = []
+
+    if not dense_ids and not lexical_ids and embedding_rate_limited():
+        return "⚠️ 429"
+
+    fused = reciprocal_rank_fusion([ranking for ranking in (dense_ids, lexical_ids) if ranking])
+    return fused[:top_k]
+
+
+def hybrid_search(
+    query: str,
+    index,
+    chunks: list[str],
+    lexical_index: LexicalIndex | None = None,
+    top_k: int = 5,
+) -> list[str] | str:
+    """Like hybrid_search_ids, but return the chunk texts."""
+    ids = hybrid_search_ids(query, index, chunks, lexical_index, top_k)
+    if isinstance(ids, str):
+        return ids
+    return [chunks[chunk_id] for chunk_id in ids]
@@ -3,141 +3,377 @@ Hidayah AI — FAISS Vector Store
 Embeds text chunks using Gemini text-embedding-004 and stores in a FAISS index.
 """
 
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable
+import httpx
 import numpy as np
 from google import genai
-from utils.config import MODEL_EMBEDDING, GEMINI_API_KEY, get_gemini_client
+from utils.config import (
+    MODEL_EMBEDDING,
+    GEMINI_API_KEY,
+    EMBED_BATCH_SIZE,
+    EMBED_MAX_CONCURRENCY,
+    EMBED_MAX_RETRIES,
+    EMBED_RETRY_BACKOFF,
+    EMBED_RATE_LIMIT_COOLDOWN,
+    QUERY_EMBED_CACHE_MAX_ENTRIES,
+    QUERY_EMBED_CACHE_TTL,
+    get_gemini_client,
+)
+from utils.logger import get_logger
+from rag.embedding_cache import get_embedding_cache, make_key
+from rag.index_factory import choose_index_mode, create_index
+
+log = get_logger("vector_store")
+
+# (model, normalized query) → (stored_at, L2-normalized vector of shape (1, dim))
+_query_vectors: OrderedDict = OrderedDict()
+_query_vectors_lock = threading.Lock()
+
+_rate_limited_until = 0.0  # monotonic deadline set when embedding stays rate-limited
+
+
+class _RateLimited(Exception):
+    """Raised when a batch is still rate-limited (HTTP 429) after all retries."""
+
+
+class _Aborted(Exception):
+    """Raised in a worker whose batch was abandoned because another batch failed."""
+
+
+# Client errors caused by the inputs themselves (e.g. one over-long text); only
+# these are worth bisecting. 429, 5xx and network errors retry the same slice
+# with backoff; auth and quota errors fail fast.
+_SPLITTABLE_CODES = {400, 413, 422}
+_TRANSIENT_ERRORS = (httpx.TransportError, ConnectionError, TimeoutError)
+
+
+class _AdaptiveLimiter:
+    """AIMD concurrency gate: halves the allowed in-flight batches on 429,
+    grows back by one after each clean batch."""
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.max_limit, self.limit + 1)
+            self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self.limit = max(1, self.limit // 2)
+
+
+def _embed_slice(client, texts: list[str], limiter: _AdaptiveLimiter, abort: threading.Event) -> list[list[float]]:
+    """Embed a slice in one multi-input call.
+
+    429s, 5xx and network errors back off and retry the same slice. A
+    per-input client error splits the slice in half and retries each half, so
+    one bad input cannot sink its neighbours. Anything else is raised at once.
+    Once abort is set (another batch failed), no further request is started.
+    """
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        transient = None
+        try:
+            with limiter:
+                if abort.is_set():
+                    raise _Aborted()
+                result = client.models.embed_content(
+                    model=MODEL_EMBEDDING,
+                    contents=texts,
+                )
+            vectors = [e.values for e in (result.embeddings or [])]
+            if len(vectors) != len(texts):
+                raise ValueError(f"expected {len(texts)} embeddings, got {len(vectors)}")
+            limiter.on_success()
+            return vectors
+        except genai.errors.APIError as e:
+            if e.code in _SPLITTABLE_CODES:
+                failure = e
+                break
+            if e.code == 429:
+                limiter.on_throttle()
+                if attempt == EMBED_MAX_RETRIES:
+                    raise _RateLimited() from e
+            elif (e.code or 0) < 500 or attempt == EMBED_MAX_RETRIES:
+                raise
+            transient = e
+        except ValueError as e:
+            failure = e  # Response short of embeddings: some input was rejected
+            break
+        except _TRANSIENT_ERRORS as e:
+            if attempt == EMBED_MAX_RETRIES:
+                raise
+            transient = e
+
+        wait = EMBED_RETRY_BACKOFF * (2 ** attempt)
+        log.warning(
+            f"Embedding {len(texts)}-text slice failed ({transient}) — limit={limiter.limit}, retrying in {wait:.1f}s"
+        )
+        if abort.wait(wait):
+            raise _Aborted() from transient
+
+    if len(texts) == 1:
+        raise failure
+
+    mid = len(texts) // 2
+    log.warning(f"Embedding slice of {len(texts)} failed ({failure}); retrying as two halves")
+    return _embed_slice(client, texts[:mid], limiter, abort) + _embed_slice(client, texts[mid:], limiter, abort)
+
+
+def _embed_remote(
+    client,
+    texts: list[str],
+    on_batch: Callable[[int, list[list[float]]], None] | None = None,
+) -> list[list[float]]:
+    """Embed texts through the API as concurrent multi-input batches.
+
+    on_batch(start, vectors) is called with each batch that succeeds, including
+    those that finished before another batch failed, so the caller can keep
+    them (e.g. in the embedding cache) when the call as a whole raises.
+    """
+    batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    limiter = _AdaptiveLimiter(EMBED_MAX_CONCURRENCY)
+    abort = threading.Event()
+    results: list[list[list[float]] | None] = [None] * len(batches)
+    started = time.perf_counter()
+
+    def finished(idx: int, vectors: list[list[float]]) -> None:
+        results[idx] = vectors
+        if on_batch:
+            on_batch(idx * EMBED_BATCH_SIZE, vectors)
+
+    if len(batches) == 1:
+        finished(0, _embed_slice(client, batches[0], limiter, abort))
+    else:
+        pool = ThreadPoolExecutor(max_workers=min(EMBED_MAX_CONCURRENCY, len(batches)))
+        try:
+            futures = {
+                pool.submit(_embed_slice, client, batch, limiter, abort): idx
+                for idx, batch in enumerate(batches)
+            }
+            for future in as_completed(futures):
+                finished(futures[future], future.result())
+        except BaseException:
+            # Stop retries and queued batches, and let in-flight calls finish before
+            # returning so nothing keeps hitting the API behind the caller's back.
+            # Batches that still succeeded are handed to on_batch, not thrown away.
+            abort.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+            for future, idx in futures.items():
+                if results[idx] is None and not future.cancelled() and future.exception() is None:
+                    finished(idx, future.result())
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    if len(texts) > 1:
+        elapsed = time.perf_counter() - started
+        log.info(f"Embedded {len(texts)} texts in {len(batches)} batches ({elapsed:.1f}s)")
+    return [vector for batch in results for vector in batch]
 
 
 def embed_texts(texts: list[str], task_type: str = "retrieval_document") -> np.ndarray | None:
     """
-    Embed a list of text chunks using Gemini text-embedding-004.
+    Embed a list of text chunks using Gemini embeddings.
+
+    The persistent embedding cache is consulted first, so only unseen texts
+    reach the API. Those are sent as multi-input batches of EMBED_BATCH_SIZE,
+    dispatched concurrently (at most EMBED_MAX_CONCURRENCY in flight, reduced
+    adaptively on 429). Transient failures retry only the failed batch;
+    batches rejected for a bad input are retried in halves; any other failure
+    aborts the remaining batches. Each successful batch is written to the
+    cache as it lands, so a retry after a failure only pays for what failed.
 
     Args:
         texts: List of text strings to embed
         task_type: "retrieval_document" for indexing, "retrieval_query" for searching
 
     Returns:
-        numpy array of shape (n, dim) or None on failure
+        numpy array of shape (n, dim), "⚠️ 429" if still rate-limited, or None on failure
     """
+    global _rate_limited_until
     client = get_gemini_client()
     if not client or not texts:
         return None
 
-    try:
-        embeddings = []
-        # Process in batches of 100 (API limit)
-        batch_size = 100
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            # google-genai SDK: embed_content accepts a single string via contents
-            # For batches, embed one at a time for reliability
-            for text in batch:
-                result = client.models.embed_content(
-                    model=MODEL_EMBEDDING,
-                    contents=text,
-                )
-                # result.embeddings is a list; single input → one element
-                if result.embeddings:
-                    embeddings.append(result.embeddings[0].values)
+    cache = get_embedding_cache()
+    keys = [make_key(MODEL_EMBEDDING, task_type, text) for text in texts] if cache else []
+    cached = {}
+    if cache:
+        try:
+            cached = cache.get_many(list(set(keys)))
+        except Exception as e:
+            log.warning(f"Embedding cache read failed: {e}")
 
-        if not embeddings:
-            return None
+    missing = [i for i in range(len(texts)) if not cache or keys[i] not in cached]
+    if cache and len(texts) > 1:
+        log.info(f"Embedding cache: {len(texts) - len(missing)}/{len(texts)} hits")
 
-        return np.array(embeddings, dtype=np.float32)
+    def store(start: int, vectors: list[list[float]]) -> None:
+        try:
+            cache.put_many({keys[missing[start + j]]: vector for j, vector in enumerate(vectors)})
+        except Exception as e:
+            log.warning(f"Embedding cache write failed: {e}")
 
+    try:
+        fresh = _embed_remote(client, [texts[i] for i in missing], store if cache else None) if missing else []
+    except _RateLimited:
+        _rate_limited_until = time.monotonic() + EMBED_RATE_LIMIT_COOLDOWN
+        return "⚠️ 429"
     except genai.errors.APIError as e:
-        if e.code == 429:
-            return "⚠️ 429"
-        print(f"[VectorStore] Embedding API error: {e}")
+        log.error(f"Embedding API error: {e}")
         return None
     except Exception as e:
-        print(f"[VectorStore] Embedding error: {e}")
+        log.error(f"Embedding error: {e}")
         return None
 
+    if not cache:
+        return np.array(fresh, dtype=np.float32) if fresh else None
+
+    fresh_by_index = dict(zip(missing, fresh))
+    return np.array(
+        [fresh_by_index[i] if i in fresh_by_index else cached[keys[i]] for i in range(len(texts))],
+        dtype=np.float32,
+    )
+
 
-def build_index(chunks: list[str]):
+def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so inner product equals cosine similarity."""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1  # Avoid division by zero
+    return embeddings / norms
+
+
+def extend_index(index, embeddings: np.ndarray):
     """
-    Build a FAISS index from text chunks.
+    Normalize embeddings and add them to a FAISS index, creating it on first use.
+
+    Incremental builds always start exact (flat); finalize_index switches to
+    an approximate index once the final corpus size is known.
 
     Args:
-        chunks: List of text chunks
+        index: Existing FAISS index, or None to create one
+        embeddings: numpy array of shape (n, dim)
 
     Returns:
-        Tuple of (faiss.Index, np.ndarray) or (None, None) on failure
+        The FAISS index containing the new vectors
     """
-    if not chunks:
-        return None, None
+    import faiss
+
+    normalized = _normalize_rows(embeddings)
+    if index is None:
+        dimension = normalized.shape[1]
+        index = faiss.IndexFlatIP(dimension)  # Inner product on normalized = cosine similarity
+    index.add(normalized)
+    return index
 
-    embeddings = embed_texts(chunks, task_type="retrieval_document")
-    if isinstance(embeddings, str) and "⚠️ 429" in embeddings:
-        return "⚠️ 429", None
-    if embeddings is None:
-        return None, None
 
-    try:
-        import faiss
+def finalize_index(index, embeddings: np.ndarray):
+    """
+    Rebuild an incrementally grown flat index with the factory-chosen mode
+    for the final corpus size. Small corpora keep the flat index as-is.
+    """
+    if embeddings is None or choose_index_mode(len(embeddings)) == "flat":
+        return index
+    return create_index(_normalize_rows(embeddings))
 
-        # Normalize for cosine similarity
-        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-        norms[norms == 0] = 1  # Avoid division by zero
-        normalized = embeddings / norms
 
-        # Build index
-        dimension = normalized.shape[1]
-        index = faiss.IndexFlatIP(dimension)  # Inner product on normalized = cosine similarity
-        index.add(normalized)
+def embedding_rate_limited() -> bool:
+    """True while the embedding API is cooling down after an exhausted 429 retry."""
+    return time.monotonic() < _rate_limited_until
 
-        return index, embeddings
 
-    except ImportError:
-        print("[VectorStore] FAISS not installed. Run: pip install faiss-cpu")
-        return None, None
-    except Exception as e:
-        print(f"[VectorStore] Index build error: {e}")
-        return None, None
+def _query_cache_key(query: str) -> tuple[str, str]:
+    return MODEL_EMBEDDING, re.sub(r"\s+", " ", query).strip().lower()
 
 
-def search_index(query: str, index, chunks: list[str], top_k: int = 5) -> list[str]:
+def embed_query(query: str, cache_only: bool = False) -> np.ndarray | str | None:
     """
-    Search the FAISS index for chunks most similar to the query.
+    Embed a search query and L2-normalize it, served from an in-memory
+    LRU+TTL cache keyed by (model, normalized query text).
 
     Args:
         query: Search query string
-        index: FAISS index
-        chunks: Original text chunks (aligned with index)
-        top_k: Number of results to return
+        cache_only: Return None instead of calling the API on a cache miss
 
     Returns:
-        List of most relevant text chunks
+        float32 array of shape (1, dim), "⚠️ 429" if rate-limited, or None on failure
     """
-    if index is None or not chunks:
-        return []
+    cache_key = _query_cache_key(query)
+    with _query_vectors_lock:
+        entry = _query_vectors.get(cache_key)
+        if entry and time.monotonic() - entry[0] <= QUERY_EMBED_CACHE_TTL:
+            _query_vectors.move_to_end(cache_key)
+            return entry[1]
+        if entry:
+            del _query_vectors[cache_key]
+    if cache_only:
+        return None
 
     query_embedding = embed_texts([query], task_type="retrieval_query")
-    if isinstance(query_embedding, str) and "⚠️ 429" in query_embedding:
-        return "⚠️ 429"
-    if query_embedding is None:
-        return []
+    if query_embedding is None or isinstance(query_embedding, str):
+        return query_embedding
 
-    try:
-        import faiss
+    norm = np.linalg.norm(query_embedding, axis=1, keepdims=True)
+    if norm[0][0] == 0:
+        return None
+    query_normalized = (query_embedding / norm).astype(np.float32)
+
+    with _query_vectors_lock:
+        _query_vectors[cache_key] = (time.monotonic(), query_normalized)
+        _query_vectors.move_to_end(cache_key)
+        while len(_query_vectors) > QUERY_EMBED_CACHE_MAX_ENTRIES:
+            _query_vectors.popitem(last=False)
+    return query_normalized
 
-        # Normalize query embedding
-        norm = np.linalg.norm(query_embedding, axis=1, keepdims=True)
-        if norm[0][0] == 0:
-            return []
-        query_normalized = query_embedding / norm
 
-        # Search
-        scores, indices = index.search(query_normalized, min(top_k, len(chunks)))
+def dense_search_ids(query: str, index, top_k: int, limit: int | None = None) -> list[int] | str:
+    """
+    Return chunk ids nearest to the query, best first.
+
+    Args:
+        query: Search query string
+        index: FAISS index
+        top_k: Number of ids to return
+        limit: Drop ids at or above this (chunk count of the caller's snapshot)
 
-        results = []
-        for idx in indices[0]:
-            if 0 <= idx < len(chunks):
-                results.append(chunks[idx])
+    Returns:
+        List of chunk ids, or "⚠️ 429" if the query could not be embedded
+    """
+    query_normalized = embed_query(query)  # Cached and already L2-normalized
+    if isinstance(query_normalized, str) and "⚠️ 429" in query_normalized:
+        return "⚠️ 429"
+    if query_normalized is None:
+        return []
 
-        return results
+    top_k = min(top_k, limit) if limit is not None else top_k
+    if top_k <= 0:
+        return []
 
+    try:
+        _, indices = index.search(query_normalized, top_k)
+        return [int(idx) for idx in indices[0] if 0 <= idx < (limit if limit is not None else index.ntotal)]
     except Exception as e:
-        print(f"[VectorStore] Search error: {e}")
+        log.error(f"Search error: {e}")
         return []
@@ -6,14 +6,16 @@ Renders the Scholar Agent right panel: chat history, input area, PDF upload, and
 import streamlit as st
 from datetime import datetime
 from html import escape
-from utils.config import GOLD, GEMINI_API_KEY, get_logo_base64
+from utils.config import GOLD, GEMINI_API_KEY, PDF_READY_WAIT_SECONDS, SCHOLAR_STREAMING, get_logo_base64
 from utils.evidence import format_confidence
 from utils.sanitize import escape_html
 from agents.router import classify_intent
-from agents.scholar import get_scholar_response
-from rag.pdf_loader import extract_and_chunk
-from rag.vector_store import build_index
-from rag.query import query_pdf
+from agents.scholar import stream_scholar_response, fetch_verse_bundle, fetch_research_results
+from agents.speculative import route_with_speculation
+from rag.indexing import start_pdf_indexing
+from rag.doc_store import pdf_content_hash, load_document
+from rag.lexical_index import build_lexical_index
+from rag.query import stream_query_pdf, retrieve_chunk_ids
 
 
 def _split_answer_and_sources(content: str):
@@ -172,6 +174,37 @@ def _render_error_message(content: str, timestamp: str):
     )
 
 
+def _assistant_bubble_html(answer_body: str, timestamp: str, intent_badge: str = "", animate: bool = True) -> str:
+    """HTML for an assistant answer bubble (without its Sources list)."""
+    is_pdf = "PDF" in (intent_badge or "")
+    # Different border color for PDF-sourced answers to visually distinguish from Islamic scholarship
+    border_style = "border: 1px solid rgba(59, 130, 246, 0.3);" if is_pdf else "border: 1px solid var(--glass-border);"
+    pdf_notice = '<p style="font-size:0.6rem;color:#60a5fa;margin:0 0 0.5rem 0;font-weight:600;">📄 Based on uploaded PDF — not verified Islamic scholarship</p>' if is_pdf else ""
+    reveal_class = ' class="animate-reveal"' if animate else ""
+    return (
+        f"""
+        <div{reveal_class} style="margin-bottom: 1.25rem; font-family: Inter, sans-serif;">
+            <div style="display: flex; align-items: center; gap: 0.5rem; margin-bottom: 0.4rem; margin-left: 0.25rem;">
+                <span style="font-size: 0.65rem; font-weight: 800; color: var(--gold); text-transform: uppercase; letter-spacing: 1px;">Hidayah AI</span>
+                <span style="font-size: 0.6rem; color: #64748b;">{timestamp}</span>
+                {f'<span style="font-size:0.55rem; color:#10b981; border:1px solid rgba(16,185,129,0.3); padding:0.1rem 0.5rem; border-radius: var(--sharp-radius); background:rgba(16,185,129,0.05); font-weight:700;">{intent_badge}</span>' if intent_badge else ''}
+            </div>
+            <div style="
+                background: rgba(30, 41, 59, 0.4);
+                {border_style}
+                padding: 0.85rem 1.1rem;
+                border-radius: var(--sharp-radius);
+                font-size: 0.85rem; line-height: 1.7; color: #cbd5e1;
+                max-width: 95%;
+                box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+            ">
+                {pdf_notice}{answer_body}
+            </div>
+        </div>
+        """
+    )
+
+
 def _render_message(role: str, content: str, timestamp: str, intent_badge: str = ""):
     """Render a single chat message bubble."""
 
@@ -182,32 +215,7 @@ def _render_message(role: str, content: str, timestamp: str, intent_badge: str =
 
     if role == "assistant":
         answer_body, sources = _split_answer_and_sources(content)
-        is_pdf = "PDF" in (intent_badge or "")
-        # Different border color for PDF-sourced answers to visually distinguish from Islamic scholarship
-        border_style = "border: 1px solid rgba(59, 130, 246, 0.3);" if is_pdf else "border: 1px solid var(--glass-border);"
-        pdf_notice = '<p style="font-size:0.6rem;color:#60a5fa;margin:0 0 0.5rem 0;font-weight:600;">📄 Based on uploaded PDF — not verified Islamic scholarship</p>' if is_pdf else ""
-        st.html(
-            f"""
-            <div class="animate-reveal" style="margin-bottom: 1.25rem; font-family: Inter, sans-serif;">
-                <div style="display: flex; align-items: center; gap: 0.5rem; margin-bottom: 0.4rem; margin-left: 0.25rem;">
-                    <span style="font-size: 0.65rem; font-weight: 800; color: var(--gold); text-transform: uppercase; letter-spacing: 1px;">Hidayah AI</span>
-                    <span style="font-size: 0.6rem; color: #64748b;">{timestamp}</span>
-                    {f'<span style="font-size:0.55rem; color:#10b981; border:1px solid rgba(16,185,129,0.3); padding:0.1rem 0.5rem; border-radius: var(--sharp-radius); background:rgba(16,185,129,0.05); font-weight:700;">{intent_badge}</span>' if intent_badge else ''}
-                </div>
-                <div style="
-                    background: rgba(30, 41, 59, 0.4);
-                    {border_style}
-                    padding: 0.85rem 1.1rem;
-                    border-radius: var(--sharp-radius);
-                    font-size: 0.85rem; line-height: 1.7; color: #cbd5e1;
-                    max-width: 95%;
-                    box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-                ">
-                    {pdf_notice}{answer_body}
-                </div>
-            </div>
-            """
-        )
+        st.html(_assistant_bubble_html(answer_body, timestamp, intent_badge))
 
         if sources:
             sources_html = []
@@ -280,8 +288,28 @@ def _render_message(role: str, content: str, timestamp: str, intent_badge: str =
         )
 
 
+def _render_stream(stream, timestamp: str, intent_badge: str) -> str:
+    """Render streamed answer text into a live bubble; return the full response."""
+    placeholder = st.empty()
+    parts: list[str] = []
+    for piece in stream:
+        parts.append(piece)
+        text = "".join(parts)
+        if text.startswith("⚠️"):
+            continue  # Errors render through the error bubble after the rerun
+        answer_body, _ = _split_answer_and_sources(text)
+        placeholder.html(_assistant_bubble_html(answer_body + " ▌", timestamp, intent_badge, animate=False))
+    return "".join(parts)
+
+
 def _process_query(query: str, ayahs: list[dict]):
-    """Process a user query: classify intent → route → generate response."""
+    """Process a user query: classify intent → route → generate response.
+
+    While the router model is deciding, retrieval for the likeliest intents
+    runs speculatively (agents/speculative.py); the winner's result is reused.
+    With SCHOLAR_STREAMING the answer is streamed into a bubble rendered at
+    the current position (the end of the chat history) as it is generated.
+    """
 
     timestamp = datetime.now().strftime("%I:%M %p")
 
@@ -292,10 +320,42 @@ def _process_query(query: str, ayahs: list[dict]):
         "timestamp": timestamp,
         "intent_badge": "",
     })
+    if SCHOLAR_STREAMING:
+        _render_message("user", query, timestamp)
+
+    # Retrieval inputs for every intent, so retrieval can start before routing ends
+    index = st.session_state.get("faiss_index")
+    chunks = st.session_state.get("pdf_chunks", [])
+    lexical_index = st.session_state.get("pdf_lexical")
+    chunk_meta = st.session_state.get("pdf_chunk_meta")
+    doc_hash = st.session_state.get("pdf_doc_hash")
+    job = st.session_state.get("pdf_job")
+    if job is not None and job.name == st.session_state.get("uploaded_pdf_name"):
+        index, chunks = job.snapshot()
+        lexical_index = job.lexical
+        chunk_meta = job.chunk_meta
+        doc_hash = None  # Partial index: not persisted yet, answers not cacheable
+
+    visible_window = st.session_state.get("visible_ayah_window", ayahs[:10] if ayahs else [])
+    tafsir_language = st.session_state.get("tafsir_language", "en")
+    if tafsir_language not in {"ar", "en", "ur"}:
+        audio_mode = st.session_state.get("audio_mode", "")
+        tafsir_language = "ur" if "Urdu" in audio_mode else "en"
+
+    retrievers = {"SCHOLARLY_RESEARCH": lambda: fetch_research_results(query)}
+    if index is not None and chunks:
+        retrievers["PDF_ANALYSIS"] = lambda: retrieve_chunk_ids(query, index, chunks, lexical_index=lexical_index)
+    if visible_window or ayahs:
+        retrievers["VERSE_LOOKUP"] = lambda: fetch_verse_bundle(visible_window or ayahs[:10], tafsir_language)
 
     # Classify intent
     active_pdf_name = st.session_state.get("uploaded_pdf_name")
-    intent = classify_intent(query, active_pdf_name=active_pdf_name)
+    intent, prefetched = route_with_speculation(
+        lambda: classify_intent(query, active_pdf_name=active_pdf_name, ayahs=ayahs),
+        retrievers,
+        query,
+        active_pdf_name,
+    )
 
     # Map intent to human-readable badge
     badge_map = {
@@ -307,39 +367,78 @@ def _process_query(query: str, ayahs: list[dict]):
 
     # Generate response based on intent
     if intent == "PDF_ANALYSIS":
-        # Use RAG pipeline
-        index = st.session_state.get("faiss_index")
-        chunks = st.session_state.get("pdf_chunks", [])
-        if index is not None and chunks:
-            response = query_pdf(query, index, chunks)
+        # Use RAG pipeline (a document still indexing answers from its first pages)
+        if (index is not None and chunks) or doc_hash:
+            stream = stream_query_pdf(
+                query,
+                index,
+                chunks,
+                doc_hash=doc_hash,
+                lexical_index=lexical_index,
+                chunk_meta=chunk_meta,
+                relevant_ids=prefetched.get("PDF_ANALYSIS"),
+            )
         else:
-            response = "⚠️ No PDF uploaded yet. Please upload a PDF using the 📎 button below."
+            stream = iter(["⚠️ No PDF uploaded yet. Please upload a PDF using the 📎 button below."])
     else:
-        visible_window = st.session_state.get("visible_ayah_window", ayahs[:10] if ayahs else [])
-        tafsir_language = st.session_state.get("tafsir_language", "en")
-
-        if tafsir_language not in {"ar", "en", "ur"}:
-            audio_mode = st.session_state.get("audio_mode", "")
-            tafsir_language = "ur" if "Urdu" in audio_mode else "en"
-
         # Use scholar agent (handles both VERSE_LOOKUP and SCHOLARLY_RESEARCH)
-        response = get_scholar_response(
+        stream = stream_scholar_response(
             query=query,
             intent=intent,
             ayahs_context=ayahs[:10] if ayahs else None,
             ayah_window=visible_window,
             tafseer_language=tafsir_language,
+            context_bundle=prefetched.get("VERSE_LOOKUP"),
+            web_results=prefetched.get("SCHOLARLY_RESEARCH"),
         )
 
+    answer_timestamp = datetime.now().strftime("%I:%M %p")
+    response = _render_stream(stream, answer_timestamp, badge) if SCHOLAR_STREAMING else "".join(stream)
+
     # Add assistant response to history
     st.session_state.chat_history.append({
         "role": "assistant",
         "content": response,
-        "timestamp": datetime.now().strftime("%I:%M %p"),
+        "timestamp": answer_timestamp,
         "intent_badge": badge,
     })
 
 
+def _sync_pdf_job(job):
+    """Publish a background indexing job's progress into session state."""
+    if job.chunks and st.session_state.get("uploaded_pdf_name") != job.name:
+        # Searchable from the first batch on, so the router can start biasing to PDF_ANALYSIS
+        st.session_state.uploaded_pdf_name = job.name
+
+    if not job.done:
+        if job.chunks:
+            st.info(f"⏳ Indexing {job.name}: {job.pages_read} pages read, {len(job.chunks)} chunks searchable so far. You can already ask questions.")
+        else:
+            st.info(f"⏳ Indexing {job.name}: {job.pages_read} pages read...")
+        return
+
+    st.session_state.pdf_job = None
+    if not job.chunks:
+        if job.error == "429":
+            st.error("⚠️ **Scholar Agent is currently resting.** Hidayah AI is receiving a high volume of requests. Please wait a moment and try again.")
+        elif job.error == "extraction":
+            st.error("❌ Failed to extract text from PDF.")
+        else:
+            st.error("❌ Embedding failed. Please check your connection and try again.")
+        return
+
+    st.session_state.faiss_index = job.index
+    st.session_state.pdf_chunks = job.chunks
+    st.session_state.pdf_embeddings = job.embeddings()
+    st.session_state.pdf_chunk_meta = job.chunk_meta
+    st.session_state.pdf_lexical = job.lexical
+    st.session_state.pdf_doc_hash = None if job.error else job.doc_hash
+    if job.error:
+        st.warning(f"⚠️ PDF partially indexed: {job.name} ({len(job.chunks)} chunks). Re-upload to index the rest.")
+    else:
+        st.success(f"✅ PDF loaded: {job.name} ({len(job.chunks)} chunks indexed)")
+
+
 def render_chat_panel(ayahs: list[dict]):
     """Render the full Scholar Agent chat panel."""
 
@@ -370,10 +469,6 @@ def render_chat_panel(ayahs: list[dict]):
         key="scholar_chat_input",
     )
 
-    if query:
-        _process_query(query, ayahs)
-        st.rerun()
-
     # ── Chat History ──────────────────────────────────────────
     chat_container = st.container(height=420)
 
@@ -395,6 +490,13 @@ def render_chat_panel(ayahs: list[dict]):
                     msg.get("intent_badge", ""),
                 )
 
+        # New question: answered below the history (streamed live when enabled)
+        if query:
+            _process_query(query, ayahs)
+
+    if query:
+        st.rerun()
+
     # ── PDF Upload (collapsible) ──────────────────────────────
     with st.expander("📎 Research PDF Analysis", expanded=False):
         uploaded_file = st.file_uploader(
@@ -404,23 +506,43 @@ def render_chat_panel(ayahs: list[dict]):
             label_visibility="visible",
         )
 
-        if uploaded_file and uploaded_file.name != st.session_state.get("uploaded_pdf_name"):
-            with st.spinner("📄 Processing PDF..."):
-                chunks = extract_and_chunk(uploaded_file)
-                if chunks:
-                    index, embeddings = build_index(chunks)
-                    if isinstance(index, str) and "⚠️ 429" in index:
-                        st.error("⚠️ **Scholar Agent is currently resting.** Hidayah AI is receiving a high volume of requests. Please wait a moment and try again.")
-                    elif index is not None:
-                        st.session_state.faiss_index = index
-                        st.session_state.pdf_chunks = chunks
-                        st.session_state.pdf_embeddings = embeddings
-                        st.session_state.uploaded_pdf_name = uploaded_file.name
-                        st.success(f"✅ PDF loaded: {uploaded_file.name} ({len(chunks)} chunks indexed)")
-                    else:
-                        st.error("❌ Embedding failed. Please check your connection and try again.")
-                else:
-                    st.error("❌ Failed to extract text from PDF.")
+        job = st.session_state.get("pdf_job")
+        # Keyed on the upload, not the name: a partially indexed PDF is never
+        # persisted (pdf_doc_hash stays None), so uploading it again re-indexes it
+        if (
+            uploaded_file
+            and uploaded_file.file_id != st.session_state.get("pdf_upload_id")
+            and (
+                uploaded_file.name != st.session_state.get("uploaded_pdf_name")
+                or st.session_state.get("pdf_doc_hash") is None
+            )
+            and not (job is not None and job.name == uploaded_file.name)
+        ):
+            st.session_state.pdf_upload_id = uploaded_file.file_id
+            doc_hash = pdf_content_hash(uploaded_file)
+            stored = load_document(doc_hash)
+            if stored is not None:
+                # Same bytes indexed before: reattach the persisted index instead of re-embedding
+                index, chunks, embeddings, chunk_meta, lexical_index, _ = stored
+                st.session_state.faiss_index = index
+                st.session_state.pdf_chunks = chunks
+                st.session_state.pdf_embeddings = embeddings
+                st.session_state.pdf_chunk_meta = chunk_meta
+                if lexical_index is None:  # Saved before BM25 indexes were persisted
+                    lexical_index = build_lexical_index(chunks)
+                st.session_state.pdf_lexical = lexical_index
+                st.session_state.uploaded_pdf_name = uploaded_file.name
+                st.session_state.pdf_doc_hash = doc_hash
+                st.success(f"✅ PDF loaded: {uploaded_file.name} ({len(chunks)} chunks, from saved index)")
+            else:
+                job = start_pdf_indexing(uploaded_file.name, uploaded_file, doc_hash=doc_hash)
+                st.session_state.pdf_job = job
+                st.session_state.pdf_doc_hash = None  # Set again once the new index is complete
+                with st.spinner("📄 Processing PDF..."):
+                    job.ready.wait(timeout=PDF_READY_WAIT_SECONDS)
+
+        if job is not None:
+            _sync_pdf_job(job)
 
         if st.session_state.get("uploaded_pdf_name"):
             st.markdown(
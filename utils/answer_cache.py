@@ -0,0 +1,166 @@
+"""
+Hidayah AI — Answer Cache
+Reuses generated answers for repeated questions asked against the same context.
+
+Entries are keyed by (intent, context fingerprint, model) plus the normalized
+question. With ANSWER_CACHE_SIMILARITY set, a question that misses exactly can
+still hit an entry in the same context whose question embedding is at least
+that cosine-similar (off by default). Stored questions are embedded in the
+background after store_answer (batched), and a lookup only compares entries
+that already have a vector, so a miss never waits on embedding stored
+questions. Answers are returned exactly as stored, so a Sources block stays
+byte-for-byte identical. Entries expire after ANSWER_CACHE_TTL; the least
+recently used are evicted beyond ANSWER_CACHE_MAX_BYTES.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from utils.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAX_BYTES,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_SEMANTIC_CANDIDATES,
+)
+from utils.logger import get_logger
+
+log = get_logger("answer_cache")
+
+# (intent, fingerprint, model, normalized query) → entry dict
+_entries: OrderedDict = OrderedDict()
+_total_bytes = 0
+_lock = threading.Lock()
+_stats = {"hits": 0, "semantic_hits": 0, "misses": 0}
+_pending: set = set()  # Entry keys waiting for a question vector
+_embedder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hidayah-answer-embed")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?!.؟ ")
+
+
+def context_fingerprint(*parts) -> str:
+    """Stable short hash of whatever defines the answer's context (refs, PDF hash, settings)."""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _query_vector(query: str, cache_only: bool = False) -> np.ndarray | None:
+    from rag.vector_store import embed_query, embedding_rate_limited
+
+    vector = embed_query(query, cache_only=cache_only or embedding_rate_limited())
+    return vector[0] if isinstance(vector, np.ndarray) else None
+
+
+def _embed_pending() -> None:
+    """Embed every stored question still missing a vector, in one batch."""
+    from rag.vector_store import embed_texts, embedding_rate_limited
+
+    with _lock:
+        keys = [key for key in _pending if key in _entries]
+        _pending.clear()
+    if not keys or embedding_rate_limited():
+        return  # Entries without vectors are simply exact-match only
+    vectors = embed_texts([key[3] for key in keys], task_type="retrieval_query")
+    if not isinstance(vectors, np.ndarray):
+        return
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    vectors = (vectors / norms).astype(np.float32)
+    with _lock:
+        for key, vector in zip(keys, vectors):
+            entry = _entries.get(key)
+            if entry is not None:
+                entry["vector"] = vector
+
+
+def _drop(key) -> None:
+    global _total_bytes
+    entry = _entries.pop(key)
+    _total_bytes -= entry["size"]
+
+
+def get_cached_answer(intent: str, query: str, fingerprint: str, model: str) -> str | None:
+    """Return a cached answer for this question and context, or None."""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+
+    normalized = normalize_query(query)
+    bucket = (intent, fingerprint, model)
+    now = time.monotonic()
+    with _lock:
+        for key in [k for k, entry in _entries.items() if now - entry["stored_at"] > ANSWER_CACHE_TTL]:
+            _drop(key)
+        entry = _entries.get(bucket + (normalized,))
+        if entry:
+            _entries.move_to_end(bucket + (normalized,))
+            _stats["hits"] += 1
+            return entry["answer"]
+        candidates = [
+            (key, entry["vector"])
+            for key, entry in reversed(_entries.items())
+            if key[:3] == bucket and entry["vector"] is not None
+        ][:ANSWER_CACHE_SEMANTIC_CANDIDATES]
+
+    if ANSWER_CACHE_SIMILARITY is None or not candidates:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+
+    # The only embedding on the lookup path; store_answer reuses it for this question
+    query_vector = _query_vector(normalized)
+    if query_vector is None:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+
+    best_key, best_score = None, ANSWER_CACHE_SIMILARITY
+    for key, vector in candidates:
+        score = float(np.dot(query_vector, vector))
+        if score >= best_score:
+            best_key, best_score = key, score
+
+    with _lock:
+        entry = _entries.get(best_key) if best_key else None
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(best_key)
+        _stats["semantic_hits"] += 1
+    log.info(f"Semantic answer cache hit ({best_score:.3f}): '{normalized[:60]}' ≈ '{best_key[3][:60]}'")
+    return entry["answer"]
+
+
+def store_answer(intent: str, query: str, fingerprint: str, model: str, answer: str) -> None:
+    """Cache a successful answer (warnings and errors are never cached)."""
+    global _total_bytes
+    if not ANSWER_CACHE_ENABLED or not answer or answer.startswith("⚠️"):
+        return
+
+    key = (intent, fingerprint, model, normalize_query(query))
+    size = len(answer.encode("utf-8")) + len(key[3])
+    # Usually already embedded by the lookup that missed; never calls the API here
+    vector = _query_vector(key[3], cache_only=True) if ANSWER_CACHE_SIMILARITY is not None else None
+    with _lock:
+        if key in _entries:
+            _drop(key)
+        _entries[key] = {"answer": answer, "stored_at": time.monotonic(), "size": size, "vector": vector}
+        _total_bytes += size
+        while _total_bytes > ANSWER_CACHE_MAX_BYTES and len(_entries) > 1:
+            _drop(next(iter(_entries)))
+        schedule = ANSWER_CACHE_SIMILARITY is not None and vector is None
+        if schedule:
+            _pending.add(key)
+    if schedule:
+        _embedder.submit(_embed_pending)
+
+
+def get_answer_cache_stats() -> dict:
+    """Hit/miss counters plus current size, for logging and diagnostics."""
+    with _lock:
+        return {**_stats, "entries": len(_entries), "bytes": _total_bytes}
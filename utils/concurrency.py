@@ -0,0 +1,77 @@
+"""
+Hidayah AI — Concurrency Helpers
+Runs independent provider calls on a bounded thread pool while keeping
+Streamlit's script context attached to worker threads.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from utils.logger import get_logger
+
+log = get_logger("concurrency")
+
+_DEFAULT_MAX_WORKERS = 8
+
+
+def _context_initializer() -> Callable[[], None] | None:
+    """Return a thread initializer that re-attaches the caller's ScriptRunContext.
+
+    Without it, st.cache_data / st.error calls made inside worker threads emit
+    "missing ScriptRunContext" warnings and lose their UI side effects.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    except ImportError:
+        return None
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+
+    def _init():
+        add_script_run_ctx(ctx=ctx)
+
+    return _init
+
+
+def run_parallel(
+    tasks: dict[str, Callable[[], Any]],
+    *,
+    max_workers: int = _DEFAULT_MAX_WORKERS,
+    label: str = "",
+) -> dict[str, Any]:
+    """Run independent zero-argument callables concurrently.
+
+    Args:
+        tasks: Mapping of task key → callable.
+        max_workers: Upper bound on pool threads.
+        label: Log label for timing output.
+
+    Returns:
+        Mapping of task key → result. A task that raised maps to None, so
+        callers can degrade per task instead of failing the whole batch.
+    """
+    if not tasks:
+        return {}
+
+    started = time.perf_counter()
+    results: dict[str, Any] = {}
+    workers = max(1, min(max_workers, len(tasks)))
+
+    with ThreadPoolExecutor(
+        max_workers=workers,
+        thread_name_prefix=f"hidayah-{label or 'pool'}",
+        initializer=_context_initializer(),
+    ) as pool:
+        futures = {key: pool.submit(fn) for key, fn in tasks.items()}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                log.warning(f"{label} task '{key}' failed: {e}")
+                results[key] = None
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    log.info(f"{label} ran {len(tasks)} tasks on {workers} workers in {elapsed_ms:.0f}ms")
+    return results
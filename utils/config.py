@@ -40,6 +40,9 @@ MODEL_ROUTER = "gemini-2.5-flash"            # Intent classification (fastest)
 MODEL_SCHOLAR = "gemini-2.5-flash"           # Scholarly chat & RAG answers (generous free tier)
 MODEL_EMBEDDING = "gemini-embedding-001"     # Vector embeddings for FAISS RAG
 
+# Decide obvious intents (verse refs, surah names, active PDF) without the router model
+ROUTER_FAST_PATH_ENABLED = True
+
 # ── Design Tokens (from design.instructions.md) ──────────────────
 MIDNIGHT_BLUE = "#1a2a40"
 BG_DARK = "#0F172A"
@@ -62,14 +65,112 @@ def get_logo_base64() -> str:
     except FileNotFoundError:
         return ""
 
+# ── Shared HTTP Connection Pools (utils/http_client.py) ───────────
+HTTP_POOL_CONNECTIONS = 4   # Distinct pools cached per host adapter
+HTTP_POOL_MAXSIZE = 16      # Keep-alive connections retained per host
+HTTP_POOL_METRICS_LOG_INTERVAL = 300  # Seconds between pool metrics log lines (0 disables)
+
+# ── Embedding Dispatch (rag/vector_store.py) ──────────────────────
+EMBED_BATCH_SIZE = 100         # Inputs per embed_content call (API limit)
+EMBED_MAX_CONCURRENCY = 4      # Batches in flight; halved adaptively on 429
+EMBED_MAX_RETRIES = 4          # 429/5xx/network retries per batch before giving up
+EMBED_RETRY_BACKOFF = 1.0      # Seconds, doubles each retry
+EMBED_RATE_LIMIT_COOLDOWN = 60 # Seconds retrieval stays lexical-only after a 429
+
+# Persistent content-addressed embedding cache (rag/embedding_cache.py)
+EMBED_CACHE_ENABLED = True
+EMBED_CACHE_DIR = _APP_DIR / "data" / "embedding_cache"
+EMBED_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# In-memory cache of normalized query vectors for dense_search_ids
+QUERY_EMBED_CACHE_MAX_ENTRIES = 512
+QUERY_EMBED_CACHE_TTL = 3600
+
+# Hybrid PDF retrieval (rag/retrieval.py): BM25 + dense fused by reciprocal rank
+HYBRID_CANDIDATES = 20         # Candidates taken from each retriever before fusion
+HYBRID_RRF_K = 60              # RRF damping constant
+
+# Structure-aware chunking (rag/chunker.py). Budgets are in model tokens so
+# that top-k (5) retrieved chunks fill ~2k tokens of the RAG prompt.
+CHUNK_MAX_TOKENS = 400
+CHUNK_OVERLAP_TOKENS = 50
+CHARS_PER_TOKEN = 4            # Token estimate without a tokenizer round-trip
+
+# Context packing for query_pdf (rag/context_packer.py)
+RAG_CONTEXT_TOKEN_BUDGET = 1500  # Max PDF-context tokens per prompt
+RAG_CANDIDATE_MULTIPLIER = 2     # Retrieve top_k × this, then pack a diverse subset
+RAG_MMR_LAMBDA = 0.7             # 1.0 = relevance only, 0.0 = diversity only
+RAG_DUPLICATE_OVERLAP = 0.6      # Drop a chunk this much covered by one already packed
+RAG_SENTENCE_WINDOW = 1          # Neighbouring sentences kept around each query match
+
+# Stream Scholar Agent / RAG answers into the chat bubble as they are generated
+SCHOLAR_STREAMING = True
+
+# Speculative routing (agents/speculative.py): when routing needs the LLM,
+# start retrieval for the likeliest intents while it runs.
+SPECULATIVE_ENABLED = True
+SPECULATIVE_GRACE_SECONDS = 0.05   # Rules / local model answer within this; no speculation then
+SPECULATIVE_MAX_INTENTS = 2        # Candidate intents retrieved in parallel
+SPECULATIVE_MIN_PROBABILITY = 0.15 # Local-model probability needed to speculate on an intent
+SPECULATIVE_BUDGET_PER_MINUTE = 10 # Process-wide speculative retrieval launches per minute
+
+# Answer cache for query_pdf / get_scholar_response (utils/answer_cache.py)
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_TTL = 6 * 3600
+ANSWER_CACHE_MAX_BYTES = 32 * 1024 * 1024
+ANSWER_CACHE_SIMILARITY = None           # Cosine threshold (e.g. 0.95) for optional semantic hits; None = exact matches only
+ANSWER_CACHE_SEMANTIC_CANDIDATES = 64    # Most recent same-context entries compared per lookup
+
+# Local intent model (agents/intent_model.py), consulted after the rule fast
+# path: predictions at or above the threshold skip the router LLM.
+INTENT_MODEL_ENABLED = True
+INTENT_MODEL_DIR = _APP_DIR / "data" / "intent_model"
+INTENT_MODEL_VERSION = 1
+INTENT_MODEL_THRESHOLD = 0.85
+# Append LLM-routed queries with their labels here, as training data for the next version
+INTENT_QUERY_LOG_ENABLED = False
+INTENT_QUERY_LOG_PATH = _APP_DIR / "data" / "intent_log.jsonl"
+
+# Incremental PDF indexing (rag/indexing.py): the first batch is embedded as
+# soon as this many pages are chunked, so questions can be answered early.
+PDF_READY_PAGES = 10
+PDF_READY_WAIT_SECONDS = 60
+
+# Parallel page extraction (rag/pdf_loader.py): large PDFs are split into
+# page-range shards and extracted on a process pool; small ones stay serial.
+PDF_PARALLEL_MIN_PAGES = 64
+PDF_PARALLEL_SHARD_PAGES = 32
+PDF_PARALLEL_MAX_WORKERS = 4
+
+# FAISS index selection (rag/index_factory.py). "auto" picks by corpus size;
+# or force one of "flat" | "hnsw" | "ivf" | "ivfpq".
+FAISS_INDEX_MODE = "auto"
+FAISS_HNSW_MIN_VECTORS = 20_000
+FAISS_IVF_MIN_VECTORS = 100_000
+FAISS_IVFPQ_MIN_VECTORS = 500_000
+# Recall-vs-latency knobs (higher = better recall, slower search)
+FAISS_HNSW_M = 32
+FAISS_HNSW_EF_CONSTRUCTION = 80
+FAISS_HNSW_EF_SEARCH = 64
+FAISS_IVF_NPROBE = 16
+FAISS_PQ_SUBQUANTIZERS = 64
+
+# Persisted document indexes keyed by PDF content hash (rag/doc_store.py)
+DOC_STORE_DIR = _APP_DIR / "data" / "doc_store"
+DOC_STORE_MAX_BYTES = 1024 * 1024 * 1024
+
 # ── AlQuran.cloud API ─────────────────────────────────────────────
-QURAN_API_BASE = "https://api.alquran.cloud/v1"
+QURAN_API_BASE = os.getenv("QURAN_API_BASE", "https://api.alquran.cloud/v1")
 ARABIC_EDITION = "ar.alafasy"       # Mishary Rashid Alafasy (with audio)
 ENGLISH_EDITION = "en.asad"         # Muhammad Asad English translation
 URDU_EDITION = "ur.jalandhry"       # Maulana Fateh Muhammad Jalandhry
 ENGLISH_AUDIO_EDITION = "en.walk"   # Ibrahim Walk
 URDU_AUDIO_EDITION = "ur.khan"      # Shamshad Ali Khan
 
+# Offline corpus snapshot (built with: python -m utils.quran_snapshot).
+# When present, Juz loads are served from disk and the API is only a fallback.
+QURAN_SNAPSHOT_DIR = _APP_DIR / "data" / "quran_snapshot"
+
 # ── Tafseer & Hadith Sources ───────────────────────────────────
 TAFSEER_EDITIONS = {
     "ar.muyassar": "Tafsir Al-Muyassar",
@@ -84,6 +185,15 @@ TAFSEER_LANGUAGE_LABELS = {
 }
 TAFSEER_SOURCE_TARGET_COUNT = 3
 
+# Concurrent context bundle builder (agents/context_retriever.py).
+# Worker pool size per window, and process-wide in-flight caps per provider
+# ("tafsir" → Quran.com / AlQuran.cloud, "hadith" → sunnah.com / Tavily).
+CONTEXT_BUNDLE_MAX_WORKERS = 8
+CONTEXT_PROVIDER_CONCURRENCY = {
+    "tafsir": 6,
+    "hadith": 4,
+}
+
 # Tafseer provider strategy (phase-1 keeps current provider default for safety)
 TAFSEER_PROVIDER_PRIMARY = "alquran_cloud"
 TAFSEER_PROVIDER_PRIORITY = ["alquran_cloud", "quran_com", "spa5k"]
@@ -123,6 +233,40 @@ HADITH_TRUSTED_DOMAINS = [
     "islamqa.info",
 ]
 HADITH_MAX_RESULTS = 4
+# Keyword search fans out to these collections concurrently; results rank in this order
+SUNNAH_SEARCH_COLLECTIONS = ["bukhari", "muslim", "abudawud", "tirmidhi", "nasai", "ibnmajah"]
+SUNNAH_SEARCH_TIMEOUT = 12      # Seconds per collection request
+SUNNAH_SEARCH_DEADLINE = 8.0    # Seconds for the whole search; slower collections are dropped
+SUNNAH_SEARCH_CONCURRENCY = 3   # Collections in flight at once; the rest queue in priority order
+
+# Local hadith corpus (utils/hadith_corpus.py), built with: python -m utils.hadith_corpus
+# When present, fetch_related_hadith searches it in-process instead of calling sunnah.com.
+HADITH_CORPUS_ENABLED = True
+HADITH_CORPUS_PATH = _APP_DIR / "data" / "hadith_corpus" / "hadith.sqlite3"
+HADITH_CORPUS_PAGE_SIZE = 50    # Hadith per sunnah.com page during ingest
+# Precomputed ayah → hadith table (utils/hadith_relatedness.py), built with:
+# python -m utils.hadith_relatedness. The context bundle reads it instead of searching.
+RELATED_HADITH_ENABLED = True
+RELATED_HADITH_PATH = _APP_DIR / "data" / "hadith_corpus" / "related"
+RELATED_HADITH_TOP_K = 8
+RELATED_HADITH_BUILD_WORKERS = 4
+
+# Shared provider cache (utils/shared_cache.py): survives restarts and is shared across workers/replicas.
+# Backend: "disk" | "sqlite" | "redis" (any Redis-protocol server) | "memory" (per-process only)
+SHARED_CACHE_BACKEND = os.getenv("SHARED_CACHE_BACKEND", "disk")
+SHARED_CACHE_DIR = _APP_DIR / "data" / "shared_cache" / "files"
+SHARED_CACHE_SQLITE_PATH = _APP_DIR / "data" / "shared_cache" / "cache.sqlite3"
+SHARED_CACHE_REDIS_URL = os.getenv("SHARED_CACHE_REDIS_URL", "redis://localhost:6379/0")
+SHARED_CACHE_TTLS = {                # Seconds per namespace (same lifetimes st.cache_data used)
+    "hadith": 900,
+    "juz": 3600,
+    "tafseer": 3600,
+    "tafsir_catalog": 86400,
+}
+SHARED_CACHE_LOCK_TTL = 15           # Seconds one process may hold a miss before others fetch too
+SHARED_CACHE_COMPRESS_MIN_BYTES = 512
+SHARED_CACHE_MAX_BYTES = 512 * 1024 * 1024   # Disk/SQLite size cap; soonest-expiring entries go first
+SHARED_CACHE_PURGE_INTERVAL = 600    # Seconds between expired-entry purges per process
 CANONICAL_LINK_FALLBACK = "api_fallback"
 HADITH_CANONICAL_STATUS_DEFAULT = "unverified"
 
@@ -156,6 +300,11 @@ QURANCOM_TAFSIRS = {
         {"id": 90, "name": "Tafsir al-Baghawi", "language": "ar"},
     ],
 }
+# Range (chapter/page) tafsir prefetch: page size for paginated calls and the
+# per-ayah cache those calls fill before fetch_tafsir_for_ayah hits by_ayah.
+QURANCOM_RANGE_PER_PAGE = 50
+QURANCOM_RANGE_CACHE_TTL = 3600
+QURANCOM_RANGE_CACHE_MAX_ENTRIES = 5000
 
 # UI visibility controls for source transparency details.
 # Keep False for production-facing UX; enable for internal QA/debugging.
@@ -1,24 +1,60 @@
 """
 Hidayah AI — Hadith Retrieval Adapter
-Primary: sunnah.com API (verified hadith with authentication grades).
+Primary: sunnah.com hadith (verified, with authentication grades), searched in
+the local corpus (utils/hadith_corpus.py) when it has been ingested, otherwise
+through the sunnah.com API.
 Fallback: Tavily web search filtered to trusted domains (commentary only).
 """
 
-import streamlit as st
 from utils.config import (
     HADITH_TRUSTED_DOMAINS,
     HADITH_MAX_RESULTS,
     HADITH_PROVIDER_PRIMARY,
+    HADITH_CORPUS_ENABLED,
 )
 from utils.evidence import normalize_hadith
 from utils.trust import trusted_host, COMMENTARY_DOMAINS
 from utils.logger import get_logger
+from utils.shared_cache import shared_cache
 
 log = get_logger("hadith_api")
 
 
 # ── Primary: sunnah.com API ──────────────────────────────────────
 
+def _hadith_keyword(ayah_text_english: str, surah_name: str, ayah_number: int) -> str:
+    """Focused search keyword from the ayah context."""
+    keyword_parts = []
+    if surah_name:
+        keyword_parts.append(surah_name)
+    if ayah_text_english:
+        keyword_parts.append(ayah_text_english[:120])
+
+    keyword = " ".join(keyword_parts).strip()
+    return keyword or f"Quran {surah_name} verse {ayah_number}"
+
+
+def _fetch_from_local_corpus(
+    ayah_text_english: str,
+    surah_name: str,
+    ayah_number: int,
+    max_results: int,
+) -> list[dict] | None:
+    """Search the ingested sunnah.com corpus; None when there is no local corpus."""
+    try:
+        from utils.hadith_corpus import corpus_available, search_corpus
+
+        if not corpus_available():
+            return None
+        # The full translation is a better full-text query than the 120-char API keyword
+        keyword = f"{surah_name} {ayah_text_english}".strip() or f"Quran {surah_name} verse {ayah_number}"
+        return search_corpus(keyword, max_results=max_results)
+
+    except Exception as e:
+        log.error(f"Local hadith corpus error: {e}")
+        return None
+
+
 def _fetch_from_sunnah_api(
     ayah_text_english: str,
     surah_name: str,
@@ -33,17 +69,7 @@ def _fetch_from_sunnah_api(
             log.warning("sunnah.com API not configured, skipping")
             return []
 
-        # Build a focused search keyword from the ayah context
-        keyword_parts = []
-        if surah_name:
-            keyword_parts.append(surah_name)
-        if ayah_text_english:
-            keyword_parts.append(ayah_text_english[:120])
-
-        keyword = " ".join(keyword_parts).strip()
-        if not keyword:
-            keyword = f"Quran {surah_name} verse {ayah_number}"
-
+        keyword = _hadith_keyword(ayah_text_english, surah_name, ayah_number)
         results = search_hadith_by_keyword(
             keyword=keyword,
             max_results=max_results,
@@ -137,7 +163,7 @@ def _fetch_web_commentary_fallback(
 
 # ── Public Interface ─────────────────────────────────────────────
 
-@st.cache_data(ttl=900, show_spinner=False)
+@shared_cache("hadith")
 def fetch_related_hadith(
     ayah_text_english: str,
     surah_name: str,
@@ -146,13 +172,22 @@ def fetch_related_hadith(
 ) -> list[dict]:
     """Fetch related Hadith references using the configured provider strategy.
 
-    Primary: sunnah.com API (authenticated hadith with grades).
+    Primary: sunnah.com hadith (authenticated, with grades) from the local
+    corpus when ingested, else the sunnah.com API.
     Fallback: Tavily web search (commentary, not authoritative hadith).
     """
     results = []
 
     if HADITH_PROVIDER_PRIMARY == "sunnah_api":
-        results = _fetch_from_sunnah_api(
+        local = None
+        if HADITH_CORPUS_ENABLED:
+            local = _fetch_from_local_corpus(
+                ayah_text_english=ayah_text_english,
+                surah_name=surah_name,
+                ayah_number=ayah_number,
+                max_results=max_results,
+            )
+        results = local if local is not None else _fetch_from_sunnah_api(
             ayah_text_english=ayah_text_english,
             surah_name=surah_name,
             ayah_number=ayah_number,
@@ -0,0 +1,401 @@
+"""
+Hidayah AI — Local Hadith Corpus
+Mirrors the sunnah.com collections in HADITH_COLLECTIONS into a SQLite
+database with an FTS5 index over the English and Arabic bodies, so related
+hadith are found in-process instead of by a network search per ayah.
+
+Layout (HADITH_CORPUS_PATH):
+  hadith      — one row per hadith: collection, book/hadith number, grade,
+                raw grades (JSON), English and Arabic bodies
+  hadith_fts  — external-content FTS5 index over hadith(body_en, body_ar)
+                (Porter-stemmed, diacritics folded), kept in sync by triggers
+  collections — per-collection upstream total and last refresh time
+  meta        — corpus_id, a random id minted when the database is created;
+                row ids are only meaningful within one corpus_id
+
+Ingest / delta refresh with: python -m utils.hadith_corpus [--full] [collection ...]
+Ingest only fetches pages past the upstream position reached last time
+unless the upstream total shrank or --full is given, so re-running it is
+cheap. The API base URL and key can be overridden (--base-url,
+SUNNAH_API_KEY); benchmarks/sunnah_ingest.py serves fixture data for that
+and replays the ingest / no-op / delta-refresh cycle.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+import requests
+from utils.config import (
+    SUNNAH_API_KEY,
+    SUNNAH_API_BASE,
+    HADITH_COLLECTIONS,
+    HADITH_MAX_RESULTS,
+    HADITH_CORPUS_PATH,
+    HADITH_CORPUS_PAGE_SIZE,
+)
+from utils.logger import get_logger
+from utils.retry import get_with_retry
+
+log = get_logger("hadith_corpus")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hadith (
+    id INTEGER PRIMARY KEY,
+    collection TEXT NOT NULL,
+    hadith_number TEXT NOT NULL,
+    book_number TEXT NOT NULL DEFAULT '',
+    grade TEXT NOT NULL DEFAULT '',
+    grades_json TEXT NOT NULL DEFAULT '[]',
+    body_en TEXT NOT NULL DEFAULT '',
+    body_ar TEXT NOT NULL DEFAULT '',
+    UNIQUE (collection, hadith_number)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS hadith_fts USING fts5(
+    body_en, body_ar, content='hadith', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS hadith_ai AFTER INSERT ON hadith BEGIN
+    INSERT INTO hadith_fts(rowid, body_en, body_ar) VALUES (new.id, new.body_en, new.body_ar);
+END;
+CREATE TRIGGER IF NOT EXISTS hadith_ad AFTER DELETE ON hadith BEGIN
+    INSERT INTO hadith_fts(hadith_fts, rowid, body_en, body_ar) VALUES ('delete', old.id, old.body_en, old.body_ar);
+END;
+CREATE TRIGGER IF NOT EXISTS hadith_au AFTER UPDATE ON hadith BEGIN
+    INSERT INTO hadith_fts(hadith_fts, rowid, body_en, body_ar) VALUES ('delete', old.id, old.body_en, old.body_ar);
+    INSERT INTO hadith_fts(rowid, body_en, body_ar) VALUES (new.id, new.body_en, new.body_ar);
+END;
+CREATE TABLE IF NOT EXISTS collections (
+    name TEXT PRIMARY KEY,
+    upstream_total INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have he her him his i in is it its me my not of on or "
+    "our she so that the their them then there they this those to was we were what when which who will "
+    "with you your surah verse ayah quran allah".split()
+)
+_MAX_QUERY_TERMS = 12
+
+_local = threading.local()
+
+
+def _connect(path=HADITH_CORPUS_PATH, read_only: bool = True) -> sqlite3.Connection:
+    if read_only:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers keep working during a refresh
+    conn.executescript(_SCHEMA)
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('corpus_id', ?)", (uuid.uuid4().hex,))
+    return conn
+
+
+def _reader() -> sqlite3.Connection | None:
+    """Per-thread read-only connection; None while no corpus has been ingested."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        if not os.path.exists(HADITH_CORPUS_PATH):
+            return None
+        try:
+            conn = _local.conn = _connect(HADITH_CORPUS_PATH)
+        except sqlite3.Error as e:
+            log.warning(f"Hadith corpus unreadable: {e}")
+            return None
+    return conn
+
+
+def corpus_available() -> bool:
+    """True when a corpus with at least one hadith is on disk."""
+    conn = _reader()
+    if conn is None:
+        return False
+    try:
+        return conn.execute("SELECT 1 FROM hadith LIMIT 1").fetchone() is not None
+    except sqlite3.Error:
+        return False
+
+
+def collection_counts() -> dict[str, int]:
+    """Stored hadith per collection ({} without a corpus)."""
+    conn = _reader()
+    if conn is None:
+        return {}
+    try:
+        return dict(conn.execute("SELECT collection, count(*) FROM hadith GROUP BY collection").fetchall())
+    except sqlite3.Error:
+        return {}
+
+
+def corpus_identity() -> dict | None:
+    """corpus_id, row count and highest row id, for tables that store row ids (None without a corpus)."""
+    conn = _reader()
+    if conn is None:
+        return None
+    try:
+        corpus_id = conn.execute("SELECT value FROM meta WHERE name = 'corpus_id'").fetchone()
+        rows, max_id = conn.execute("SELECT count(*), COALESCE(max(id), 0) FROM hadith").fetchone()
+    except sqlite3.Error:
+        return None
+    return {"corpus_id": corpus_id[0] if corpus_id else None, "rows": rows, "max_id": max_id}
+
+
+def _match_expression(keyword: str) -> str:
+    """FTS5 query: distinct content words OR-ed together, each quoted."""
+    terms = []
+    for word in re.findall(r"\w+", keyword.lower()):
+        if len(word) > 2 and word not in _STOPWORDS and word not in terms:
+            terms.append(word)
+    return " OR ".join(f'"{term}"' for term in terms[:_MAX_QUERY_TERMS])
+
+
+def _row_to_item(row: tuple) -> dict:
+    """Rebuild the sunnah.com /hadiths item shape from a stored row."""
+    collection, hadith_number, book_number, grades_json, body_en, body_ar = row
+    bodies = [{"lang": lang, "body": body} for lang, body in (("en", body_en), ("ar", body_ar)) if body]
+    return {
+        "collection": collection,
+        "hadithNumber": hadith_number,
+        "bookNumber": book_number,
+        "grades": json.loads(grades_json or "[]"),
+        "hadith": bodies,
+    }
+
+
+def _normalize_rows(rows: list[tuple]) -> list[dict]:
+    from utils.sunnah_api import normalize_sunnah_item
+
+    results = []
+    for row in rows:
+        item = _row_to_item(row)
+        hit = normalize_sunnah_item(item, item["collection"])
+        if hit:
+            hit["metadata"]["provider"] = "local_corpus"
+            results.append(hit)
+    return results
+
+
+def search_ids(keyword: str, limit: int, collections: list[str] | None = None) -> list[tuple[int, float]]:
+    """(hadith row id, BM25 relevance) pairs for a free-text query, best first (higher = better)."""
+    conn = _reader()
+    expression = _match_expression(keyword)
+    if conn is None or not expression:
+        return []
+
+    sql = "SELECT h.id, -bm25(hadith_fts) FROM hadith_fts JOIN hadith h ON h.id = hadith_fts.rowid WHERE hadith_fts MATCH ?"
+    params: list = [expression]
+    if collections:
+        sql += f" AND h.collection IN ({','.join('?' * len(collections))})"
+        params += list(collections)
+    sql += " ORDER BY bm25(hadith_fts) LIMIT ?"
+    params.append(limit)
+    try:
+        return conn.execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        log.warning(f"Hadith corpus search failed: {e}")
+        return []
+
+
+def get_hadith_by_ids(ids: list[int]) -> list[dict]:
+    """Normalized hadith for corpus row ids, in the given order (unknown ids are skipped)."""
+    conn = _reader()
+    if conn is None or not ids:
+        return []
+    try:
+        rows = conn.execute(
+            "SELECT id, collection, hadith_number, book_number, grades_json, body_en, body_ar "
+            f"FROM hadith WHERE id IN ({','.join('?' * len(ids))})",
+            [int(i) for i in ids],
+        ).fetchall()
+    except sqlite3.Error as e:
+        log.warning(f"Hadith corpus lookup failed: {e}")
+        return []
+    by_id = {row[0]: row[1:] for row in rows}
+    return _normalize_rows([by_id[i] for i in ids if i in by_id])
+
+
+def get_hadith_texts(ids: list[int]) -> dict[int, str]:
+    """Row id → English body (Arabic when there is no English), for offline scoring."""
+    conn = _reader()
+    if conn is None or not ids:
+        return {}
+    texts = {}
+    for start in range(0, len(ids), 500):
+        batch = [int(i) for i in ids[start:start + 500]]
+        rows = conn.execute(
+            f"SELECT id, body_en, body_ar FROM hadith WHERE id IN ({','.join('?' * len(batch))})", batch
+        ).fetchall()
+        texts.update({row[0]: row[1] or row[2] for row in rows})
+    return texts
+
+
+def search_corpus(keyword: str, max_results: int = HADITH_MAX_RESULTS, collections: list[str] | None = None) -> list[dict]:
+    """
+    Full-text search of the local corpus, best BM25 match first.
+
+    Args:
+        keyword: Free text (e.g. surah name plus the ayah translation)
+        max_results: Maximum hadith returned
+        collections: Restrict to these collection names
+
+    Returns:
+        Normalized hadith evidence dicts, shaped like search_hadith_by_keyword's
+    """
+    started = time.perf_counter()
+    results = get_hadith_by_ids([row_id for row_id, _ in search_ids(keyword, max_results, collections)])
+    log.info(f"Hadith corpus: {len(results)} hits for '{keyword[:60]}' in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return results
+
+
+def _fetch_page(base_url: str, headers: dict, collection: str, page: int, page_size: int) -> dict:
+    resp = get_with_retry(
+        f"{base_url}/hadiths",
+        headers=headers,
+        params={"collection": collection, "limit": page_size, "page": page},
+        timeout=30,
+        label=f"sunnah:ingest:{collection}:{page}",
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _store_page(conn: sqlite3.Connection, collection: str, items: list[dict]) -> int:
+    from utils.sunnah_api import _grade_label
+
+    rows = []
+    for item in items:
+        bodies = {body.get("lang", ""): (body.get("body") or "").strip() for body in item.get("hadith", [])}
+        if not (bodies.get("en") or bodies.get("ar")) or not item.get("hadithNumber"):
+            continue
+        grades = item.get("grades", [])
+        rows.append((
+            collection,
+            str(item["hadithNumber"]),
+            str(item.get("bookNumber", "") or ""),
+            _grade_label(grades),
+            json.dumps(grades, ensure_ascii=False),
+            bodies.get("en", ""),
+            bodies.get("ar", ""),
+        ))
+    conn.executemany(
+        "INSERT INTO hadith (collection, hadith_number, book_number, grade, grades_json, body_en, body_ar) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (collection, hadith_number) DO UPDATE SET book_number = excluded.book_number, "
+        "grade = excluded.grade, grades_json = excluded.grades_json, "
+        "body_en = excluded.body_en, body_ar = excluded.body_ar",
+        rows,
+    )
+    return len(rows)
+
+
+def ingest_collection(
+    conn: sqlite3.Connection,
+    collection: str,
+    base_url: str = SUNNAH_API_BASE,
+    headers: dict | None = None,
+    full: bool = False,
+    page_size: int = HADITH_CORPUS_PAGE_SIZE,
+) -> int:
+    """
+    Bring one collection up to date; returns the number of hadith written.
+
+    Upstream numbering is append-only, so a delta refresh resumes at the
+    page holding the first upstream item not seen by the last completed
+    ingest (collections.upstream_total). That position is tracked rather
+    than the stored row count, because upstream items without a body are
+    never stored. If the upstream total shrank (renumbering) or full is
+    set, every page is fetched again.
+    """
+    headers = headers or {}
+    seen = conn.execute("SELECT upstream_total FROM collections WHERE name = ?", (collection,)).fetchone()
+    if seen is None:
+        # Corpus ingested before positions were recorded: the stored count is a safe lower bound
+        seen = conn.execute("SELECT count(*) FROM hadith WHERE collection = ?", (collection,)).fetchone()
+    seen = seen[0]
+    first = _fetch_page(base_url, headers, collection, 1, page_size)
+    total = int(first.get("total") or 0)
+
+    if not full and seen and seen == total:
+        log.info(f"{collection}: up to date ({total} upstream items)")
+        return 0
+    if total < seen:
+        log.warning(f"{collection}: upstream total {total} < {seen} seen; refetching all pages")
+        full = True
+
+    start_page = 1 if full else seen // page_size + 1
+    pages = max(1, -(-total // page_size))
+    written = 0
+    for page in range(start_page, pages + 1):
+        data = first if page == 1 else _fetch_page(base_url, headers, collection, page, page_size)
+        with conn:
+            written += _store_page(conn, collection, data.get("data", []))
+        if not data.get("data"):
+            break
+        if page % 20 == 0:
+            log.info(f"{collection}: page {page}/{pages} ({written} written)")
+
+    with conn:
+        conn.execute(
+            "INSERT INTO collections (name, upstream_total, refreshed_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET upstream_total = excluded.upstream_total, refreshed_at = excluded.refreshed_at",
+            (collection, total, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+        )
+    log.info(f"{collection}: {written} hadith written from pages {start_page}–{pages} (upstream total {total})")
+    return written
+
+
+def ingest(
+    collections: list[str] | None = None,
+    base_url: str = SUNNAH_API_BASE,
+    api_key: str | None = SUNNAH_API_KEY,
+    path=HADITH_CORPUS_PATH,
+    full: bool = False,
+    page_size: int = HADITH_CORPUS_PAGE_SIZE,
+) -> dict[str, int]:
+    """
+    Mirror (or delta-refresh) collections into the corpus at path.
+
+    Returns:
+        Collection → hadith written, or -1 for a collection that failed
+    """
+    conn = _connect(path, read_only=False)
+    headers = {"x-api-key": api_key} if api_key else {}
+    written: dict[str, int] = {}
+    try:
+        for collection in collections or list(HADITH_COLLECTIONS):
+            try:
+                written[collection] = ingest_collection(conn, collection, base_url, headers, full, page_size)
+            except (requests.RequestException, ValueError) as e:
+                log.error(f"{collection}: ingest failed, keeping stored rows: {e}")
+                written[collection] = -1
+        with conn:
+            conn.execute("INSERT INTO hadith_fts(hadith_fts) VALUES ('optimize')")
+    finally:
+        conn.close()
+    return written
+
+
+if __name__ == "__main__":
+    import sys
+
+    args = sys.argv[1:]
+    base_url = SUNNAH_API_BASE
+    if "--base-url" in args:
+        position = args.index("--base-url")
+        base_url = args[position + 1]
+        del args[position:position + 2]
+    full = "--full" in args
+    names = [a for a in args if not a.startswith("--")]
+    result = ingest(names or None, base_url=base_url, full=full)
+    print(json.dumps(result, indent=2))
+    raise SystemExit(1 if any(count < 0 for count in result.values()) else 0)
@@ -0,0 +1,299 @@
+"""
+Hidayah AI — Precomputed Ayah → Hadith Relatedness
+Offline job that ranks related hadith from the local corpus
+(utils/hadith_corpus.py) for all 6,236 ayahs. At request time the context
+bundle reads an ayah's row in O(1) instead of running a search.
+
+Candidates come from BM25 over the ayah's surah name and full translation.
+Optionally (--embed) they are re-ranked by blending in the cosine
+similarity of Gemini embeddings; those go through the persistent embedding
+cache, so rebuilds only embed new text.
+
+Layout (RELATED_HADITH_PATH + suffix):
+  .npz  — hadith_ids int32 (6236 × k, -1 = empty) and scores float32,
+          row = global ayah number - 1, best first
+  .json — k, collections covered, corpus identity (id, size, highest row
+          id), method, build time
+
+Build:       python -m utils.hadith_relatedness [--embed] [--full]
+Benchmark:   python -m utils.hadith_relatedness --bench 500
+When the corpus gains collections, a rebuild scores only those collections
+and merges them into each ayah's row (--full recomputes everything). Row ids
+are only valid for the corpus file they were read from: a table whose
+corpus_id differs from the corpus on disk (rebuilt or re-ingested into a new
+file) is ignored at load time and rebuilt in full.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+from utils.config import (
+    HADITH_COLLECTIONS,
+    RELATED_HADITH_PATH,
+    RELATED_HADITH_TOP_K,
+    RELATED_HADITH_BUILD_WORKERS,
+)
+from utils.logger import get_logger
+from utils import hadith_corpus
+
+log = get_logger("hadith_relatedness")
+
+TABLE_VERSION = 1
+TOTAL_AYAHS = 6236
+_EMBED_CANDIDATES = 3       # Lexical candidates per slot considered by the embedding re-rank
+_EMBED_LEXICAL_WEIGHT = 0.3  # Share of the blended score kept from (per-ayah scaled) BM25
+_EMBED_MAX_CHARS = 2000
+
+_table = None
+_table_loaded = False
+_table_lock = threading.Lock()
+
+
+def _all_ayahs() -> list[dict]:
+    from utils.quran_snapshot import get_snapshot
+
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return []
+    ayahs = [ayah for juz in range(1, 31) for ayah in snapshot.get_juz(juz)]
+    return sorted(ayahs, key=lambda ayah: ayah["number"])
+
+
+def _ayah_query(ayah: dict) -> str:
+    # Same text fetch_related_hadith searches with
+    return f"{ayah.get('surah_name', '')} {ayah.get('english', '')}".strip()
+
+
+def _score_lexical(ayahs: list[dict], limit: int, collections: list[str] | None) -> list[list[tuple[int, float]]]:
+    """BM25 candidates per ayah, searched on RELATED_HADITH_BUILD_WORKERS threads (SQLite releases the GIL)."""
+    with ThreadPoolExecutor(max_workers=RELATED_HADITH_BUILD_WORKERS, thread_name_prefix="hidayah-related") as pool:
+        return list(pool.map(lambda ayah: hadith_corpus.search_ids(_ayah_query(ayah), limit, collections), ayahs, chunksize=64))
+
+
+def _rerank_with_embeddings(ayahs: list[dict], candidates: list[list[tuple[int, float]]]) -> list[list[tuple[int, float]]] | None:
+    """Blend BM25 (scaled to 0–1 per ayah) with embedding cosine; None if embedding failed."""
+    from rag.vector_store import embed_texts
+
+    hadith_ids = sorted({row_id for row in candidates for row_id, _ in row})
+    texts = hadith_corpus.get_hadith_texts(hadith_ids)
+    hadith_ids = [row_id for row_id in hadith_ids if texts.get(row_id)]
+    ayah_vectors = embed_texts([_ayah_query(ayah)[:_EMBED_MAX_CHARS] for ayah in ayahs])
+    hadith_vectors = embed_texts([texts[row_id][:_EMBED_MAX_CHARS] for row_id in hadith_ids])
+    if not isinstance(ayah_vectors, np.ndarray) or not isinstance(hadith_vectors, np.ndarray):
+        return None
+
+    def unit(vectors):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    ayah_vectors, hadith_vectors = unit(ayah_vectors), unit(hadith_vectors)
+    position = {row_id: i for i, row_id in enumerate(hadith_ids)}
+    reranked = []
+    for i, row in enumerate(candidates):
+        row = [(row_id, score) for row_id, score in row if row_id in position]
+        if not row:
+            reranked.append([])
+            continue
+        lexical = np.array([score for _, score in row])
+        spread = lexical.max() - lexical.min()
+        lexical = (lexical - lexical.min()) / spread if spread else np.ones_like(lexical)
+        cosine = hadith_vectors[[position[row_id] for row_id, _ in row]] @ ayah_vectors[i]
+        blended = _EMBED_LEXICAL_WEIGHT * lexical + (1 - _EMBED_LEXICAL_WEIGHT) * cosine
+        reranked.append(sorted(zip((row_id for row_id, _ in row), blended.tolist()), key=lambda pair: -pair[1]))
+    return reranked
+
+
+def _load_existing(path) -> tuple[np.ndarray, np.ndarray, dict] | None:
+    try:
+        with open(f"{path}.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        data = np.load(f"{path}.npz")
+        return data["hadith_ids"], data["scores"], meta
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _corpus_collections() -> list[str]:
+    present = set(hadith_corpus.collection_counts())
+    # HADITH_COLLECTIONS order first, then anything else ingested
+    return [name for name in HADITH_COLLECTIONS if name in present] + sorted(present - set(HADITH_COLLECTIONS))
+
+
+def build_relatedness(
+    path=RELATED_HADITH_PATH,
+    k: int = RELATED_HADITH_TOP_K,
+    use_embeddings: bool = False,
+    full: bool = False,
+    limit: int | None = None,
+) -> dict | None:
+    """
+    Compute (or incrementally extend) the ayah → hadith table.
+
+    An existing table built with the same k and method is extended with only
+    the collections it does not cover yet: each ayah's new candidates are
+    merged into its row by score. BM25 statistics shift as the corpus
+    grows, so a periodic --full rebuild keeps old and new scores comparable.
+
+    Args:
+        path: Output path without suffix
+        k: Hadith kept per ayah
+        use_embeddings: Re-rank lexical candidates with embedding similarity
+        full: Ignore any existing table
+        limit: Only score the first `limit` ayahs and write nothing (benchmark)
+
+    Returns:
+        Job stats (ayahs, seconds, ayahs_per_second, collections scored), or None if inputs are missing
+    """
+    ayahs = _all_ayahs()
+    collections = _corpus_collections()
+    if len(ayahs) != TOTAL_AYAHS or not collections:
+        log.error(
+            f"Relatedness build needs the Quran snapshot ({len(ayahs)}/{TOTAL_AYAHS} ayahs) "
+            f"and an ingested hadith corpus ({len(collections)} collections)"
+        )
+        return None
+
+    method = "bm25+embedding" if use_embeddings else "bm25"
+    hadith_ids = np.full((TOTAL_AYAHS, k), -1, dtype=np.int32)
+    scores = np.full((TOTAL_AYAHS, k), -np.inf, dtype=np.float32)
+    to_score = collections
+    existing = None if full or limit else _load_existing(path)
+    identity = hadith_corpus.corpus_identity() or {}
+    if existing is not None:
+        old_ids, old_scores, meta = existing
+        if (
+            meta.get("version") == TABLE_VERSION
+            and meta.get("k") == k
+            and meta.get("method") == method
+            and _matches_corpus(meta, identity)
+        ):
+            to_score = [name for name in collections if name not in meta.get("collections", [])]
+            if not to_score:
+                log.info(f"Relatedness table already covers {', '.join(collections)}")
+                return {"ayahs": 0, "seconds": 0.0, "ayahs_per_second": 0.0, "collections": []}
+            hadith_ids, scores = old_ids.copy(), old_scores.astype(np.float32)
+            log.info(f"Incremental relatedness build for new collections: {', '.join(to_score)}")
+
+    targets = ayahs[:limit] if limit else ayahs
+    started = time.perf_counter()
+    candidate_limit = k * _EMBED_CANDIDATES if use_embeddings else k
+    # Restrict the search only when extending; a full build searches the whole corpus at once
+    candidates = _score_lexical(targets, candidate_limit, to_score if to_score != collections else None)
+    lexical_seconds = time.perf_counter() - started
+
+    if use_embeddings:
+        reranked = _rerank_with_embeddings(targets, candidates)
+        if reranked is None:
+            log.error("Embedding re-rank failed (no API key or rate-limited); table not written")
+            return None
+        candidates = reranked
+
+    for i, row in enumerate(candidates):
+        merged = [(int(row_id), float(score)) for row_id, score in zip(hadith_ids[i], scores[i]) if row_id >= 0]
+        merged += [(int(row_id), float(score)) for row_id, score in row]
+        merged = sorted(dict(merged).items(), key=lambda pair: -pair[1])[:k]
+        hadith_ids[i, :] = -1
+        scores[i, :] = -np.inf
+        for j, (row_id, score) in enumerate(merged):
+            hadith_ids[i, j], scores[i, j] = row_id, score
+
+    seconds = time.perf_counter() - started
+    stats = {
+        "ayahs": len(targets),
+        "seconds": round(seconds, 3),
+        "lexical_seconds": round(lexical_seconds, 3),
+        "ayahs_per_second": round(len(targets) / seconds, 1) if seconds else 0.0,
+        "collections": to_score,
+    }
+    log.info(
+        f"Scored {len(targets)} ayahs against {', '.join(to_score)} in {seconds:.1f}s "
+        f"({stats['ayahs_per_second']} ayahs/s, {RELATED_HADITH_BUILD_WORKERS} workers, {method})"
+    )
+    if limit:
+        return stats
+
+    directory = os.path.dirname(str(path))
+    os.makedirs(directory, exist_ok=True)
+    np.savez(f"{path}.tmp.npz", hadith_ids=hadith_ids, scores=scores)
+    meta = {
+        "version": TABLE_VERSION,
+        "k": k,
+        "method": method,
+        "collections": collections,
+        "corpus_id": identity.get("corpus_id"),
+        "corpus_rows": identity.get("rows"),
+        "max_row_id": int(hadith_ids.max()),
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    with open(f"{path}.tmp.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(f"{path}.tmp.npz", f"{path}.npz")
+    os.replace(f"{path}.tmp.json", f"{path}.json")
+    _reset_table()
+    return stats
+
+
+def _matches_corpus(meta: dict, identity: dict) -> bool:
+    """True when the table's row ids were read from this corpus file."""
+    return (
+        bool(identity.get("corpus_id"))
+        and meta.get("corpus_id") == identity["corpus_id"]
+        and meta.get("max_row_id", float("inf")) <= identity.get("max_id", 0)
+    )
+
+
+def _reset_table() -> None:
+    global _table, _table_loaded
+    with _table_lock:
+        _table, _table_loaded = None, False
+
+
+def _get_table() -> np.ndarray | None:
+    global _table, _table_loaded
+    if _table_loaded:
+        return _table
+    with _table_lock:
+        if not _table_loaded:
+            existing = _load_existing(RELATED_HADITH_PATH)
+            if existing is not None and existing[0].shape[0] == TOTAL_AYAHS:
+                meta = existing[2]
+                if _matches_corpus(meta, hadith_corpus.corpus_identity() or {}):
+                    _table = existing[0]
+                    log.info(f"Related-hadith table loaded ({meta.get('method')}, k={meta.get('k')})")
+                else:
+                    log.warning(
+                        "Related-hadith table was built against a different hadith corpus; ignoring it "
+                        "(rebuild with: python -m utils.hadith_relatedness --full)"
+                    )
+            _table_loaded = True
+    return _table
+
+
+def related_hadith_for_ayah(ayah_global_number: int, max_results: int) -> list[dict] | None:
+    """
+    Precomputed related hadith for an ayah (global number 1–6236).
+
+    Returns:
+        Normalized hadith dicts, best first, or None when no table is
+        available for this ayah (the caller should search instead)
+    """
+    table = _get_table()
+    if table is None or not 1 <= ayah_global_number <= TOTAL_AYAHS:
+        return None
+    row = table[ayah_global_number - 1]
+    return hadith_corpus.get_hadith_by_ids([int(row_id) for row_id in row[:max_results] if row_id >= 0])
+
+
+if __name__ == "__main__":
+    import sys
+
+    args = sys.argv[1:]
+    bench = int(args[args.index("--bench") + 1]) if "--bench" in args else None
+    stats = build_relatedness(use_embeddings="--embed" in args, full="--full" in args, limit=bench)
+    print(json.dumps(stats, indent=2))
+    raise SystemExit(0 if stats is not None else 1)
@@ -0,0 +1,106 @@
+"""
+Hidayah AI — Pooled HTTP Client
+Shared, thread-safe requests.Session per upstream host with keep-alive
+connection pools, so provider adapters stop paying a TCP+TLS handshake on
+every call. Per-host pool metrics (requests, handshakes, reuse) are logged
+every HTTP_POOL_METRICS_LOG_INTERVAL seconds.
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from utils.config import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_POOL_METRICS_LOG_INTERVAL
+from utils.logger import get_logger
+
+log = get_logger("http_client")
+
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+_metrics_logged_at = time.monotonic()
+_metrics_log_lock = threading.Lock()
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def get_session(url: str) -> requests.Session:
+    """Return the shared pooled session for the URL's scheme + host."""
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            # pool_block=False: bursts beyond maxsize open short-lived extra
+            # connections instead of stalling callers.
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                pool_block=False,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+            log.info(f"Opened pooled session for {key} (maxsize={HTTP_POOL_MAXSIZE})")
+    return session
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """requests.get drop-in that reuses the host's keep-alive pool."""
+    try:
+        return get_session(url).get(url, **kwargs)
+    finally:
+        _maybe_log_metrics()
+
+
+def _maybe_log_metrics() -> None:
+    """Log one pool metrics line per host at most every HTTP_POOL_METRICS_LOG_INTERVAL seconds."""
+    global _metrics_logged_at
+    if not HTTP_POOL_METRICS_LOG_INTERVAL or time.monotonic() - _metrics_logged_at < HTTP_POOL_METRICS_LOG_INTERVAL:
+        return
+    if not _metrics_log_lock.acquire(blocking=False):
+        return
+    try:
+        _metrics_logged_at = time.monotonic()
+        for host, m in get_pool_metrics().items():
+            log.info(f"Pool {host}: {m['requests']} requests, {m['handshakes']} handshakes, reuse {m['reuse_ratio']:.0%}")
+    finally:
+        _metrics_log_lock.release()
+
+
+def get_pool_metrics() -> dict[str, dict]:
+    """Per-host connection pool metrics.
+
+    Returns:
+        {host: {"requests": int, "handshakes": int, "reuse_ratio": float}}
+        where handshakes counts new TCP(+TLS) connections opened by urllib3.
+    """
+    with _sessions_lock:
+        sessions = dict(_sessions)
+
+    metrics = {}
+    for host, session in sessions.items():
+        total_requests = 0
+        handshakes = 0
+        for adapter in {id(a): a for a in session.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                total_requests += pool.num_requests
+                handshakes += pool.num_connections
+        reuse_ratio = 1 - (handshakes / total_requests) if total_requests else 0.0
+        metrics[host] = {
+            "requests": total_requests,
+            "handshakes": handshakes,
+            "reuse_ratio": round(max(reuse_ratio, 0.0), 3),
+        }
+    return metrics
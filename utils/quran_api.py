@@ -7,9 +7,12 @@ import requests
 import streamlit as st
 from utils.config import QURAN_API_BASE, ARABIC_EDITION, ENGLISH_EDITION, URDU_EDITION, ENGLISH_AUDIO_EDITION, URDU_AUDIO_EDITION
 from utils.retry import get_with_retry
+from utils.shared_cache import shared_cache
+from utils.concurrency import run_parallel
+from utils.quran_snapshot import load_juz_from_snapshot
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@shared_cache("juz")
 def _fetch_juz_edition(juz_number: int, edition: str) -> dict | None:
     """Fetch a specific Juz in a specific edition from AlQuran.cloud."""
     url = f"{QURAN_API_BASE}/juz/{juz_number}/{edition}"
@@ -50,10 +53,11 @@ def fetch_juz_urdu_audio(juz_number: int) -> dict | None:
     return _fetch_juz_edition(juz_number, URDU_AUDIO_EDITION)
 
 
-@st.cache_data(ttl=3600, show_spinner="Loading Quranic text...")
 def fetch_juz_combined(juz_number: int) -> list[dict]:
     """
     Fetch and merge Arabic, English, and Urdu data for a Juz.
+    Served from the local mmap snapshot when one is built; otherwise
+    falls back to AlQuran.cloud via fetch_juz_remote.
     Returns a list of ayah dicts:
     [
         {
@@ -72,11 +76,38 @@ def fetch_juz_combined(juz_number: int) -> list[dict]:
         ...
     ]
     """
-    arabic_data = fetch_juz_arabic(juz_number)
-    english_data = fetch_juz_english(juz_number)
-    urdu_data = fetch_juz_urdu(juz_number)
-    english_audio_data = fetch_juz_english_audio(juz_number)
-    urdu_audio_data = fetch_juz_urdu_audio(juz_number)
+    ayahs = load_juz_from_snapshot(juz_number)
+    if ayahs:
+        return ayahs
+    return fetch_juz_remote(juz_number)
+
+
+@st.cache_data(ttl=3600, show_spinner="Loading Quranic text...")
+def fetch_juz_remote(juz_number: int) -> list[dict]:
+    """Fetch all five editions of a Juz from AlQuran.cloud and merge them."""
+    return _fetch_juz_merged(juz_number)
+
+
+def _fetch_juz_merged(juz_number: int) -> list[dict]:
+    """fetch_juz_remote without the Streamlit cache, for use outside a Streamlit runtime."""
+    # Fire all five edition requests at once; a failed edition maps to None
+    # and the merge below degrades to empty strings for that field.
+    editions = run_parallel(
+        {
+            "arabic": lambda: fetch_juz_arabic(juz_number),
+            "english": lambda: fetch_juz_english(juz_number),
+            "urdu": lambda: fetch_juz_urdu(juz_number),
+            "english_audio": lambda: fetch_juz_english_audio(juz_number),
+            "urdu_audio": lambda: fetch_juz_urdu_audio(juz_number),
+        },
+        max_workers=5,
+        label=f"quran:juz:{juz_number}",
+    )
+    arabic_data = editions.get("arabic")
+    english_data = editions.get("english")
+    urdu_data = editions.get("urdu")
+    english_audio_data = editions.get("english_audio")
+    urdu_audio_data = editions.get("urdu_audio")
 
     if not arabic_data:
         return []
@@ -0,0 +1,246 @@
+"""
+Hidayah AI — Offline Quran Corpus Snapshot
+Builds a compact, columnar on-disk copy of all 30 Juz (Arabic, English, Urdu
+and both audio editions) and serves Juz lookups from it through mmap.
+
+Layout (under QURAN_SNAPSHOT_DIR):
+  manifest.json — editions, surah table, juz ranges and column offsets
+  columns.bin   — int32 columns + UTF-8 text columns (int64 offsets + blob),
+                  every column indexed by global ayah number - 1
+
+Build with: python -m utils.quran_snapshot
+"""
+
+import json
+import mmap
+import os
+import shutil
+import threading
+import numpy as np
+from utils.config import (
+    QURAN_SNAPSHOT_DIR,
+    ARABIC_EDITION,
+    ENGLISH_EDITION,
+    URDU_EDITION,
+    ENGLISH_AUDIO_EDITION,
+    URDU_AUDIO_EDITION,
+)
+from utils.logger import get_logger
+
+log = get_logger("quran_snapshot")
+
+SNAPSHOT_VERSION = 1
+TOTAL_AYAHS = 6236
+_MANIFEST_FILE = "manifest.json"
+_COLUMNS_FILE = "columns.bin"
+
+_INT_COLUMNS = ("number_in_surah", "surah_number", "page", "juz")
+_TEXT_COLUMNS = ("arabic", "english", "urdu", "audio_url", "audio_en", "audio_ur", "audio_secondary")
+
+
+def _editions() -> list[str]:
+    return [ARABIC_EDITION, ENGLISH_EDITION, URDU_EDITION, ENGLISH_AUDIO_EDITION, URDU_AUDIO_EDITION]
+
+
+class QuranSnapshot:
+    """Read-only view over a built snapshot. Columns are slices of one mmap."""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, _MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self._file = open(os.path.join(directory, _COLUMNS_FILE), "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+
+        columns = self.manifest["columns"]
+        count = self.manifest["ayah_count"]
+        self._ints = {
+            name: np.frombuffer(self._buf, dtype=np.int32, count=count, offset=columns[name]["offset"])
+            for name in _INT_COLUMNS
+        }
+        self._texts = {
+            name: (
+                np.frombuffer(self._buf, dtype=np.int64, count=count + 1, offset=columns[name]["offsets"]),
+                columns[name]["data"],
+            )
+            for name in _TEXT_COLUMNS
+        }
+        self._surahs = {int(k): v for k, v in self.manifest["surahs"].items()}
+        self._juz_ranges = {int(k): v for k, v in self.manifest["juz_ranges"].items()}
+
+    def _text(self, column: str, idx: int) -> str:
+        offsets, base = self._texts[column]
+        start, end = int(offsets[idx]), int(offsets[idx + 1])
+        return bytes(self._buf[base + start:base + end]).decode("utf-8")
+
+    def matches_editions(self, editions: list[str]) -> bool:
+        return self.manifest.get("editions") == editions
+
+    def get_juz(self, juz_number: int) -> list[dict]:
+        """Return the fetch_juz_combined-shaped ayah list for one Juz."""
+        bounds = self._juz_ranges.get(juz_number)
+        if not bounds:
+            return []
+
+        first, last = bounds
+        combined = []
+        for num in range(first, last + 1):
+            idx = num - 1
+            surah_number = int(self._ints["surah_number"][idx])
+            surah = self._surahs.get(surah_number, {})
+            combined.append({
+                "number": num,
+                "number_in_surah": int(self._ints["number_in_surah"][idx]),
+                "surah_number": surah_number,
+                "surah_name": surah.get("englishName", ""),
+                "surah_english_name": surah.get("englishNameTranslation", ""),
+                "surah_arabic_name": surah.get("name", ""),
+                "arabic": self._text("arabic", idx),
+                "english": self._text("english", idx),
+                "urdu": self._text("urdu", idx),
+                "audio_url": self._text("audio_url", idx),
+                "audio_en": self._text("audio_en", idx),
+                "audio_ur": self._text("audio_ur", idx),
+                "audio_secondary": json.loads(self._text("audio_secondary", idx) or "[]"),
+                "page": int(self._ints["page"][idx]),
+                "juz": int(self._ints["juz"][idx]),
+            })
+        return combined
+
+
+_snapshot: QuranSnapshot | None = None
+_snapshot_loaded = False
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot() -> QuranSnapshot | None:
+    """Open the snapshot once per process. Returns None if absent, stale or unreadable."""
+    global _snapshot, _snapshot_loaded
+    if _snapshot_loaded:
+        return _snapshot
+
+    with _snapshot_lock:
+        if _snapshot_loaded:
+            return _snapshot
+        manifest_path = os.path.join(QURAN_SNAPSHOT_DIR, _MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            try:
+                snapshot = QuranSnapshot(QURAN_SNAPSHOT_DIR)
+                if snapshot.manifest.get("version") != SNAPSHOT_VERSION:
+                    log.warning("Quran snapshot version mismatch — ignoring, network fallback in use")
+                elif not snapshot.matches_editions(_editions()):
+                    log.warning("Quran snapshot editions differ from config — ignoring, network fallback in use")
+                else:
+                    _snapshot = snapshot
+                    log.info(f"Quran snapshot mapped from {QURAN_SNAPSHOT_DIR}")
+            except (OSError, ValueError, KeyError) as e:
+                log.warning(f"Failed to open Quran snapshot: {e}")
+        _snapshot_loaded = True
+    return _snapshot
+
+
+def load_juz_from_snapshot(juz_number: int) -> list[dict]:
+    """Return a Juz from the local snapshot, or [] if no usable snapshot exists."""
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return []
+    return snapshot.get_juz(juz_number)
+
+
+# ── Build ────────────────────────────────────────────────────────
+
+def _write_snapshot(directory, ayahs: list[dict]) -> None:
+    """Serialize merged ayah dicts (sorted, complete) into manifest + columns.bin."""
+    count = len(ayahs)
+    surahs = {}
+    juz_ranges = {}
+    columns = {}
+
+    for ayah in ayahs:
+        surahs.setdefault(str(ayah["surah_number"]), {
+            "name": ayah["surah_arabic_name"],
+            "englishName": ayah["surah_name"],
+            "englishNameTranslation": ayah["surah_english_name"],
+        })
+        bounds = juz_ranges.setdefault(str(ayah["juz"]), [ayah["number"], ayah["number"]])
+        bounds[0] = min(bounds[0], ayah["number"])
+        bounds[1] = max(bounds[1], ayah["number"])
+
+    with open(os.path.join(directory, _COLUMNS_FILE), "wb") as f:
+        for name in _INT_COLUMNS:
+            columns[name] = {"offset": f.tell()}
+            f.write(np.array([a[name] for a in ayahs], dtype=np.int32).tobytes())
+
+        for name in _TEXT_COLUMNS:
+            encoded = [
+                (json.dumps(a[name], ensure_ascii=False) if name == "audio_secondary" else (a[name] or "")).encode("utf-8")
+                for a in ayahs
+            ]
+            offsets = np.zeros(count + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(b) for b in encoded])
+            # Keep int64 offset arrays 8-byte aligned for np.frombuffer
+            f.write(b"\0" * (-f.tell() % 8))
+            columns[name] = {"offsets": f.tell()}
+            f.write(offsets.tobytes())
+            columns[name]["data"] = f.tell()
+            f.write(b"".join(encoded))
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "editions": _editions(),
+        "ayah_count": count,
+        "surahs": surahs,
+        "juz_ranges": juz_ranges,
+        "columns": columns,
+    }
+    with open(os.path.join(directory, _MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+
+def build_snapshot(directory=QURAN_SNAPSHOT_DIR) -> bool:
+    """Download all 30 Juz across every configured edition and write a snapshot.
+
+    The snapshot is written to a temporary sibling directory and swapped in
+    only when every Juz merged cleanly, so a partial download never replaces
+    a good snapshot.
+    """
+    from utils.quran_api import _fetch_juz_merged
+
+    ayahs = []
+    for juz_number in range(1, 31):
+        juz_ayahs = _fetch_juz_merged(juz_number)
+        missing = [
+            a["number"] for a in juz_ayahs
+            if not (a["english"] and a["urdu"] and a["audio_en"] and a["audio_ur"])
+        ]
+        if not juz_ayahs or missing:
+            log.error(f"Snapshot build aborted: Juz {juz_number} incomplete ({len(missing)} ayahs missing editions)")
+            return False
+        ayahs.extend(juz_ayahs)
+        log.info(f"Snapshot build: Juz {juz_number} — {len(juz_ayahs)} ayahs")
+
+    by_number = {a["number"]: a for a in ayahs}
+    if sorted(by_number) != list(range(1, TOTAL_AYAHS + 1)):
+        log.error(f"Snapshot build aborted: expected {TOTAL_AYAHS} ayahs, got {len(by_number)}")
+        return False
+
+    directory = str(directory)
+    tmp_dir = f"{directory}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    _write_snapshot(tmp_dir, [by_number[n] for n in range(1, TOTAL_AYAHS + 1)])
+
+    old_dir = f"{directory}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(directory):
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    size_kb = os.path.getsize(os.path.join(directory, _COLUMNS_FILE)) / 1024
+    log.info(f"Quran snapshot written to {directory} ({TOTAL_AYAHS} ayahs, {size_kb:.0f} KB)")
+    return True
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if build_snapshot() else 1)
@@ -8,14 +8,29 @@ API docs: https://api-docs.quran.com/
 
 import requests
 import streamlit as st
-from utils.config import QURANCOM_API_BASE, QURANCOM_TAFSIRS
+from utils.config import (
+    QURANCOM_API_BASE,
+    QURANCOM_TAFSIRS,
+    QURANCOM_RANGE_PER_PAGE,
+    QURANCOM_RANGE_CACHE_TTL,
+    QURANCOM_RANGE_CACHE_MAX_ENTRIES,
+)
 from utils.evidence import normalize_tafseer
 from utils.logger import get_logger
 from utils.retry import get_with_retry
+from utils.shared_cache import shared_cache
+from collections import OrderedDict
 import re
+import threading
+import time
 
 log = get_logger("qurancom_api")
 
+# Per-ayah records filled by range prefetches: (tafsir_id, "s:a") → (stored_at, record).
+# Consulted by fetch_tafsir_for_ayah before it goes to the network.
+_prefetched: OrderedDict = OrderedDict()
+_prefetched_lock = threading.Lock()
+
 
 def _strip_html(text: str) -> str:
     """Remove HTML tags from tafsir text returned by Quran.com."""
@@ -27,7 +42,7 @@ def _strip_html(text: str) -> str:
     return cleaned
 
 
-@st.cache_data(ttl=86400, show_spinner=False)
+@shared_cache("tafsir_catalog")
 def list_available_tafsirs(language: str = "en") -> list[dict]:
     """List available tafsir resources from Quran.com for a language.
 
@@ -61,6 +76,180 @@ def list_available_tafsirs(language: str = "en") -> list[dict]:
         return []
 
 
+def _normalize_qurancom_tafsir(
+    surah_number: int,
+    ayah_number: int,
+    tafsir_id: int,
+    resource_name: str,
+    text: str,
+    url: str,
+    language: str,
+) -> dict:
+    """Wrap cleaned Quran.com tafsir text in the shared evidence schema."""
+    ayah_key = f"{surah_number}:{ayah_number}"
+    human_url = f"https://quran.com/{surah_number}:{ayah_number}/tafsirs/{tafsir_id}"
+
+    return normalize_tafseer(
+        source_id=f"qurancom:{tafsir_id}",
+        source_name=resource_name,
+        surah_number=surah_number,
+        ayah_number=ayah_number,
+        text=text,
+        url=url,
+        language=language,
+        citation_id=f"tafsir:qurancom:{tafsir_id}:{ayah_key}",
+        canonical_url=human_url,
+        link_type="api_verified",
+        canonical_status="verified",
+        source_rank=1,
+        authority="Classical Tafseer (Verified)",
+        metadata={
+            "provider": "quran.com",
+            "tafsir_id": tafsir_id,
+            "tafsir_name": resource_name,
+            "language": language,
+            "source_type": "tafsir",
+            "api_url": url,
+            "canonical_url_human": human_url,
+            "fallback_language_used": False,
+        },
+    )
+
+
+def _store_prefetched(tafsir_id: int, records: dict[str, dict]) -> None:
+    """Add range-fetched per-ayah records to the bounded TTL cache."""
+    now = time.monotonic()
+    with _prefetched_lock:
+        for ayah_key, record in records.items():
+            cache_key = (tafsir_id, ayah_key)
+            _prefetched[cache_key] = (now, record)
+            _prefetched.move_to_end(cache_key)
+        while len(_prefetched) > QURANCOM_RANGE_CACHE_MAX_ENTRIES:
+            _prefetched.popitem(last=False)
+
+
+def _get_prefetched(tafsir_id: int, ayah_key: str) -> dict | None:
+    """Return a fresh prefetched record (as a copy), or None."""
+    with _prefetched_lock:
+        entry = _prefetched.get((tafsir_id, ayah_key))
+        if not entry:
+            return None
+        stored_at, record = entry
+        if time.monotonic() - stored_at > QURANCOM_RANGE_CACHE_TTL:
+            del _prefetched[(tafsir_id, ayah_key)]
+            return None
+        return {**record, "metadata": {**record.get("metadata", {})}}
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_tafsir_range(tafsir_id: int, scope: str, number: int) -> dict[str, str]:
+    """Fetch a whole chapter or mushaf page of one tafsir, following pagination.
+
+    Args:
+        tafsir_id: Quran.com tafsir resource ID.
+        scope: "by_chapter" or "by_page".
+        number: Chapter number (1-114) or mushaf page number (1-604).
+
+    Returns:
+        Mapping of verse key ("2:255") → cleaned tafsir text. Verses that
+        share a grouped commentary inherit the text of the group head.
+    """
+    url = f"{QURANCOM_API_BASE}/tafsirs/{tafsir_id}/{scope}/{number}"
+    texts: dict[str, str] = {}
+    group_text = ""
+    page = 1
+
+    while page:
+        resp = get_with_retry(
+            url,
+            params={"page": page, "per_page": QURANCOM_RANGE_PER_PAGE},
+            timeout=20,
+            label=f"qurancom:tafsir_range:{tafsir_id}:{scope}:{number}:p{page}",
+        )
+        resp.raise_for_status()
+        data = resp.json()
+
+        for entry in data.get("tafsirs", []):
+            verse_key = entry.get("verse_key", "")
+            if not verse_key:
+                continue
+            text = _strip_html(entry.get("text", ""))
+            if text:
+                group_text = text
+            if group_text:
+                texts[verse_key] = group_text
+
+        page = (data.get("pagination") or {}).get("next_page")
+
+    return texts
+
+
+def prefetch_tafsir_range(
+    tafsir_id: int,
+    tafsir_name: str = "",
+    language: str = "en",
+    chapter: int | None = None,
+    page: int | None = None,
+) -> dict[str, dict]:
+    """Fetch one tafsir for a chapter or page and fill the per-ayah cache.
+
+    Exactly one of chapter / page must be given.
+
+    Returns:
+        Mapping of verse key → normalized tafsir evidence dict.
+    """
+    if (chapter is None) == (page is None):
+        raise ValueError("prefetch_tafsir_range needs exactly one of chapter or page")
+
+    scope, number = ("by_chapter", chapter) if chapter is not None else ("by_page", page)
+
+    try:
+        texts = _fetch_tafsir_range(tafsir_id, scope, number)
+    except requests.RequestException as e:
+        log.warning(f"Quran.com tafsir range fetch error ({scope} {number}, tafsir {tafsir_id}): {e}")
+        return {}
+
+    resource_name = tafsir_name or f"Tafsir {tafsir_id}"
+    records = {}
+    for verse_key, text in texts.items():
+        surah_str, _, ayah_str = verse_key.partition(":")
+        if not (surah_str.isdigit() and ayah_str.isdigit()):
+            continue
+        records[verse_key] = _normalize_qurancom_tafsir(
+            surah_number=int(surah_str),
+            ayah_number=int(ayah_str),
+            tafsir_id=tafsir_id,
+            resource_name=resource_name,
+            text=text,
+            # The per-ayah endpoint, so records match fetch_tafsir_for_ayah's own
+            url=f"{QURANCOM_API_BASE}/tafsirs/{tafsir_id}/by_ayah/{verse_key}",
+            language=language,
+        )
+
+    _store_prefetched(tafsir_id, records)
+    log.info(f"Quran.com prefetched {len(records)} ayahs of tafsir {tafsir_id} ({scope} {number})")
+    return records
+
+
+def prefetch_tafseer_for_page(page: int, language: str = "en", max_sources: int = 3) -> int:
+    """Prefetch every configured tafsir for a mushaf page (one range call per tafsir).
+
+    Returns:
+        Number of tafsir resources that returned data.
+    """
+    filled = 0
+    for tafsir in list_available_tafsirs(language)[:max_sources]:
+        records = prefetch_tafsir_range(
+            tafsir_id=tafsir["id"],
+            tafsir_name=tafsir.get("name", ""),
+            language=language,
+            page=page,
+        )
+        if records:
+            filled += 1
+    return filled
+
+
 @st.cache_data(ttl=3600, show_spinner=False)
 def fetch_tafsir_for_ayah(
     surah_number: int,
@@ -82,6 +271,13 @@ def fetch_tafsir_for_ayah(
         Normalized tafsir evidence dict, or None on failure.
     """
     ayah_key = f"{surah_number}:{ayah_number}"
+    prefetched = _get_prefetched(tafsir_id, ayah_key)
+    if prefetched:
+        if tafsir_name:
+            prefetched["source_name"] = tafsir_name
+            prefetched["metadata"]["tafsir_name"] = tafsir_name
+        return prefetched
+
     url = f"{QURANCOM_API_BASE}/tafsirs/{tafsir_id}/by_ayah/{ayah_key}"
 
     try:
@@ -98,32 +294,15 @@ def fetch_tafsir_for_ayah(
             return None
 
         resource_name = tafsir_name or tafsir_data.get("resource_name", f"Tafsir {tafsir_id}")
-        human_url = f"https://quran.com/{surah_number}:{ayah_number}/tafsirs/{tafsir_id}"
 
-        return normalize_tafseer(
-            source_id=f"qurancom:{tafsir_id}",
-            source_name=resource_name,
+        return _normalize_qurancom_tafsir(
             surah_number=surah_number,
             ayah_number=ayah_number,
+            tafsir_id=tafsir_id,
+            resource_name=resource_name,
             text=text,
             url=url,
             language=language,
-            citation_id=f"tafsir:qurancom:{tafsir_id}:{ayah_key}",
-            canonical_url=human_url,
-            link_type="api_verified",
-            canonical_status="verified",
-            source_rank=1,
-            authority="Classical Tafseer (Verified)",
-            metadata={
-                "provider": "quran.com",
-                "tafsir_id": tafsir_id,
-                "tafsir_name": resource_name,
-                "language": language,
-                "source_type": "tafsir",
-                "api_url": url,
-                "canonical_url_human": human_url,
-                "fallback_language_used": False,
-            },
         )
 
     except requests.RequestException as e:
@@ -1,10 +1,12 @@
 """
 Hidayah AI — Retry utility for HTTP requests.
 Provides exponential-backoff retry for transient API failures.
+Requests go through the shared per-host keep-alive pools in utils.http_client.
 """
 
 import time
 import requests
+from utils.http_client import http_get
 from utils.logger import get_logger
 
 log = get_logger("retry")
@@ -23,7 +25,7 @@ def get_with_retry(
     backoff: float = _DEFAULT_BACKOFF,
     label: str = "",
 ) -> requests.Response:
-    """requests.get with automatic retry on transient HTTP errors.
+    """Pooled GET with automatic retry on transient HTTP errors.
 
     Retries on: 429 (rate-limit), 500, 502, 503, 504, ConnectionError, Timeout.
     Raises the last exception if all retries are exhausted.
@@ -31,7 +33,7 @@ def get_with_retry(
     last_exc: Exception | None = None
     for attempt in range(1, retries + 2):  # retries + 1 total attempts
         try:
-            resp = requests.get(url, headers=headers, params=params, timeout=timeout)
+            resp = http_get(url, headers=headers, params=params, timeout=timeout)
             if resp.status_code in (429, 500, 502, 503, 504) and attempt <= retries:
                 wait = backoff * (2 ** (attempt - 1))
                 log.warning(
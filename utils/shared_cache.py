@@ -0,0 +1,545 @@
+"""
+Hidayah AI — Shared Provider Cache
+Cross-process cache for provider fetches, replacing per-process
+st.cache_data so hit ratios survive restarts and are shared by every
+worker and replica pointed at the same backend.
+
+Backends (SHARED_CACHE_BACKEND):
+  disk   — one file per key under SHARED_CACHE_DIR (single host, many processes)
+  sqlite — one WAL-mode SQLite file at SHARED_CACHE_SQLITE_PATH (single host)
+  redis  — any server speaking the Redis protocol at SHARED_CACHE_REDIS_URL
+           (Redis, Valkey, KeyDB or a local stand-in); no client library needed
+  memory — in-process only, the old behaviour
+
+Values are JSON (the cached provider payloads are plain dicts and lists), so
+a shared store never hands the app anything executable; large values are
+zlib-compressed. Each namespace has its own TTL (SHARED_CACHE_TTLS). Disk and
+SQLite stores are purged of expired entries every SHARED_CACHE_PURGE_INTERVAL
+and trimmed to SHARED_CACHE_MAX_BYTES.
+
+On a miss, one caller across all processes takes a short lock and computes
+the value; the others poll for it instead of hitting the upstream API too
+(stampede protection). Taking a lock, including one left expired by a
+crashed holder, is a single atomic operation on every backend. Backend
+failures are logged and the wrapped function is simply called, so a cache
+outage never breaks a page.
+
+Stampede test: python -m benchmarks.shared_cache_herd [backend] [processes]
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import socket
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Callable
+from urllib.parse import urlparse
+from utils.config import (
+    SHARED_CACHE_BACKEND,
+    SHARED_CACHE_DIR,
+    SHARED_CACHE_SQLITE_PATH,
+    SHARED_CACHE_REDIS_URL,
+    SHARED_CACHE_TTLS,
+    SHARED_CACHE_LOCK_TTL,
+    SHARED_CACHE_COMPRESS_MIN_BYTES,
+    SHARED_CACHE_MAX_BYTES,
+    SHARED_CACHE_PURGE_INTERVAL,
+)
+from utils.logger import get_logger
+
+log = get_logger("shared_cache")
+
+_FORMAT_VERSION = 2  # 2: JSON values (1 was pickle; its keys are simply never read again)
+_RAW, _ZLIB = b"\x00", b"\x01"
+_LOCK_POLL_SECONDS = 0.05
+_MEMORY_MAX_ENTRIES = 4096
+_REDIS_RETRY_SECONDS = 5.0
+_PURGE_TARGET = 0.8        # Fraction of SHARED_CACHE_MAX_BYTES kept after a size trim
+_TMP_MAX_AGE = 3600        # Seconds before an orphaned disk temp file is removed
+
+
+# ── Value encoding ───────────────────────────────────────────────
+
+def _encode(value) -> bytes:
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(data) >= SHARED_CACHE_COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(data, 6)
+    return _RAW + data
+
+
+def _decode(blob: bytes):
+    flag, data = blob[:1], blob[1:]
+    return json.loads(zlib.decompress(data) if flag == _ZLIB else data)
+
+
+# ── Backends ─────────────────────────────────────────────────────
+# Each backend offers get/set for values, acquire/release/locked for the
+# per-key miss lock, and purge() for expired or over-budget entries.
+
+class MemoryBackend:
+    """Process-local LRU; the fallback when no shared backend is configured."""
+
+    def __init__(self, max_entries: int = _MEMORY_MAX_ENTRIES):
+        self._entries: OrderedDict = OrderedDict()
+        self._locks: dict[str, tuple[float, bytes]] = {}
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def acquire(self, key: str, token: bytes, ttl: float) -> bool:
+        with self._lock:
+            held = self._locks.get(key)
+            if held is not None and held[0] > time.time():
+                return False
+            self._locks[key] = (time.time() + ttl, token)
+            return True
+
+    def release(self, key: str, token: bytes) -> None:
+        with self._lock:
+            held = self._locks.get(key)
+            if held is not None and held[1] == token:
+                del self._locks[key]
+
+    def locked(self, key: str) -> bool:
+        with self._lock:
+            held = self._locks.get(key)
+            return held is not None and held[0] > time.time()
+
+    def purge(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (expires, _) in self._locks.items() if expires <= now]
+            for key in expired:
+                del self._locks[key]
+        return len(expired)
+
+
+class SQLiteBackend:
+    """Key/value table in a WAL-mode SQLite file shared by local processes (locks are rows too)."""
+
+    def __init__(self, path, max_bytes: int = SHARED_CACHE_MAX_BYTES):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, key: str) -> bytes | None:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)", (key, value, time.time() + ttl)
+        )
+
+    def acquire(self, key: str, token: bytes, ttl: float) -> bool:
+        # One statement: insert, or take over a lock whose holder let it expire
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache.expires <= ?",
+            (key, token, now + ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, key: str, token: bytes) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ? AND value = ?", (key, token))
+
+    def locked(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def purge(self) -> int:
+        """Delete expired rows, then the soonest-expiring ones while over max_bytes."""
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - int(self.max_bytes * _PURGE_TARGET)
+            victims = []
+            for key, size in conn.execute("SELECT key, LENGTH(value) FROM cache ORDER BY expires"):
+                if excess <= 0:
+                    break
+                victims.append((key,))
+                excess -= size
+            conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+            removed += len(victims)
+        return removed
+
+
+class DiskBackend:
+    """One file per key: 8-byte expiry timestamp + value, replaced atomically.
+
+    Miss locks live in a small SQLite table next to the files, because a
+    stale lock file cannot be taken over atomically with plain file operations.
+    """
+
+    def __init__(self, directory, max_bytes: int = SHARED_CACHE_MAX_BYTES):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._locks = SQLiteBackend(os.path.join(self.directory, "locks.sqlite3"))
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name[:2], name)
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            with open(self._path(key), "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+        if len(blob) < 8 or struct.unpack("<d", blob[:8])[0] <= time.time():
+            return None
+        return blob[8:]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(struct.pack("<d", time.time() + ttl) + value)
+        os.replace(tmp, path)
+
+    def acquire(self, key: str, token: bytes, ttl: float) -> bool:
+        return self._locks.acquire(key, token, ttl)
+
+    def release(self, key: str, token: bytes) -> None:
+        self._locks.release(key, token)
+
+    def locked(self, key: str) -> bool:
+        return self._locks.locked(key)
+
+    def purge(self) -> int:
+        """Delete expired and orphaned files, then the soonest-expiring ones while over max_bytes."""
+        now = time.time()
+        removed = self._locks.purge()
+        live = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            for item in os.scandir(entry.path):
+                try:
+                    if item.name.endswith(".tmp"):
+                        if now - item.stat().st_mtime > _TMP_MAX_AGE:
+                            os.remove(item.path)
+                            removed += 1
+                        continue
+                    with open(item.path, "rb") as f:
+                        header = f.read(8)
+                    expires = struct.unpack("<d", header)[0] if len(header) == 8 else 0.0
+                    if expires <= now:
+                        os.remove(item.path)
+                        removed += 1
+                    else:
+                        live.append((expires, item.stat().st_size, item.path))
+                except FileNotFoundError:
+                    continue  # Replaced or purged by another process meanwhile
+
+        total = sum(size for _, size, _ in live)
+        if total > self.max_bytes:
+            excess = total - int(self.max_bytes * _PURGE_TARGET)
+            for _, size, path in sorted(live):
+                if excess <= 0:
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                excess -= size
+        return removed
+
+
+class RedisBackend:
+    """Minimal RESP2 client (GET / SET PX [NX] / DEL), one connection per thread.
+
+    Expiry and memory limits are the server's job (TTL on every key plus its
+    maxmemory policy), so purge() does nothing.
+    """
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int((parsed.path or "/0").lstrip("/") or 0)
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if time.monotonic() < self._down_until:
+                raise ConnectionError("Redis unreachable, retrying shortly")
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=2)
+            except OSError:
+                # Do not pay the connect timeout on every lookup while the server is down
+                self._down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+                raise
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+            if self.password:
+                self._command("AUTH", self.password)
+            if self.db:
+                self._command("SELECT", str(self.db))
+        return conn
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RuntimeError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            return [self._read(reader) for _ in range(int(payload))]
+        raise RuntimeError(f"Unexpected Redis reply: {line[:20]!r}")
+
+    def _command(self, *parts):
+        sock, reader = self._connection()
+        encoded = [part if isinstance(part, bytes) else str(part).encode("utf-8") for part in parts]
+        request = b"*%d\r\n" % len(encoded) + b"".join(b"$%d\r\n%s\r\n" % (len(p), p) for p in encoded)
+        try:
+            sock.sendall(request)
+            return self._read(reader)
+        except (OSError, ConnectionError):
+            self._local.conn = None
+            sock.close()
+            raise
+
+    def get(self, key: str) -> bytes | None:
+        return self._command("GET", key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._command("SET", key, value, "PX", int(ttl * 1000))
+
+    def acquire(self, key: str, token: bytes, ttl: float) -> bool:
+        # SET NX PX is atomic; an expired lock has already been dropped by the server
+        return self._command("SET", key, token, "PX", int(ttl * 1000), "NX") == "OK"
+
+    def release(self, key: str, token: bytes) -> None:
+        # GET + DEL, not a script, so plain Redis-protocol stand-ins work; a lock taken
+        # over in between can at worst be released early (one extra upstream fetch)
+        if self._command("GET", key) == token:
+            self._command("DEL", key)
+
+    def locked(self, key: str) -> bool:
+        return self._command("GET", key) is not None
+
+    def purge(self) -> int:
+        return 0
+
+
+def _create_backend(name: str):
+    if name == "disk":
+        return DiskBackend(SHARED_CACHE_DIR)
+    if name == "sqlite":
+        return SQLiteBackend(SHARED_CACHE_SQLITE_PATH)
+    if name == "redis":
+        return RedisBackend(SHARED_CACHE_REDIS_URL)
+    return MemoryBackend()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_stats: dict[str, dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured backend, created once per process (memory if it cannot be opened)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                try:
+                    _backend = _create_backend(SHARED_CACHE_BACKEND)
+                    log.info(f"Shared cache backend: {SHARED_CACHE_BACKEND}")
+                except Exception as e:
+                    log.warning(f"Shared cache backend '{SHARED_CACHE_BACKEND}' unavailable, using memory: {e}")
+                    _backend = MemoryBackend()
+    return _backend
+
+
+def _count(namespace: str, key: str) -> None:
+    with _stats_lock:
+        counts = _stats.setdefault(namespace, {"hits": 0, "misses": 0, "lock_waits": 0, "errors": 0})
+        counts[key] += 1
+
+
+def get_shared_cache_stats() -> dict[str, dict]:
+    """Per-namespace hits, misses, stampede lock waits, backend errors and hit ratio."""
+    with _stats_lock:
+        stats = {namespace: dict(counts) for namespace, counts in _stats.items()}
+    for counts in stats.values():
+        lookups = counts["hits"] + counts["misses"]
+        counts["hit_ratio"] = counts["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def _backend_call(namespace: str, operation: Callable, *args):
+    try:
+        return operation(*args)
+    except Exception as e:
+        _count(namespace, "errors")
+        log.warning(f"Shared cache {namespace} backend error: {e}")
+        return None
+
+
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+def _purge(backend) -> None:
+    started = time.perf_counter()
+    try:
+        removed = backend.purge()
+    except Exception as e:
+        log.warning(f"Shared cache purge failed: {e}")
+        return
+    if removed:
+        log.info(f"Shared cache purge removed {removed} entries in {time.perf_counter() - started:.2f}s")
+
+
+def _maybe_purge(backend) -> None:
+    """Run purge() in the background at most once per SHARED_CACHE_PURGE_INTERVAL per process."""
+    global _last_purge
+    now = time.monotonic()
+    with _purge_lock:
+        if _last_purge and now - _last_purge < SHARED_CACHE_PURGE_INTERVAL:
+            return
+        _last_purge = now
+    threading.Thread(target=_purge, args=(backend,), name="hidayah-cache-purge", daemon=True).start()
+
+
+def _decode_entry(namespace: str, blob: bytes | None):
+    if blob is None:
+        return None
+    try:
+        return _decode(blob)
+    except (ValueError, zlib.error) as e:
+        log.warning(f"Ignoring undecodable {namespace} cache entry: {e}")
+        return None
+
+
+def shared_cache(namespace: str) -> Callable:
+    """
+    Decorator: cache a provider fetch in the shared backend for SHARED_CACHE_TTLS[namespace] seconds.
+
+    Keys are the namespace, function and bound arguments (defaults applied).
+    Results must be JSON-serializable (tuples come back as lists). None
+    results are not cached, so a failed fetch is retried on the next call.
+    The wrapper's .cached(*args, **kwargs) returns the stored value, or None,
+    without ever calling the function.
+    """
+    ttl = SHARED_CACHE_TTLS[namespace]
+
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+        prefix = f"hidayah:v{_FORMAT_VERSION}:{namespace}:{fn.__module__}.{fn.__qualname__}"
+
+        def key_for(args, kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            digest = hashlib.sha256(repr(tuple(bound.arguments.items())).encode("utf-8")).hexdigest()[:32]
+            return f"{prefix}:{digest}"
+
+        def cached(*args, **kwargs):
+            return _decode_entry(namespace, _backend_call(namespace, get_backend().get, key_for(args, kwargs)))
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = key_for(args, kwargs)
+            backend = get_backend()
+
+            blob = _backend_call(namespace, backend.get, key)
+            value = _decode_entry(namespace, blob)
+            if value is not None:
+                _count(namespace, "hits")
+                return value
+            _count(namespace, "misses")
+
+            # Stampede protection: one computing caller per key across processes
+            lock_key = f"{key}:lock"
+            token = uuid.uuid4().hex.encode("ascii")
+            holder = _backend_call(namespace, backend.acquire, lock_key, token, SHARED_CACHE_LOCK_TTL)
+            if holder is False:
+                _count(namespace, "lock_waits")
+                deadline = time.monotonic() + SHARED_CACHE_LOCK_TTL
+                while time.monotonic() < deadline:
+                    time.sleep(_LOCK_POLL_SECONDS)
+                    value = _decode_entry(namespace, _backend_call(namespace, backend.get, key))
+                    if value is not None:
+                        return value
+                    if not _backend_call(namespace, backend.locked, lock_key):
+                        break  # Holder gave up without a value (failed fetch)
+
+            try:
+                value = fn(*args, **kwargs)
+                if value is not None:
+                    try:
+                        blob = _encode(value)
+                    except (TypeError, ValueError) as e:
+                        log.warning(f"Not caching {namespace} value for {fn.__qualname__}: {e}")
+                    else:
+                        _backend_call(namespace, backend.set, key, blob, ttl)
+                        _maybe_purge(backend)
+                return value
+            finally:
+                if holder:
+                    _backend_call(namespace, backend.release, lock_key, token)
+
+        wrapper.cached = cached
+        return wrapper
+
+    return decorator
@@ -45,7 +45,12 @@ def init_session_state():
         "faiss_index": None,
         "pdf_chunks": [],
         "pdf_embeddings": None,
+        "pdf_chunk_meta": None,
+        "pdf_lexical": None,
         "uploaded_pdf_name": None,
+        "pdf_job": None,
+        "pdf_doc_hash": None,
+        "pdf_upload_id": None,
 
         # UI
         "show_settings": False,
@@ -6,6 +6,8 @@ Provides verified hadith text with narrator chains and scholarly grades.
 API docs: https://sunnah.api-docs.io/
 """
 
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import requests
 import streamlit as st
 from utils.config import (
@@ -13,6 +15,10 @@ from utils.config import (
     SUNNAH_API_BASE,
     HADITH_COLLECTIONS,
     HADITH_MAX_RESULTS,
+    SUNNAH_SEARCH_COLLECTIONS,
+    SUNNAH_SEARCH_TIMEOUT,
+    SUNNAH_SEARCH_DEADLINE,
+    SUNNAH_SEARCH_CONCURRENCY,
 )
 from utils.evidence import normalize_hadith
 from utils.logger import get_logger
@@ -63,18 +69,90 @@ def _grade_to_confidence(grade: str) -> str:
     return "unverified"
 
 
+def normalize_sunnah_item(item: dict, coll_name: str) -> dict | None:
+    """Normalize one /hadiths item; None when it has no English or Arabic body."""
+    hadith_en = ""
+    hadith_ar = ""
+    for body in item.get("hadith", []):
+        lang = body.get("lang", "")
+        if lang == "en":
+            hadith_en = body.get("body", "")
+        elif lang == "ar":
+            hadith_ar = body.get("body", "")
+
+    text = hadith_en or hadith_ar
+    if not text:
+        return None
+
+    grades = item.get("grades", [])
+    grade = _grade_label(grades)
+    hadith_number = item.get("hadithNumber", "")
+    book_number = item.get("bookNumber", "")
+    collection_display = HADITH_COLLECTIONS.get(coll_name, coll_name)
+    canonical_url = f"https://sunnah.com/{coll_name}/{book_number}/{hadith_number}" if book_number else f"https://sunnah.com/{coll_name}"
+
+    return normalize_hadith(
+        source_name=f"Sunnah.com — {collection_display}",
+        title=f"{collection_display} {hadith_number}",
+        excerpt=text.strip(),
+        url=canonical_url,
+        language="en" if hadith_en else "ar",
+        citation_id=f"hadith:sunnah:{coll_name}:{hadith_number}",
+        canonical_url=canonical_url,
+        link_type="api_verified",
+        canonical_status=_grade_to_confidence(grade),
+        authority="Hadith Corpus — Authenticated",
+        metadata={
+            "collection": coll_name,
+            "collection_name": collection_display,
+            "hadith_number": str(hadith_number),
+            "book_number": str(book_number),
+            "grade": grade,
+            "grade_raw": grades,
+            "source_type": "hadith_collection",
+            "provider": "sunnah.com",
+        },
+    )
+
+
+def _search_collection(coll_name: str, keyword: str, limit: int, headers: dict, timeout: float) -> list[dict]:
+    """One collection's share of a keyword search (raises requests.RequestException)."""
+    url = f"{SUNNAH_API_BASE}/hadiths"
+    params = {
+        "collection": coll_name,
+        "limit": limit,
+        "page": 1,
+    }
+    log.info(f"Searching sunnah.com: collection={coll_name}, keyword='{keyword[:60]}'")
+    resp = get_with_retry(url, headers=headers, params=params, timeout=timeout, label=f"sunnah:search:{coll_name}")
+    resp.raise_for_status()
+    hits = (normalize_sunnah_item(item, coll_name) for item in resp.json().get("data", []))
+    return [hit for hit in hits if hit][:limit]
+
+
 @st.cache_data(ttl=3600, show_spinner=False)
 def search_hadith_by_keyword(
     keyword: str,
     collection: str = "",
     max_results: int = HADITH_MAX_RESULTS,
+    deadline: float = SUNNAH_SEARCH_DEADLINE,
 ) -> list[dict]:
     """Search for hadith by keyword across collections.
 
+    Up to SUNNAH_SEARCH_CONCURRENCY collections are queried at once; the
+    next one in SUNNAH_SEARCH_COLLECTIONS priority order is sent only when
+    a request finishes and more hits are still needed. Results are merged
+    in priority order, and once the collections that have answered, in
+    order without gaps, hold max_results hits no further request is sent,
+    so the result is the same as a sequential search. Collections still
+    pending at the deadline are skipped; requests already in flight finish
+    in the background and are discarded.
+
     Args:
         keyword: Search term (e.g., "fasting ramadan").
         collection: Optional specific collection (e.g., "bukhari"). Empty = all.
         max_results: Maximum results to return.
+        deadline: Seconds to wait for the whole search.
 
     Returns:
         List of normalized hadith evidence dicts.
@@ -84,86 +162,59 @@ def search_hadith_by_keyword(
         return []
 
     headers = _get_headers()
-    results = []
-
-    # Search across priority collections if none specified
-    collections_to_search = (
-        [collection] if collection
-        else ["bukhari", "muslim", "abudawud", "tirmidhi", "nasai", "ibnmajah"]
-    )
-
-    for coll_name in collections_to_search:
-        if len(results) >= max_results:
-            break
-
-        url = f"{SUNNAH_API_BASE}/hadiths"
-        params = {
-            "collection": coll_name,
-            "limit": min(max_results - len(results), 5),
-            "page": 1,
-        }
-
-        try:
-            log.info(f"Searching sunnah.com: collection={coll_name}, keyword='{keyword[:60]}'")
-            resp = get_with_retry(url, headers=headers, params=params, timeout=12, label=f"sunnah:search:{coll_name}")
-            resp.raise_for_status()
-            data = resp.json()
-
-            for item in data.get("data", []):
-                hadith_en = ""
-                hadith_ar = ""
-                for body in item.get("hadith", []):
-                    lang = body.get("lang", "")
-                    if lang == "en":
-                        hadith_en = body.get("body", "")
-                    elif lang == "ar":
-                        hadith_ar = body.get("body", "")
-
-                text = hadith_en or hadith_ar
-                if not text:
-                    continue
-
-                grades = item.get("grades", [])
-                grade = _grade_label(grades)
-                hadith_number = item.get("hadithNumber", "")
-                book_number = item.get("bookNumber", "")
-                collection_display = HADITH_COLLECTIONS.get(coll_name, coll_name)
-                canonical_url = f"https://sunnah.com/{coll_name}/{book_number}/{hadith_number}" if book_number else f"https://sunnah.com/{coll_name}"
-
-                results.append(
-                    normalize_hadith(
-                        source_name=f"Sunnah.com — {collection_display}",
-                        title=f"{collection_display} {hadith_number}",
-                        excerpt=text.strip(),
-                        url=canonical_url,
-                        language="en" if hadith_en else "ar",
-                        citation_id=f"hadith:sunnah:{coll_name}:{hadith_number}",
-                        canonical_url=canonical_url,
-                        link_type="api_verified",
-                        canonical_status=_grade_to_confidence(grade),
-                        authority="Hadith Corpus — Authenticated",
-                        metadata={
-                            "collection": coll_name,
-                            "collection_name": collection_display,
-                            "hadith_number": str(hadith_number),
-                            "book_number": str(book_number),
-                            "grade": grade,
-                            "grade_raw": grades,
-                            "source_type": "hadith_collection",
-                            "provider": "sunnah.com",
-                        },
-                    )
-                )
-
-                if len(results) >= max_results:
+    collections_to_search = [collection] if collection else list(SUNNAH_SEARCH_COLLECTIONS)
+    limit = min(max_results, 5)
+    timeout = min(SUNNAH_SEARCH_TIMEOUT, deadline)
+    started = time.monotonic()
+
+    by_collection: dict[str, list[dict]] = {}
+    concurrency = min(SUNNAH_SEARCH_CONCURRENCY, len(collections_to_search))
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="hidayah-sunnah")
+    queued = iter(collections_to_search)
+    in_flight = {}
+
+    def send_next() -> None:
+        coll_name = next(queued, None)
+        if coll_name is not None:
+            in_flight[pool.submit(_search_collection, coll_name, keyword, limit, headers, timeout)] = coll_name
+
+    for _ in range(concurrency):
+        send_next()
+    try:
+        settled = 0
+        while in_flight and settled < max_results:
+            remaining = deadline - (time.monotonic() - started)
+            done, _ = wait(in_flight, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                pending = [name for name in collections_to_search if name not in by_collection]
+                log.warning(f"sunnah.com search deadline ({deadline:.1f}s) hit; skipping {', '.join(pending)}")
+                break
+            for future in done:
+                coll_name = in_flight.pop(future)
+                try:
+                    by_collection[coll_name] = future.result()
+                except requests.RequestException as e:
+                    log.warning(f"sunnah.com API error for {coll_name}: {e}")
+                    by_collection[coll_name] = []
+
+            settled = 0
+            for name in collections_to_search:
+                if name not in by_collection:
                     break
-
-        except requests.RequestException as e:
-            log.warning(f"sunnah.com API error for {coll_name}: {e}")
-            continue
-
-    log.info(f"sunnah.com returned {len(results)} hadith results")
-    return results[:max_results]
+                settled += len(by_collection[name])
+            if settled < max_results:
+                for _ in done:
+                    send_next()
+    finally:
+        # In-flight requests finish in the background; nothing else is sent
+        pool.shutdown(wait=False)
+
+    results = [hit for name in collections_to_search for hit in by_collection.get(name, [])][:max_results]
+    log.info(
+        f"sunnah.com returned {len(results)} hadith results from "
+        f"{len(by_collection)}/{len(collections_to_search)} collections in {time.monotonic() - started:.2f}s"
+    )
+    return results
 
 
 @st.cache_data(ttl=3600, show_spinner=False)
@@ -20,6 +20,7 @@ from utils.config import (
 from utils.evidence import normalize_tafseer
 from utils.logger import get_logger
 from utils.retry import get_with_retry
+from utils.shared_cache import shared_cache
 
 log = get_logger("tafsir_api")
 
@@ -91,7 +92,7 @@ def discover_tafseer_editions(language: str) -> list[dict]:
     )
 
     try:
-        response = requests.get(filtered_url, timeout=20)
+        response = get_with_retry(filtered_url, timeout=20, label=f"alquran:editions:{normalized_language}")
         response.raise_for_status()
         payload = response.json()
         if payload.get("code") == 200:
@@ -113,7 +114,7 @@ def discover_tafseer_editions(language: str) -> list[dict]:
 
     # Fallback: query all editions and filter locally
     try:
-        response = requests.get(f"{QURAN_API_BASE}/edition", timeout=20)
+        response = get_with_retry(f"{QURAN_API_BASE}/edition", timeout=20, label="alquran:editions:all")
         response.raise_for_status()
         payload = response.json()
         if payload.get("code") != 200:
@@ -177,7 +178,7 @@ def get_ranked_tafseer_sources(language: str, max_sources: int = TAFSEER_SOURCE_
     return ranked[:max_sources]
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@shared_cache("tafseer")
 def fetch_multisource_tafseer_for_ayah(
     surah_number: int,
     ayah_number: int,
@@ -270,7 +271,7 @@ def _fetch_from_alquran_cloud(
         human_url = f"https://alquran.cloud/ayah/{surah_number}/{ayah_number}"
 
         try:
-            response = requests.get(url, timeout=15)
+            response = get_with_retry(url, timeout=15, label=f"alquran:tafsir:{edition}")
             response.raise_for_status()
             payload = response.json()
             if payload.get("code") != 200: